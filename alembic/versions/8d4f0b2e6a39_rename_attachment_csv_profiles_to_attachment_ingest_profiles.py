@@ -0,0 +1,28 @@
+"""Rename attachment_csv_profiles to attachment_ingest_profiles, as profiles cover every tabular format
+
+Revision ID: 8d4f0b2e6a39
+Revises: 7c3e9a1d5f28
+Create Date: 2025-08-15 14:02:38.716254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f0b2e6a39'
+down_revision: Union[str, None] = '7c3e9a1d5f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.rename_table('attachment_csv_profiles', 'attachment_ingest_profiles')
+    op.execute('ALTER INDEX attachment_csv_profiles_pkey RENAME TO attachment_ingest_profiles_pkey')
+
+
+def downgrade() -> None:
+    op.execute('ALTER INDEX attachment_ingest_profiles_pkey RENAME TO attachment_csv_profiles_pkey')
+    op.rename_table('attachment_ingest_profiles', 'attachment_csv_profiles')
@@ -11,6 +11,8 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from src.core.config import settings
+from src.workers.tasks.catalog import table_catalog
+from src.workers.tasks.column_stats import table_column_stats
 
 # Database setup
 engine = create_engine(settings.database_url)
@@ -24,25 +26,24 @@ def check_ingested_data():
         print("🔍 Checking Ingested Data")
         print("=" * 60)
         
-        # Find all processed attachment tables
-        tables_query = text("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name NOT IN ('email_accounts', 'email_messages', 'email_attachments', 'alembic_version')
-            ORDER BY table_name
-        """)
-        
-        result = session.execute(tables_query)
-        tables = [row[0] for row in result.fetchall()]
+        # Find all processed attachment tables (registered by the pipeline, with their lineage)
+        catalog = table_catalog(session)
         
-        if not tables:
+        if not catalog:
             print("❌ No processed attachment tables found.")
             return
         
-        for table in tables:
+        for entry in catalog:
+            table = entry['table_name']
             print(f"\n📊 Table: {table}")
             print("-" * 60)
+            print(
+                f"Schema version {entry['version']}, ~{entry['row_estimate'] or 0} rows estimated, "
+                f"{entry['loads']} loads, latest {entry['latest_filename']} "
+                f"(rule: {entry['routing_rule'] or 'filename'})"
+            )
+            if entry['families']:
+                print(f"Union views: {', '.join(entry['families'])}")
             
             # Get sample data
             data_query = text(f"SELECT * FROM {table} LIMIT 5")
@@ -65,18 +66,43 @@ def check_ingested_data():
                         value = str(value)[:50] + "..."
                     print(f"  {col}: {value}")
             
-            # Get total count
-            count_query = text(f"SELECT COUNT(*) FROM {table}")
-            total_count = session.execute(count_query).scalar()
+            # Get total count (from the recorded loads when the table has batch provenance)
+            if 'ingest_batch_id' in columns:
+                count_query = text("SELECT COALESCE(SUM(rows_inserted), 0) FROM ingest_batches WHERE table_name = :table")
+            else:
+                count_query = text(f"SELECT COUNT(*) FROM {table}")
+            total_count = session.execute(count_query, {'table': table}).scalar()
             print(f"\nTotal rows in table: {total_count}")
             
-            # Check source attachments
-            source_query = text(f"""
-                SELECT DISTINCT source_filename, attachment_date, COUNT(*) as row_count
-                FROM {table}
-                GROUP BY source_filename, attachment_date
-                ORDER BY source_filename
-            """)
+            # Column statistics computed at ingest time (no scan of the table)
+            column_stats = table_column_stats(session, table)
+            if column_stats:
+                print(f"\nColumn statistics:")
+                for column, stats in column_stats.items():
+                    print(
+                        f"  {column}: {stats['null_count']}/{stats['row_count']} null, "
+                        f"~{stats['distinct_estimate']} distinct, min {stats['min_value']}, max {stats['max_value']}"
+                        + (f", sum {stats['value_sum']}" if stats['value_sum'] is not None else "")
+                    )
+            
+            # Check source attachments (kept once per load in ingest_batches for newer tables)
+            if 'ingest_batch_id' in columns:
+                source_query = text(f"""
+                    SELECT b.source_filename, b.attachment_date, COUNT(*) as row_count
+                    FROM {table} t
+                    JOIN ingest_batches b ON b.id = t.ingest_batch_id
+                    GROUP BY b.source_filename, b.attachment_date
+                    ORDER BY b.source_filename
+                """)
+            elif 'source_filename' in columns:
+                source_query = text(f"""
+                    SELECT DISTINCT source_filename, attachment_date, COUNT(*) as row_count
+                    FROM {table}
+                    GROUP BY source_filename, attachment_date
+                    ORDER BY source_filename
+                """)
+            else:
+                continue
             
             sources = session.execute(source_query).fetchall()
             print(f"\nData sources:")
@@ -90,10 +116,11 @@ def check_ingested_data():
         
         # Find processed attachments
         processed_attachments_query = text("""
-            SELECT id, filename, content_type, size
-            FROM email_attachments
-            WHERE filename LIKE 'PROCESSED_%'
-            ORDER BY filename
+            SELECT a.id, a.filename, a.content_type, a.size
+            FROM attachment_processing_states s
+            JOIN email_attachments a ON a.id = s.attachment_id
+            WHERE s.status IN ('completed', 'duplicate')
+            ORDER BY a.filename
             LIMIT 5
         """)
         
@@ -106,11 +133,11 @@ def check_ingested_data():
         
         # Find unprocessed attachments
         unprocessed_attachments_query = text("""
-            SELECT id, filename, content_type, size
-            FROM email_attachments
-            WHERE (content_type LIKE '%csv%' OR filename LIKE '%.csv')
-            AND filename NOT LIKE 'PROCESSED_%'
-            ORDER BY filename
+            SELECT a.id, a.filename, a.content_type, a.size
+            FROM attachment_processing_states s
+            JOIN email_attachments a ON a.id = s.attachment_id
+            WHERE s.status = 'pending'
+            ORDER BY s.created_at
             LIMIT 5
         """)
         
@@ -14,10 +14,11 @@ from sqlalchemy.orm import sessionmaker
 
 from src.core.config import settings
 from src.models.email import EmailAttachment
-from src.workers.tasks.attachment_processing_tasks import (
+from src.workers.tasks.attachment_routing import (
     sanitize_table_name,
     extract_date_from_filename
 )
+from src.workers.tasks.processing_state import mark_processing_completed, query_pending_attachments
 
 # Database setup
 engine = create_engine(settings.database_url)
@@ -165,7 +166,7 @@ def process_attachment(attachment_id: str):
         print(f"✅ Inserted 3 sample rows (total rows: {row_count})")
         
         # Mark attachment as processed
-        attachment.filename = f"PROCESSED_{attachment.filename}"
+        mark_processing_completed(session, attachment, rows_inserted=3)
         session.commit()
         
         print(f"🏷️  Marked attachment as processed")
@@ -184,11 +185,7 @@ def list_unprocessed_attachments():
     """List all unprocessed CSV attachments."""
     session = SessionLocal()
     try:
-        attachments = session.query(EmailAttachment).filter(
-            (EmailAttachment.content_type.like('%csv%') | 
-             EmailAttachment.filename.like('%.csv')),
-            ~EmailAttachment.filename.like('%PROCESSED%')
-        ).all()
+        attachments = query_pending_attachments(session)
         
         print(f"📋 Found {len(attachments)} unprocessed CSV attachments:")
         for i, attachment in enumerate(attachments):
@@ -0,0 +1,21 @@
+"""Shared API dependencies."""
+
+from typing import Iterator
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.core.config import settings
+
+# Database setup
+engine = create_engine(settings.database_url)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_db() -> Iterator[Session]:
+    """Database session for one request."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,49 @@
+"""Catalog endpoints: the ingested tables, their lineage and the union views over table families."""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from src.api.dependencies import get_db
+from src.models.email import IngestTableFamily
+from src.workers.tasks.catalog import table_catalog
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+
+@router.get("")
+def list_tables(db: Session = Depends(get_db)):
+    """List the ingested tables with schema versions, row estimates and load lineage."""
+    return [_catalog_entry(entry) for entry in table_catalog(db)]
+
+
+@router.get("/families")
+def list_families(db: Session = Depends(get_db)):
+    """List the union views built over table families and their member tables."""
+    entries = db.query(IngestTableFamily).order_by(IngestTableFamily.name).all()
+    return [
+        {
+            "name": entry.name,
+            "tables": entry.tables,
+            "updated_at": entry.updated_at.isoformat() if entry.updated_at else None
+        }
+        for entry in entries
+    ]
+
+
+@router.get("/{table_name}")
+def read_table(table_name: str, db: Session = Depends(get_db)):
+    """Read one table's catalog entry, including its column types."""
+    entries = table_catalog(db, table_name)
+    if not entries:
+        raise HTTPException(status_code=404, detail=f"Table {table_name} not found")
+    return _catalog_entry(entries[0], with_columns=True)
+
+
+def _catalog_entry(entry: dict, with_columns: bool = False) -> dict:
+    columns = entry.pop("columns")
+    entry["column_count"] = len(columns)
+    if with_columns:
+        entry["columns"] = columns
+    for key in ("created_at", "updated_at", "last_loaded_at"):
+        entry[key] = entry[key].isoformat() if entry[key] else None
+    return entry
@@ -0,0 +1,55 @@
+"""Rollup endpoints: aggregates maintained by the ingest pipeline, read without scanning the data tables."""
+
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from src.api.dependencies import get_db
+from src.models.email import IngestRollup
+from src.workers.tasks.rollups import query_rollup
+
+router = APIRouter(prefix="/rollups", tags=["rollups"])
+
+# Query parameters that are not group column filters
+RESERVED_PARAMS = {"start", "end", "limit", "offset"}
+
+
+@router.get("")
+def list_rollups(db: Session = Depends(get_db)):
+    """List the rollups built so far with their definitions; stale ones are being rebuilt."""
+    entries = db.query(IngestRollup).order_by(IngestRollup.name).all()
+    return [
+        {
+            **entry.definition,
+            "stale": entry.stale,
+            "updated_at": entry.updated_at.isoformat() if entry.updated_at else None
+        }
+        for entry in entries
+    ]
+
+
+@router.get("/{name}")
+def read_rollup(
+    name: str,
+    request: Request,
+    start: Optional[date] = Query(None, description="First period to include"),
+    end: Optional[date] = Query(None, description="Period to stop before"),
+    limit: int = Query(1000, ge=1, le=10000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Read a rollup's rows; other query parameters filter group columns (e.g. ?symbol=AAPL)."""
+    entry = db.get(IngestRollup, name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Rollup {name} not found")
+    if entry.stale:
+        raise HTTPException(status_code=409, detail=f"Rollup {name} is being rebuilt, try again later")
+
+    filters = {key: value for key, value in request.query_params.items() if key not in RESERVED_PARAMS}
+    try:
+        rows = query_rollup(db, entry, filters, start, end, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"rollup": entry.definition, "rows": rows}
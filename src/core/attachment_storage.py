@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied at a time when spooling a stream
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def spool_path_for(file_hash: str) -> Path:
+    """Return the content-addressed spool path for an attachment hash."""
+    return Path(settings.ATTACHMENT_SPOOL_DIR) / file_hash[:2] / file_hash
+
+
+def spool_attachment_content(content: bytes, file_hash: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Write attachment bytes to the spool directory.
+
+    Files are named by content hash, so identical attachments share one file
+    and an existing file is never rewritten. Writes go through a temporary
+    file and an atomic rename so readers never observe a partial file.
+
+    Args:
+        content: Raw (decoded) attachment bytes
+        file_hash: SHA-256 of the content, computed if not given
+
+    Returns:
+        Tuple of (file_path, file_hash)
+    """
+    file_hash = file_hash or hashlib.sha256(content).hexdigest()
+    path = spool_path_for(file_hash)
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".spool-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    return str(path), file_hash
+
+
+def spool_attachment_stream(stream: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[str, str, int]:
+    """
+    Write a stream (e.g. an archive member being decompressed) to the spool directory.
+
+    The stream is copied in chunks while it is hashed, so memory use does not
+    depend on its size. The content-addressed path is only known at the end,
+    so the data goes to a temporary file that is renamed (or dropped if the
+    same content is already spooled).
+
+    Args:
+        stream: Binary stream to read until EOF
+        max_bytes: Abort with ValueError beyond this many bytes
+
+    Returns:
+        Tuple of (file_path, file_hash, size)
+    """
+    spool_dir = Path(settings.ATTACHMENT_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=spool_dir, prefix=".spool-")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as tmp_file:
+            for chunk in iter(lambda: stream.read(STREAM_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"Stream exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                tmp_file.write(chunk)
+
+        file_hash = digest.hexdigest()
+        path = spool_path_for(file_hash)
+        if path.exists():
+            os.unlink(tmp_path)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return str(path), file_hash, size
+
+
+def ensure_spooled(attachment) -> Optional[str]:
+    """
+    Make sure an attachment's bytes are available as a spool file.
+
+    Attachments stored before spooling (or spooled on another host) are
+    written out from their base64 database content on first use. The
+    attachment's file_path and file_hash are updated; the caller commits.
+    Archive members have no content either; for them None is returned and
+    the caller decompresses the member again from its archive.
+
+    Args:
+        attachment: EmailAttachment record
+
+    Returns:
+        Path of the spool file, or None if the attachment has no content
+
+    Raises:
+        FileNotFoundError: The spool file of a streamed attachment (stored
+            without database content) is missing
+    """
+    if attachment.file_path and os.path.exists(attachment.file_path):
+        return attachment.file_path
+
+    if not attachment.content:
+        if attachment.file_path and not attachment.parent_attachment_id:
+            raise FileNotFoundError(
+                f"Spool file {attachment.file_path} of attachment {attachment.id} is missing and the attachment "
+                f"has no stored content to rebuild it from; restore the file or delete the message to sync it again"
+            )
+        return None
+
+    content = base64.b64decode(attachment.content)
+    file_path, file_hash = spool_attachment_content(content, attachment.file_hash)
+    attachment.file_path = file_path
+    attachment.file_hash = file_hash
+    logger.info(f"Spooled attachment {attachment.id} to {file_path}")
+    return file_path
+
+
+@contextmanager
+def open_attachment_buffer(file_path: str) -> Iterator[memoryview]:
+    """
+    Open a spooled attachment as a read-only, memory-mapped buffer.
+
+    Slicing the returned memoryview does not copy; pages are loaded lazily by
+    the OS and can be dropped under memory pressure, so worker RSS does not
+    grow with the attachment size.
+
+    Args:
+        file_path: Path of the spool file
+
+    Yields:
+        Read-only memoryview over the file contents
+    """
+    with open(file_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds a slice; the map is closed once it is collected
+                logger.debug(f"Deferred closing memory map for {file_path}")
@@ -1,6 +1,9 @@
 """Essential configuration settings."""
 
+import json
 import os
+from typing import Any, Dict, List
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -16,6 +19,93 @@ class Settings(BaseSettings):
     IMAP_PASSWORD: str = os.getenv("IMAP_PASSWORD", "")
     IMAP_USE_SSL: bool = os.getenv("IMAP_USE_SSL", "true").lower() == "true"
     
+    # Attachment storage
+    ATTACHMENT_SPOOL_DIR: str = os.getenv("ATTACHMENT_SPOOL_DIR", "data/attachments")
+    # Largest decompressed size of a compressed attachment's member (guards against zip bombs)
+    ARCHIVE_MAX_MEMBER_BYTES: int = int(os.getenv("ARCHIVE_MAX_MEMBER_BYTES", str(16 * 1024 * 1024 * 1024)))
+    
+    # Messages (RFC822.SIZE) and attachments larger than these are handled on the
+    # LARGE_TASK_QUEUE, served by workers with one child and more memory; large
+    # messages are streamed part by part into the spool, IMAP_FETCH_CHUNK_BYTES at a time
+    LARGE_MESSAGE_BYTES: int = int(os.getenv("LARGE_MESSAGE_BYTES", str(25 * 1024 * 1024)))
+    LARGE_ATTACHMENT_BYTES: int = int(os.getenv("LARGE_ATTACHMENT_BYTES", str(100 * 1024 * 1024)))
+    LARGE_TASK_QUEUE: str = os.getenv("LARGE_TASK_QUEUE", "large")
+    IMAP_FETCH_CHUNK_BYTES: int = int(os.getenv("IMAP_FETCH_CHUNK_BYTES", str(1024 * 1024)))
+    # A deferred large message is stored as "pending" until its task completes; a sync
+    # queues it again only if it is still pending after this many minutes (lost task)
+    LARGE_MESSAGE_PENDING_MINUTES: int = int(os.getenv("LARGE_MESSAGE_PENDING_MINUTES", "120"))
+    
+    # Ingest engines ("python" or "pandas"), selectable per content type or file extension
+    DEFAULT_INGEST_ENGINE: str = os.getenv("DEFAULT_INGEST_ENGINE", "python")
+    INGEST_ENGINE_BY_TYPE: Dict[str, str] = json.loads(os.getenv("INGEST_ENGINE_BY_TYPE", "{}"))
+    
+    # Natural keys per target table (e.g. {"prices": ["symbol", "attachment_date"]}).
+    # Tables without a configured key can get one inferred from identifier-like columns
+    # of their first report's sample (opt-in: later rows that collide with a wrong guess
+    # are skipped, and for reports without a date in their filename the report date
+    # part of the key is NULL, so only enable it for dated feeds)
+    INGEST_NATURAL_KEYS: Dict[str, List[str]] = json.loads(os.getenv("INGEST_NATURAL_KEYS", "{}"))
+    INGEST_INFER_NATURAL_KEYS: bool = os.getenv("INGEST_INFER_NATURAL_KEYS", "false").lower() == "true"
+    
+    # Tables whose rows are deduplicated by a hash of their values (e.g. ["positions"] for rolling
+    # reports that repeat the previous day's rows); applies to tables created after being listed,
+    # which are not partitioned since their unique row_hash index must span every report date
+    INGEST_ROW_HASH_TABLES: List[str] = json.loads(os.getenv("INGEST_ROW_HASH_TABLES", "[]"))
+    
+    # Filename routing rules, first match wins (e.g. [{"pattern": "^eod_(?P<date>\\d{8})",
+    # "table": "eod_prices", "date_format": "%Y%m%d", "options": {"delimiter": ";"}}]);
+    # other attachments are routed by the table name and date in their filename
+    INGEST_ROUTING_RULES: List[Dict[str, Any]] = json.loads(os.getenv("INGEST_ROUTING_RULES", "[]"))
+    
+    # CSV attachments of at least this size are split into byte ranges loaded in parallel
+    PARALLEL_INGEST_MIN_BYTES: int = int(os.getenv("PARALLEL_INGEST_MIN_BYTES", str(256 * 1024 * 1024)))
+    PARALLEL_INGEST_RANGE_BYTES: int = int(os.getenv("PARALLEL_INGEST_RANGE_BYTES", str(64 * 1024 * 1024)))
+    
+    # New attachment tables are range partitioned on attachment_date ("month", "day" or "none");
+    # partitions ending more than the retention period ago are dropped (or detached), 0 keeps all
+    INGEST_PARTITION_INTERVAL: str = os.getenv("INGEST_PARTITION_INTERVAL", "month")
+    INGEST_PARTITION_RETENTION_DAYS: int = int(os.getenv("INGEST_PARTITION_RETENTION_DAYS", "0"))
+    INGEST_PARTITION_DETACH_EXPIRED: bool = os.getenv("INGEST_PARTITION_DETACH_EXPIRED", "false").lower() == "true"
+    
+    # Rows reported more than INGEST_ARCHIVE_AFTER_DAYS ago are moved into zstd Parquet files
+    # under INGEST_ARCHIVE_DIR (one directory per table and date), deleted in batches of
+    # INGEST_ARCHIVE_BATCH_ROWS; 0 disables archiving. Requires pyarrow (and duckdb to query).
+    # The files are the only copy of archived rows: INGEST_ARCHIVE_DIR must be persistent
+    # storage shared by the workers (archiving refuses a container's writable layer)
+    INGEST_ARCHIVE_AFTER_DAYS: int = int(os.getenv("INGEST_ARCHIVE_AFTER_DAYS", "0"))
+    INGEST_ARCHIVE_DIR: str = os.getenv("INGEST_ARCHIVE_DIR", "data/archive")
+    INGEST_ARCHIVE_BATCH_ROWS: int = int(os.getenv("INGEST_ARCHIVE_BATCH_ROWS", "50000"))
+    # History queries over hot and archived rows that give no start date cover this many days
+    INGEST_HISTORY_DEFAULT_DAYS: int = int(os.getenv("INGEST_HISTORY_DEFAULT_DAYS", "31"))
+    
+    # Per-load column statistics (nulls, distinct estimate, min/max, sums) computed while loading
+    INGEST_COLUMN_STATS: bool = os.getenv("INGEST_COLUMN_STATS", "true").lower() == "true"
+    
+    # Rollup tables maintained incrementally from each loaded batch, per target table (e.g.
+    # {"prices": [{"name": "prices_daily", "grain": "day", "group_by": ["symbol"],
+    # "measures": {"volume": "sum(volume)", "avg_price": "avg(price)", "reports": "count(*)"}}]})
+    INGEST_ROLLUPS: Dict[str, List[Dict[str, Any]]] = json.loads(os.getenv("INGEST_ROLLUPS", "{}"))
+    
+    # Union views over families of ingested tables, kept current as members appear or evolve
+    # (view name -> regular expression matched against table names, or a list of tables,
+    # e.g. {"prices_all": "prices(_[a-z]+)?"}); rows carry their table in source_table
+    INGEST_TABLE_FAMILIES: Dict[str, Any] = json.loads(os.getenv("INGEST_TABLE_FAMILIES", "{}"))
+    
+    # Attachments are queued from the outbox when their message is stored; the
+    # periodic sweep only picks up ones still pending after the grace period
+    ATTACHMENT_SWEEP_GRACE_MINUTES: int = int(os.getenv("ATTACHMENT_SWEEP_GRACE_MINUTES", "10"))
+    
+    # Attachments still processing this long after their attempt started lost their
+    # worker (e.g. killed out of memory) and are queued again by the sweep, until
+    # they have used ATTACHMENT_MAX_ATTEMPTS attempts and are marked failed
+    ATTACHMENT_STALE_PROCESSING_MINUTES: int = int(os.getenv("ATTACHMENT_STALE_PROCESSING_MINUTES", "120"))
+    ATTACHMENT_MAX_ATTEMPTS: int = int(os.getenv("ATTACHMENT_MAX_ATTEMPTS", "5"))
+    OUTBOX_DISPATCH_BATCH_SIZE: int = int(os.getenv("OUTBOX_DISPATCH_BATCH_SIZE", "100"))
+    # Outbox events whose handler failed this many times are parked: left
+    # undispatched (and not purged) for inspection instead of being retried
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    OUTBOX_RETENTION_DAYS: int = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+    
     class Config:
         env_file = ".env"
         extra = "ignore"
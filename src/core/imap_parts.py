@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import binascii
+import email.header
+import email.utils
+import re
+import urllib.parse
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+# Content-Transfer-Encodings decoded while streaming (others are passed through)
+BASE64 = "base64"
+QUOTED_PRINTABLE = "quoted-printable"
+
+BASE64_IGNORED = re.compile(rb"[^A-Za-z0-9+/=]")
+
+
+class MessagePart(NamedTuple):
+    """A leaf MIME part of a message, as described by its IMAP BODYSTRUCTURE."""
+
+    section: str  # IMAP section specifier, e.g. "2" or "1.2"
+    content_type: str
+    encoding: str
+    size: int  # encoded octets
+    charset: Optional[str]
+    filename: Optional[str]
+    disposition: Optional[str]
+    content_id: Optional[str]
+
+    @property
+    def is_attachment(self) -> bool:
+        """Return whether the part is stored as an attachment (same rule as the full-message sync)."""
+        return self.disposition == "attachment" and bool(self.filename)
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value)
+
+
+def _params(values: Optional[Sequence]) -> dict:
+    # BODYSTRUCTURE parameters are a flat (name, value, name, value, ...) list
+    values = list(values or ())
+    return {_text(name).lower(): _text(value) for name, value in zip(values[::2], values[1::2])}
+
+
+def _filename(params: dict) -> Optional[str]:
+    if params.get("filename*"):
+        # RFC 2231, e.g. "utf-8''prices%20eu.csv"
+        charset, _, value = email.utils.decode_rfc2231(params["filename*"])
+        return urllib.parse.unquote(value, encoding=charset or "utf-8", errors="replace")
+    value = params.get("filename") or params.get("name")
+    if value is None:
+        return None
+    # RFC 2047 encoded words, e.g. "=?utf-8?q?prices_eu.csv?="
+    return str(email.header.make_header(email.header.decode_header(value)))
+
+
+def message_parts(structure, section: str = "") -> List[MessagePart]:
+    """
+    List the leaf parts of a message from its BODYSTRUCTURE.
+
+    Nested messages (message/rfc822) are listed as single parts.
+
+    Args:
+        structure: BODYSTRUCTURE as parsed by imapclient (BodyData)
+        section: Section of the structure (empty for the whole message)
+
+    Returns:
+        Leaf parts in message order
+    """
+    if isinstance(structure[0], list):
+        parts = []
+        for index, child in enumerate(structure[0], start=1):
+            parts.extend(message_parts(child, f"{section}.{index}" if section else str(index)))
+        return parts
+
+    main_type, subtype = _text(structure[0]).lower(), _text(structure[1]).lower()
+    params = _params(structure[2])
+    # Extension data follows the line count for text parts, and the
+    # envelope, body and line count for nested messages
+    if main_type == "text":
+        extension_index = 8
+    elif (main_type, subtype) == ("message", "rfc822"):
+        extension_index = 10
+    else:
+        extension_index = 7
+    disposition, disposition_params = None, {}
+    if len(structure) > extension_index + 1 and structure[extension_index + 1]:
+        disposition_data = structure[extension_index + 1]
+        disposition = _text(disposition_data[0]).lower()
+        disposition_params = _params(disposition_data[1] if len(disposition_data) > 1 else None)
+
+    return [MessagePart(
+        section=section or "1",
+        content_type=f"{main_type}/{subtype}",
+        encoding=(_text(structure[5]) or "7bit").lower(),
+        size=int(structure[6] or 0),
+        charset=params.get("charset"),
+        filename=_filename(disposition_params) or _filename(params),
+        disposition=disposition,
+        content_id=_text(structure[3])
+    )]
+
+
+class TransferDecoder:
+    """Decode a Content-Transfer-Encoding incrementally, for content arriving in arbitrary chunks."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.pending = b""
+
+    def decode(self, chunk: bytes) -> bytes:
+        """Decode a chunk, holding back input that may continue in the next one."""
+        if self.encoding == BASE64:
+            data = self.pending + BASE64_IGNORED.sub(b"", chunk)
+            usable = len(data) - len(data) % 4
+            self.pending = data[usable:]
+            return binascii.a2b_base64(data[:usable]) if usable else b""
+        if self.encoding == QUOTED_PRINTABLE:
+            # Only whole lines, since a soft line break or escape may be split
+            data = self.pending + chunk
+            end = data.rfind(b"\n") + 1
+            self.pending = data[end:]
+            return binascii.a2b_qp(data[:end])
+        return chunk
+
+    def flush(self) -> bytes:
+        """Decode what is left once the content has ended."""
+        pending, self.pending = self.pending, b""
+        if not pending:
+            return b""
+        if self.encoding == BASE64:
+            return binascii.a2b_base64(pending + b"=" * (-len(pending) % 4))
+        if self.encoding == QUOTED_PRINTABLE:
+            return binascii.a2b_qp(pending)
+        return pending
+
+
+class SectionStream:
+    """
+    A readable binary stream over one message part, fetched in chunks and decoded as it is read.
+
+    Only one fetched chunk (plus what the reader has not consumed yet) is
+    held in memory, so a part of any size can be spooled with bounded memory.
+    """
+
+    def __init__(self, fetch_chunk: Callable[[int, int], bytes], size: int, encoding: str, chunk_size: int):
+        """
+        Args:
+            fetch_chunk: Returns up to length encoded bytes of the part from an offset
+            size: Encoded size of the part (from its BODYSTRUCTURE)
+            encoding: Content-Transfer-Encoding of the part
+            chunk_size: Encoded bytes fetched at a time
+        """
+        self.fetch_chunk = fetch_chunk
+        self.size = size
+        self.chunk_size = chunk_size
+        self.decoder = TransferDecoder(encoding)
+        self.offset = 0
+        self.buffer = b""
+        self.finished = False
+
+    def _fill(self) -> None:
+        while not self.buffer and not self.finished:
+            chunk = self.fetch_chunk(self.offset, self.chunk_size)
+            self.offset += len(chunk)
+            if len(chunk) < self.chunk_size or self.offset >= self.size:
+                self.finished = True
+                self.buffer = self.decoder.decode(chunk) + self.decoder.flush()
+            else:
+                self.buffer = self.decoder.decode(chunk)
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size decoded bytes (everything left if size is negative); b"" at the end."""
+        if size is None or size < 0:
+            parts = []
+            while True:
+                self._fill()
+                if not self.buffer:
+                    return b"".join(parts)
+                parts.append(self.buffer)
+                self.buffer = b""
+        self._fill()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
@@ -9,6 +9,7 @@ from imapclient import IMAPClient
 from imapclient.exceptions import IMAPClientError
 
 from src.core.config import settings
+from src.core.imap_parts import MessagePart, SectionStream, message_parts
 
 logger = logging.getLogger(__name__)
 
@@ -168,6 +169,49 @@ class IMAPService:
             logger.error(f"Failed to fetch message body for ID {message_id}: {e}")
             raise
 
+    async def fetch_message_sizes(self, message_ids: List[int]) -> Dict[int, int]:
+        """Fetch the sizes of messages (RFC822.SIZE) in one round trip, before any content."""
+        if not self.client:
+            raise RuntimeError("Not connected to IMAP server")
+        if not message_ids:
+            return {}
+        
+        try:
+            response = self.client.fetch(message_ids, ["RFC822.SIZE"])
+            return {message_id: data[b"RFC822.SIZE"] for message_id, data in response.items()}
+        except Exception as e:
+            logger.error(f"Failed to fetch message sizes: {e}")
+            raise
+
+    async def fetch_message_structure(self, message_id: int) -> List[MessagePart]:
+        """Fetch the MIME structure of a message (BODYSTRUCTURE) without its content."""
+        if not self.client:
+            raise RuntimeError("Not connected to IMAP server")
+        
+        try:
+            response = self.client.fetch([message_id], ["BODYSTRUCTURE"])
+            return message_parts(response[message_id][b"BODYSTRUCTURE"])
+        except Exception as e:
+            logger.error(f"Failed to fetch message structure for ID {message_id}: {e}")
+            raise
+
+    def fetch_section_chunk(self, message_id: int, section: str, offset: int, length: int) -> bytes:
+        """Fetch part of a message section's encoded content (a partial FETCH; the message stays unread)."""
+        if not self.client:
+            raise RuntimeError("Not connected to IMAP server")
+        
+        response = self.client.fetch([message_id], [f"BODY.PEEK[{section}]<{offset}.{length}>"])
+        return response[message_id].get(f"BODY[{section}]<{offset}>".encode("ascii")) or b""
+
+    def open_message_part(self, message_id: int, part: MessagePart) -> SectionStream:
+        """Open a message part as a decoded stream fetched IMAP_FETCH_CHUNK_BYTES at a time."""
+        return SectionStream(
+            lambda offset, length: self.fetch_section_chunk(message_id, part.section, offset, length),
+            part.size,
+            part.encoding,
+            settings.IMAP_FETCH_CHUNK_BYTES
+        )
+
     async def fetch_message_attachments(self, message_id: int) -> List[Dict[str, any]]:
         """Fetch message attachments with content."""
         if not self.client:
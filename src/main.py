@@ -1,7 +1,7 @@
 """Main FastAPI application entry point."""
 
 from fastapi import FastAPI
-from src.api.routes import health
+from src.api.routes import catalog, health, rollups
 
 app = FastAPI(
     title="Microservice Template",
@@ -11,6 +11,8 @@ app = FastAPI(
 
 # Include routers
 app.include_router(health.router)
+app.include_router(catalog.router)
+app.include_router(rollups.router)
 
 @app.get("/")
 async def root():
@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 from typing import Optional
 from uuid import UUID, uuid4
 
 from sqlalchemy import (
+    JSON,
+    BigInteger,
     Boolean,
+    Date,
     DateTime,
+    Identity,
+    Index,
     Integer,
+    LargeBinary,
+    Numeric,
     String,
     Text,
+    UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -40,6 +50,9 @@ class EmailAccount(Base):
 
 class EmailMessage(Base):
     __tablename__ = "email_messages"
+    __table_args__ = (
+        UniqueConstraint("account_id", "uid", name="uq_email_messages_account_id_uid"),
+    )
 
     id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid4)
     account_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False)
@@ -86,6 +99,11 @@ class EmailMessage(Base):
 
 class EmailAttachment(Base):
     __tablename__ = "email_attachments"
+    __table_args__ = (
+        UniqueConstraint(
+            "parent_attachment_id", "archive_member", name="uq_email_attachments_parent_attachment_id_archive_member"
+        ),
+    )
 
     id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid4)
     message_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False)
@@ -100,8 +118,233 @@ class EmailAttachment(Base):
     file_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     content: Mapped[Optional[bytes]] = mapped_column(Text, nullable=True)  # Store base64 encoded content
     
+    # Ingest the attachment content was loaded by (or deduplicated against)
+    ingest_id: Mapped[Optional[UUID]] = mapped_column(PG_UUID(as_uuid=True), nullable=True)
+    
+    # Members of compressed attachments (zip, gzip, ...) are stored as attachments
+    # of the same message, spooled but without database content
+    parent_attachment_id: Mapped[Optional[UUID]] = mapped_column(PG_UUID(as_uuid=True), nullable=True)
+    archive_member: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class AttachmentIngest(Base):
+    """Registry of attachment contents that have already been loaded into a target table."""
+
+    __tablename__ = "attachment_ingests"
+    __table_args__ = (
+        UniqueConstraint("file_hash", "table_name", name="uq_attachment_ingests_file_hash_table_name"),
+    )
+
+    id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid4)
+    file_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    table_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    attachment_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False)
+    rows_inserted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duplicate_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class AttachmentIngestProfile(Base):
+    """Format, headers and (for CSV) encoding and dialect detected once per tabular attachment."""
+
+    __tablename__ = "attachment_ingest_profiles"
+
+    attachment_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True)
+    file_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    encoding: Mapped[str] = mapped_column(String(50), nullable=False)
+    delimiter: Mapped[str] = mapped_column(String(4), nullable=False)
+    headers: Mapped[list] = mapped_column(JSON, nullable=False)
+    column_types: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    file_format: Mapped[str] = mapped_column(String(20), nullable=False, default="csv", server_default="csv")
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class IngestTableSchema(Base):
+    """Column set, types and version of each dynamically created attachment table."""
+
+    __tablename__ = "ingest_table_schemas"
+
+    table_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    columns: Mapped[dict] = mapped_column(JSON, nullable=False)  # data column name -> inferred type
+    natural_key: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)  # columns of the unique index
+    partition_interval: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)  # day/month, None if flat
+    # Rows reference ingest_batches instead of repeating their provenance
+    batch_provenance: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=text("false"))
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class IngestBatch(Base):
+    """Provenance of the rows one attachment load added to a target table; rows carry only the batch id."""
+
+    __tablename__ = "ingest_batches"
+    __table_args__ = (
+        Index("ix_ingest_batches_attachment_id", "attachment_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    attachment_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False)
+    source_filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    attachment_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    rows_inserted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class IngestColumnStats(Base):
+    """Column statistics of one attachment load, computed while its rows were parsed."""
+
+    __tablename__ = "ingest_column_stats"
+    __table_args__ = (
+        Index("ix_ingest_column_stats_table_name_column_name", "table_name", "column_name"),
+        Index("ix_ingest_column_stats_attachment_id", "attachment_id"),
+        Index("ix_ingest_column_stats_ingest_batch_id", "ingest_batch_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    attachment_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), nullable=False)
+    ingest_batch_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # None for row provenance tables
+    column_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    column_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    row_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    null_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    distinct_estimate: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    min_value: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    max_value: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    value_sum: Mapped[Optional[Decimal]] = mapped_column(Numeric, nullable=True)  # numeric columns only
+    hll: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # HyperLogLog registers, merged across loads
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class IngestRollup(Base):
+    """A rollup table maintained from the batches loaded into a target table."""
+
+    __tablename__ = "ingest_rollups"
+
+    name: Mapped[str] = mapped_column(String(63), primary_key=True)  # rollup table name
+    table_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    definition: Mapped[dict] = mapped_column(JSON, nullable=False)  # grain, group_by, measures
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)  # definition and source column types
+    stale: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=text("false"))  # rebuild queued
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class IngestTableFamily(Base):
+    """A union view maintained over a family of ingested tables."""
+
+    __tablename__ = "ingest_table_families"
+
+    name: Mapped[str] = mapped_column(String(63), primary_key=True)  # view name
+    tables: Mapped[list] = mapped_column(JSON, nullable=False)  # member tables the view was built over
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)  # member names and schema versions
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class AttachmentProcessingState(Base):
+    """Ingest status of a CSV attachment; pending and processing rows are found through partial indexes."""
+
+    __tablename__ = "attachment_processing_states"
+    __table_args__ = (
+        Index(
+            "ix_attachment_processing_states_pending",
+            "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index(
+            "ix_attachment_processing_states_processing",
+            "started_at",
+            postgresql_where=text("status = 'processing'"),
+        ),
+    )
+
+    attachment_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    table_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_inserted: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    
+    # Timing
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
-    )
\ No newline at end of file
+    )
+
+
+class OutboxEvent(Base):
+    """Event written in the same transaction as the data it announces, dispatched after commit."""
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_undispatched",
+            "attempts",
+            "created_at",
+            postgresql_where=text("dispatched_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, default=uuid4)
+    event_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    dispatched_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class IngestArchiveFile(Base):
+    """A Parquet file holding rows archived out of an ingested table."""
+
+    __tablename__ = "ingest_archive_files"
+    __table_args__ = (
+        Index("ix_ingest_archive_files_table_name_archive_date", "table_name", "archive_date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    archive_date: Mapped[date] = mapped_column(Date, nullable=False)  # UTC report date of the file's rows
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+    row_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -13,11 +13,12 @@ celery_app = Celery(
         "src.workers.tasks.health_tasks",
         "src.workers.tasks.email_tasks",
         "src.workers.tasks.attachment_processing_tasks",
+        "src.workers.tasks.outbox_tasks",
     ],
 )
 
 # Import task modules to ensure they are registered
-from src.workers.tasks import health_tasks, email_tasks, attachment_processing_tasks
+from src.workers.tasks import health_tasks, email_tasks, attachment_processing_tasks, outbox_tasks
 
 # Configure Celery
 celery_app.conf.update(
@@ -29,6 +30,9 @@ celery_app.conf.update(
     task_track_started=True,
     task_reject_on_worker_lost=True,
     worker_prefetch_multiplier=1,
+    # Soft RSS limit per child, in KiB: a child above it is replaced once its
+    # current task finishes, instead of growing until the host kills it
+    worker_max_memory_per_child=int(os.getenv("WORKER_MAX_MEMORY_PER_CHILD_KB", str(1024 * 1024))),
     result_expires=3600,
     beat_schedule={
         "five-minute-timer": {
@@ -43,9 +47,21 @@ celery_app.conf.update(
             "task": "src.workers.tasks.email_tasks.archive_old_messages",
             "schedule": crontab(hour=2, minute=0, day_of_week=0),  # Weekly on Sunday at 2 AM
         },
+        "dispatch-outbox": {
+            "task": "src.workers.tasks.outbox_tasks.dispatch_outbox",
+            "schedule": 60.0,  # 1 minute; events are normally dispatched right after commit
+        },
         "process-attachments": {
             "task": "src.workers.tasks.attachment_processing_tasks.process_all_attachments",
-            "schedule": 1800.0,  # 30 minutes = 1800 seconds
+            "schedule": 1800.0,  # 30 minutes = 1800 seconds; safety net for stale pending attachments
+        },
+        "expire-attachment-partitions": {
+            "task": "src.workers.tasks.attachment_processing_tasks.expire_attachment_partitions",
+            "schedule": crontab(hour=3, minute=0),  # Daily at 3 AM
+        },
+        "archive-attachment-tables": {
+            "task": "src.workers.tasks.attachment_processing_tasks.archive_attachment_tables",
+            "schedule": crontab(hour=4, minute=0),  # Daily at 4 AM
         },
     },
 )
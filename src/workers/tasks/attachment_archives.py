@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import bz2
+import gzip
+import logging
+import lzma
+import zipfile
+from contextlib import contextmanager
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.core.attachment_storage import ensure_spooled, spool_attachment_stream
+from src.core.config import settings
+from src.models.email import EmailAttachment
+from src.workers.tasks.attachment_routing import routed_format
+from src.workers.tasks.format_readers import CONTENT_TYPES_BY_FORMAT
+
+logger = logging.getLogger(__name__)
+
+# Archive formats by file extension and MIME type
+ZIP = "zip"
+GZIP = "gzip"
+BZIP2 = "bz2"
+XZ = "xz"
+
+ARCHIVE_EXTENSIONS = {
+    ".zip": ZIP,
+    ".gz": GZIP,
+    ".gzip": GZIP,
+    ".bz2": BZIP2,
+    ".xz": XZ,
+}
+ARCHIVE_CONTENT_TYPES = {
+    "application/zip": ZIP,
+    "application/x-zip-compressed": ZIP,
+    "application/gzip": GZIP,
+    "application/x-gzip": GZIP,
+    "application/x-bzip2": BZIP2,
+    "application/x-xz": XZ,
+}
+
+# Single-stream formats decompress to one member
+STREAM_OPENERS = {
+    GZIP: gzip.open,
+    BZIP2: bz2.open,
+    XZ: lzma.open,
+}
+
+
+def archive_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Return the archive format of an attachment, by extension first and then MIME type.
+
+    Args:
+        filename: Attachment filename
+        content_type: Attachment MIME type
+
+    Returns:
+        ZIP, GZIP, BZIP2 or XZ, or None if the attachment is not compressed
+    """
+    suffix = PurePosixPath((filename or "").lower()).suffix
+    if suffix in ARCHIVE_EXTENSIONS:
+        return ARCHIVE_EXTENSIONS[suffix]
+    return ARCHIVE_CONTENT_TYPES.get((content_type or "").lower().split(";")[0].strip())
+
+
+def is_member_ingested(member_name: str) -> bool:
+    """Return whether an archive member is a file type the pipeline ingests (by routing rule or extension)."""
+    path = PurePosixPath(member_name)
+    return not path.name.startswith(".") and "__MACOSX" not in path.parts and routed_format(path.name) is not None
+
+
+@contextmanager
+def open_archive_members(file_path: str, fmt: str, filename: str) -> Iterator[Iterator[Tuple[str, BinaryIO]]]:
+    """
+    Open the members of an archive as decompressing streams.
+
+    Members are decompressed as they are read; nothing is extracted up front.
+
+    Args:
+        file_path: Spool path of the archive
+        fmt: Archive format (see archive_format)
+        filename: Archive filename; names the member of single-stream formats
+
+    Yields:
+        Iterator of (member name, binary stream) pairs; each stream is only
+        valid until the next member is requested
+    """
+    if fmt == ZIP:
+        with zipfile.ZipFile(file_path) as archive:
+            def iter_zip_members() -> Iterator[Tuple[str, BinaryIO]]:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    with archive.open(info) as stream:
+                        yield info.filename, stream
+            yield iter_zip_members()
+    else:
+        # e.g. "prices_2025-07-09.csv.gz" holds "prices_2025-07-09.csv"
+        member_name = PurePosixPath(filename).stem
+        with STREAM_OPENERS[fmt](file_path, "rb") as stream:
+            yield iter([(member_name, stream)])
+
+
+def expand_archive(session: Session, attachment: EmailAttachment) -> List[EmailAttachment]:
+    """
+    Spool the data file members of a compressed attachment and add them as attachments.
+
+    Members become attachments of the same message (with parent_attachment_id
+    and archive_member set), so they are routed to their own tables and
+    processed like any other attachment of their format. Members that were
+    already expanded are skipped, so a re-run only adds what is missing. The
+    caller commits.
+
+    Args:
+        session: Database session
+        attachment: Compressed attachment
+
+    Returns:
+        The newly added member attachments
+    """
+    fmt = archive_format(attachment.filename, attachment.content_type)
+    file_path = ensure_spooled(attachment)
+    if not fmt or not file_path:
+        return []
+
+    expanded = {
+        name for (name,) in session.query(EmailAttachment.archive_member).filter(
+            EmailAttachment.parent_attachment_id == attachment.id
+        )
+    }
+
+    members = []
+    with open_archive_members(file_path, fmt, attachment.filename) as archive_members:
+        for member_name, stream in archive_members:
+            if member_name in expanded or not is_member_ingested(member_name):
+                continue
+            member_path, member_hash, size = spool_attachment_stream(stream, settings.ARCHIVE_MAX_MEMBER_BYTES)
+            member = EmailAttachment(
+                message_id=attachment.message_id,
+                filename=PurePosixPath(member_name).name[:255],
+                content_type=CONTENT_TYPES_BY_FORMAT[routed_format(PurePosixPath(member_name).name)],
+                size=size,
+                file_path=member_path,
+                file_hash=member_hash,
+                parent_attachment_id=attachment.id,
+                archive_member=member_name
+            )
+            session.add(member)
+            members.append(member)
+            logger.info(f"Expanded {member_name} ({size} bytes) from attachment {attachment.id}")
+
+    session.flush(members)
+    return members
+
+
+def respool_archive_member(session: Session, attachment: EmailAttachment) -> Optional[str]:
+    """
+    Spool a member attachment again from its archive (e.g. on a host without the spool file).
+
+    Args:
+        session: Database session
+        attachment: Member attachment
+
+    Returns:
+        Path of the spool file, or None if the attachment is not an archive member
+    """
+    if not attachment.parent_attachment_id:
+        return None
+    parent = session.get(EmailAttachment, attachment.parent_attachment_id)
+    fmt = archive_format(parent.filename, parent.content_type) if parent else None
+    file_path = ensure_spooled(parent) if fmt else None
+    if not file_path:
+        return None
+
+    with open_archive_members(file_path, fmt, parent.filename) as archive_members:
+        for member_name, stream in archive_members:
+            if member_name == attachment.archive_member:
+                member_path, _, _ = spool_attachment_stream(stream, settings.ARCHIVE_MAX_MEMBER_BYTES)
+                attachment.file_path = member_path
+                return member_path
+    return None
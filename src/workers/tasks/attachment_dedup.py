@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from src.models.email import AttachmentIngest, EmailAttachment
+
+logger = logging.getLogger(__name__)
+
+
+def find_existing_ingest(session: Session, file_hash: str, table_name: str) -> Optional[AttachmentIngest]:
+    """
+    Look up an earlier ingest of the same content into the same target table.
+
+    Args:
+        session: Database session
+        file_hash: Content hash of the attachment
+        table_name: Target table name
+
+    Returns:
+        The earlier ingest or None
+    """
+    return session.query(AttachmentIngest).filter(
+        AttachmentIngest.file_hash == file_hash,
+        AttachmentIngest.table_name == table_name
+    ).first()
+
+
+def link_duplicate(session: Session, attachment: EmailAttachment, ingest: AttachmentIngest) -> None:
+    """
+    Link a duplicate attachment to the ingest that already loaded its content.
+
+    Args:
+        session: Database session
+        attachment: Duplicate attachment
+        ingest: Earlier ingest of the same content
+    """
+    attachment.ingest_id = ingest.id
+    session.query(AttachmentIngest).filter(AttachmentIngest.id == ingest.id).update(
+        {AttachmentIngest.duplicate_count: AttachmentIngest.duplicate_count + 1},
+        synchronize_session=False
+    )
+    logger.info(
+        f"Attachment {attachment.id} duplicates ingest {ingest.id} "
+        f"(attachment {ingest.attachment_id}) into {ingest.table_name}, skipping"
+    )
+
+
+def record_ingest(
+    session: Session,
+    attachment: EmailAttachment,
+    file_hash: str,
+    table_name: str,
+    rows_inserted: int
+) -> AttachmentIngest:
+    """
+    Register the ingest of an attachment's content into a target table.
+
+    The registry row is written in the caller's transaction so that it commits
+    atomically with the inserted data. A concurrent ingest of the same content
+    wins the unique constraint and this attachment is linked to it instead.
+
+    Args:
+        session: Database session
+        attachment: Ingested attachment
+        file_hash: Content hash of the attachment
+        table_name: Target table name
+        rows_inserted: Number of rows loaded
+
+    Returns:
+        The registry entry the attachment is linked to
+    """
+    statement = insert(AttachmentIngest).values(
+        file_hash=file_hash,
+        table_name=table_name,
+        attachment_id=attachment.id,
+        rows_inserted=rows_inserted,
+        duplicate_count=0
+    ).on_conflict_do_nothing(constraint="uq_attachment_ingests_file_hash_table_name")
+    session.execute(statement)
+
+    ingest = find_existing_ingest(session, file_hash, table_name)
+    attachment.ingest_id = ingest.id
+    return ingest
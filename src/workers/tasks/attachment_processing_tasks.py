@@ -1,119 +1,262 @@
 from __future__ import annotations
 
-import csv
-import io
 import logging
-import re
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from uuid import UUID
 
-import chardet
-import pandas as pd
-from celery.exceptions import Retry
-from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from celery import Signature, chord, group
+from celery.exceptions import Ignore
+from psycopg2.errors import UndefinedColumn, UndefinedTable
+from sqlalchemy import BigInteger, Column, DateTime, Identity, Integer, MetaData, Table, create_engine, text
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import sessionmaker
 
+from src.core.attachment_storage import ensure_spooled
 from src.core.config import settings
-from src.models.email import EmailAttachment, EmailMessage
+from src.models.email import EmailAttachment, IngestBatch, IngestTableSchema
 from src.workers.celery_app import celery_app
+from src.workers.tasks.attachment_archives import archive_format, expand_archive
+from src.workers.tasks.attachment_dedup import (
+    find_existing_ingest,
+    link_duplicate,
+    record_ingest,
+)
+from src.workers.tasks.attachment_routing import resolve_route
+from src.workers.tasks.bulk_loader import BulkLoader
+from src.workers.tasks.catalog import drop_family_views, refresh_table_families
+from src.workers.tasks.cold_archive import archive_table_rows
+from src.workers.tasks.column_stats import ColumnProfiler, record_column_stats
+from src.workers.tasks.csv_ingest import IngestUnit
+from src.workers.tasks.csv_ranges import (
+    create_range_stage,
+    drop_range_stages,
+    plan_csv_ranges,
+    range_stage_table,
+)
+from src.workers.tasks.ingest_batches import (
+    allocate_ingest_batch_id,
+    create_ingest_batch_index,
+    delete_ingest_batch,
+    record_ingest_batch,
+    row_metadata,
+)
+from src.workers.tasks.natural_keys import natural_key_for, partitioned_natural_key
+from src.workers.tasks.outbox import (
+    ATTACHMENT_STORED,
+    ROLLUP_STALE,
+    add_outbox_event,
+    dispatch_outbox_events,
+    register_outbox_handler,
+)
+from src.workers.tasks.partitions import (
+    PARTITION_COLUMN,
+    create_default_partition,
+    ensure_partition,
+    expire_partitions,
+    partition_interval,
+    utc_datetime,
+)
+from src.workers.tasks.processing_state import (
+    DUPLICATE,
+    EXPANDED,
+    create_processing_state,
+    fail_stale_attachments,
+    is_processing_finished,
+    mark_processing_completed,
+    mark_processing_started,
+    query_pending_attachments,
+    record_processing_error,
+)
+from src.workers.tasks.rollups import apply_rollups, rebuild_rollup, refresh_rollup_period
+from src.workers.tasks.row_hashes import ROW_HASH_COLUMN, row_hash_enabled, with_row_hashes
+from src.workers.tasks.schema_registry import (
+    BATCH_METADATA_COLUMNS,
+    apply_natural_key,
+    computed_columns,
+    create_natural_key_index,
+    evolve_table_schema,
+    get_table_schema,
+    invalidate_table_schema,
+    lock_table_schema,
+    metadata_columns,
+    quote_identifier,
+    quote_identifiers,
+    record_widened_columns,
+    register_table_schema,
+    widen_table_columns,
+)
+from src.workers.tasks.type_inference import TEXT, TYPE_INFERENCE_SAMPLE_ROWS, sql_type_for
 
 logger = logging.getLogger(__name__)
 
 # Database setup
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-metadata = MetaData()
 
 
-def sanitize_table_name(filename: str) -> str:
+def skip_duplicate_attachment(session, attachment: EmailAttachment, table_name: str) -> Optional[Dict[str, any]]:
     """
-    Convert a filename to a valid PostgreSQL table name.
+    Skip an attachment that was already ingested, or whose content was already
+    ingested into the target table.
+    
+    Attachments can be queued more than once (outbox redelivery, the periodic
+    sweep), so finished attachments are skipped first. The content hash is
+    taken from the attachment record when it was computed at sync time;
+    otherwise the attachment is spooled, which computes and stores it.
     
     Args:
-        filename: Original filename
+        session: Database session
+        attachment: Attachment to check
+        table_name: Target table name
         
     Returns:
-        Sanitized table name
-    """
-    # Remove file extension
-    base_name = Path(filename).stem
-    
-    # Remove date patterns (YYYY-MM-DD, YYYY_MM_DD, MM-DD-YYYY, etc.)
-    date_patterns = [
-        r'\d{4}-\d{1,2}-\d{1,2}',  # YYYY-MM-DD
-        r'\d{4}_\d{1,2}_\d{1,2}',  # YYYY_MM_DD
-        r'\d{1,2}-\d{1,2}-\d{4}',  # MM-DD-YYYY
-        r'\d{1,2}_\d{1,2}_\d{4}',  # MM_DD_YYYY
-        r'\d{8}',                   # YYYYMMDD
-    ]
+        Result dict when the attachment was skipped, otherwise None
+    """
+    if is_processing_finished(session, attachment):
+        logger.info(f"Attachment {attachment.id} was already processed, skipping")
+        return {
+            'status': 'already_processed',
+            'attachment_id': str(attachment.id),
+            'table_name': table_name
+        }
+    
+    if not attachment.file_hash and not ensure_spooled(attachment):
+        return None
+    
+    ingest = find_existing_ingest(session, attachment.file_hash, table_name)
+    if not ingest or ingest.attachment_id == attachment.id:
+        return None
     
-    for pattern in date_patterns:
-        base_name = re.sub(pattern, '', base_name)
+    link_duplicate(session, attachment, ingest)
+    mark_processing_completed(session, attachment, rows_inserted=0, status=DUPLICATE, table_name=table_name)
+    session.commit()
     
-    # Replace hyphens, spaces, and dots with underscores
-    base_name = re.sub(r'[-\s\.]+', '_', base_name)
+    return {
+        'status': 'duplicate',
+        'attachment_id': str(attachment.id),
+        'table_name': table_name,
+        'duplicate_of_attachment_id': str(ingest.attachment_id),
+        'ingest_id': str(ingest.id)
+    }
+
+
+def route_by_size(signature: Signature, size: Optional[int]) -> Signature:
+    """
+    Send the task of an attachment larger than LARGE_ATTACHMENT_BYTES to the large-task queue.
     
-    # Remove non-alphanumeric characters except underscores
-    base_name = re.sub(r'[^a-zA-Z0-9_]', '', base_name)
+    Its workers run one child each with a higher memory limit, so an outlier
+    does not share a host's memory with the regular ingest children.
     
-    # Ensure it starts with a letter or underscore
-    if base_name and not re.match(r'^[a-zA-Z_]', base_name):
-        base_name = f'table_{base_name}'
+    Args:
+        signature: Task of the attachment's pipeline
+        size: Attachment size in bytes (None if unknown)
+        
+    Returns:
+        The signature, with its queue set for large attachments
+    """
+    if size is not None and size > settings.LARGE_ATTACHMENT_BYTES:
+        return signature.set(queue=settings.LARGE_TASK_QUEUE)
+    return signature
+
+
+def attachment_pipeline(
+    attachment_id: str,
+    filename: str,
+    content_type: Optional[str] = None,
+    size: Optional[int] = None
+) -> Signature:
+    """
+    Build the ingest pipeline for one attachment.
     
-    # Remove consecutive underscores and trim
-    base_name = re.sub(r'_+', '_', base_name).strip('_')
+    Compressed attachments are expanded into member attachments, which get
+    their own pipelines; CSV attachments start with table creation.
     
-    # Ensure minimum length and lowercase
-    if not base_name:
-        base_name = 'processed_attachment'
+    Args:
+        attachment_id: UUID of the attachment
+        filename: Attachment filename
+        content_type: Attachment MIME type
+        size: Attachment size in bytes; large attachments go to the large-task queue
+        
+    Returns:
+        Signature of the pipeline's first task
+    """
+    if archive_format(filename, content_type):
+        return route_by_size(expand_archive_attachment.si(attachment_id), size)
     
-    return base_name.lower()
+    # Route by filename to the target table and report date
+    route = resolve_route(filename)
+    return route_by_size(create_table_for_attachment.si(attachment_id, route.table_name, route.attachment_date), size)
 
 
-def extract_date_from_filename(filename: str) -> Optional[datetime]:
+def queue_attachment_ingest(
+    attachment_id: str,
+    filename: str,
+    content_type: Optional[str] = None,
+    size: Optional[int] = None
+) -> Tuple[Optional[str], Optional[datetime]]:
     """
-    Extract date from filename.
+    Queue the ingest pipeline for one attachment.
     
     Args:
-        filename: Filename to parse
+        attachment_id: UUID of the attachment
+        filename: Attachment filename
+        content_type: Attachment MIME type
+        size: Attachment size in bytes
         
     Returns:
-        Extracted date or None
-    """
-    date_patterns = [
-        (r'(\d{4})-(\d{1,2})-(\d{1,2})', '%Y-%m-%d'),      # YYYY-MM-DD
-        (r'(\d{4})_(\d{1,2})_(\d{1,2})', '%Y_%m_%d'),      # YYYY_MM_DD
-        (r'(\d{1,2})-(\d{1,2})-(\d{4})', '%m-%d-%Y'),      # MM-DD-YYYY
-        (r'(\d{1,2})_(\d{1,2})_(\d{4})', '%m_%d_%Y'),      # MM_DD_YYYY
-        (r'(\d{4})(\d{2})(\d{2})', '%Y%m%d'),              # YYYYMMDD
-    ]
+        Tuple of (table name, attachment date); the table name is None for archives
+    """
+    attachment_pipeline(attachment_id, filename, content_type, size).delay()
     
-    for pattern, format_str in date_patterns:
-        match = re.search(pattern, filename)
-        if match:
-            try:
-                if len(match.groups()) == 3:
-                    date_str = format_str.replace('%Y', match.group(1)).replace('%m', match.group(2)).replace('%d', match.group(3))
-                    date_str = date_str.replace('_%m_%d', f'_{match.group(2)}_{match.group(3)}')
-                    date_str = date_str.replace('-%m-%d', f'-{match.group(2)}-{match.group(3)}')
-                    return datetime.strptime(date_str, format_str.replace('(%Y)', match.group(1)).replace('(%m)', match.group(2)).replace('(%d)', match.group(3)))
-                else:
-                    date_str = ''.join(match.groups())
-                    return datetime.strptime(date_str, format_str.replace('(', '').replace(')', ''))
-            except ValueError:
-                continue
+    if archive_format(filename, content_type):
+        return None, None
+    route = resolve_route(filename)
+    return route.table_name, route.attachment_date
+
+
+def replace_with_load(task, load: Signature) -> Dict[str, any]:
+    """
+    Replace a running task with the load task, so the load result becomes its result.
+    
+    Eager calls run the load inline: Celery's replace() refuses to wait on
+    the replacement when the task was started with delay() in eager mode.
     
-    return None
+    Args:
+        task: Bound task being replaced
+        load: Signature of the load task
+        
+    Returns:
+        The load result (eager only; otherwise Ignore is raised)
+    """
+    if task.request.is_eager:
+        return load.apply().get(disable_sync_subtasks=False)
+    return task.replace(load)
+
+
+@register_outbox_handler(ATTACHMENT_STORED)
+def handle_attachment_stored(payload: Dict[str, any]) -> None:
+    """Queue the ingest of a CSV or compressed attachment as soon as its message is committed."""
+    table_name, _ = queue_attachment_ingest(
+        payload['attachment_id'], payload['filename'], payload.get('content_type'), payload.get('size')
+    )
+    logger.info(f"Queued ingest for new attachment: {payload['filename']} -> {table_name or 'archive members'}")
 
 
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
-def extract_attachment_information(self) -> Dict[str, any]:
+def extract_attachment_information(self, queue_ingest: bool = True) -> Dict[str, any]:
     """
     Task 1: Extract attachment information from unprocessed attachments.
     
+    New attachments are queued from the outbox as soon as they are stored;
+    this sweep is a safety net for attachments still pending after the grace
+    period (ATTACHMENT_SWEEP_GRACE_MINUTES), and for attachments whose worker
+    was lost mid-ingest (still processing after ATTACHMENT_STALE_PROCESSING_MINUTES),
+    which are retried up to ATTACHMENT_MAX_ATTEMPTS attempts.
+    
+    Args:
+        queue_ingest: Queue each attachment's pipeline; False only lists them
+            (for dispatch_attachment_ingest)
+    
     Returns:
         Dict with extraction results
     """
@@ -121,26 +264,36 @@ def extract_attachment_information(self) -> Dict[str, any]:
     try:
         logger.info("Starting attachment information extraction...")
         
-        # Query for unprocessed CSV attachments
-        unprocessed_attachments = session.query(EmailAttachment).join(
-            EmailMessage, EmailAttachment.message_id == EmailMessage.id
-        ).filter(
-            EmailMessage.processing_status.in_(['completed', 'pending']),
-            (EmailAttachment.content_type.like('%csv%') | 
-             EmailAttachment.filename.like('%.csv')),
-            ~EmailAttachment.filename.like('%PROCESSED%')  # Skip already processed
-        ).all()
+        # Give up on attachments lost on their last allowed attempt
+        stale_after = timedelta(minutes=settings.ATTACHMENT_STALE_PROCESSING_MINUTES)
+        if queue_ingest:
+            failed = fail_stale_attachments(session, stale_after, settings.ATTACHMENT_MAX_ATTEMPTS)
+            session.commit()
+            if failed:
+                logger.warning(f"Marked {failed} attachments failed after losing their worker on the last attempt")
+        
+        # Query for unprocessed CSV attachments (index scans on pending and processing states)
+        unprocessed_attachments = query_pending_attachments(
+            session,
+            older_than=timedelta(minutes=settings.ATTACHMENT_SWEEP_GRACE_MINUTES),
+            stale_after=stale_after,
+            max_attempts=settings.ATTACHMENT_MAX_ATTEMPTS
+        )
         
         logger.info(f"Found {len(unprocessed_attachments)} unprocessed CSV attachments")
         
         results = []
         for attachment in unprocessed_attachments:
             try:
-                # Extract table name from filename
-                table_name = sanitize_table_name(attachment.filename)
-                
-                # Extract date from filename
-                attachment_date = extract_date_from_filename(attachment.filename)
+                if queue_ingest:
+                    # Queue table creation (or archive expansion) task
+                    table_name, attachment_date = queue_attachment_ingest(
+                        str(attachment.id), attachment.filename, attachment.content_type, attachment.size
+                    )
+                elif archive_format(attachment.filename, attachment.content_type):
+                    table_name, attachment_date = None, None
+                else:
+                    table_name, attachment_date, _, _ = resolve_route(attachment.filename)
                 
                 attachment_info = {
                     'attachment_id': str(attachment.id),
@@ -153,10 +306,7 @@ def extract_attachment_information(self) -> Dict[str, any]:
                 
                 results.append(attachment_info)
                 
-                # Queue table creation task
-                create_table_for_attachment.delay(str(attachment.id), table_name, attachment_date)
-                
-                logger.info(f"Queued table creation for attachment: {attachment.filename} -> {table_name}")
+                logger.info(f"Found attachment: {attachment.filename} -> {table_name}")
                 
             except Exception as e:
                 logger.error(f"Failed to process attachment {attachment.id}: {e}")
@@ -176,11 +326,77 @@ def extract_attachment_information(self) -> Dict[str, any]:
         session.close()
 
 
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def expand_archive_attachment(self, attachment_id: str) -> Dict[str, any]:
+    """
+    Decompress a zip, gzip, bz2 or xz attachment and queue its CSV members.
+    
+    Members are streamed into the spool and stored as attachments of the
+    same message, each with a pending state and an outbox event committed
+    together; their pipelines route them to tables by member filename.
+    
+    Args:
+        attachment_id: UUID of the compressed attachment
+        
+    Returns:
+        Dict with the expanded members
+    """
+    session = SessionLocal()
+    try:
+        logger.info(f"Expanding compressed attachment {attachment_id}")
+        
+        attachment = session.query(EmailAttachment).filter(EmailAttachment.id == attachment_id).first()
+        if not attachment:
+            raise ValueError(f"Attachment {attachment_id} not found")
+        
+        if is_processing_finished(session, attachment):
+            logger.info(f"Attachment {attachment_id} was already expanded, skipping")
+            return {'status': 'already_processed', 'attachment_id': attachment_id}
+        
+        mark_processing_started(session, attachment, None)
+        members = expand_archive(session, attachment)
+        outbox_events = []
+        for member in members:
+            create_processing_state(session, member)
+            outbox_events.append(add_outbox_event(session, ATTACHMENT_STORED, {
+                'attachment_id': str(member.id),
+                'filename': member.filename,
+                'content_type': member.content_type,
+                'size': member.size
+            }))
+        mark_processing_completed(session, attachment, rows_inserted=0, status=EXPANDED)
+        session.commit()
+        
+        # Start the members' ingest right away; dispatch_outbox retries the rest
+        dispatch_outbox_events(session, [event.id for event in outbox_events])
+        logger.info(f"Expanded {len(members)} members from {attachment.filename}")
+        
+        return {
+            'status': 'expanded',
+            'attachment_id': attachment_id,
+            'members': [
+                {'attachment_id': str(member.id), 'filename': member.archive_member, 'size': member.size}
+                for member in members
+            ]
+        }
+        
+    except Exception as e:
+        logger.error(f"Expanding attachment {attachment_id} failed: {e}")
+        session.rollback()
+        record_processing_error(session, attachment_id, e, final=self.request.retries >= self.max_retries)
+        raise
+    finally:
+        session.close()
+
+
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
 def create_table_for_attachment(self, attachment_id: str, table_name: str, attachment_date: Optional[datetime] = None) -> Dict[str, any]:
     """
     Task 2: Create tables dynamically based on CSV attachment headers.
     
+    The task then replaces itself with process_csv_data, so its result (and
+    that of any chain or chord it is part of) is the load result.
+    
     Args:
         attachment_id: UUID of the attachment
         table_name: Sanitized table name
@@ -198,110 +414,150 @@ def create_table_for_attachment(self, attachment_id: str, table_name: str, attac
         if not attachment:
             raise ValueError(f"Attachment {attachment_id} not found")
         
-        # Check if table already exists
-        table_exists_query = text("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = :table_name
-            )
-        """)
+        # Skip content that was already loaded into this table
+        duplicate_result = skip_duplicate_attachment(session, attachment, table_name)
+        if duplicate_result:
+            return duplicate_result
         
-        table_exists = session.execute(table_exists_query, {'table_name': table_name}).scalar()
+        mark_processing_started(session, attachment, table_name)
         
-        if table_exists:
-            logger.info(f"Table {table_name} already exists, skipping creation")
-            # Queue CSV processing
-            process_csv_data.delay(attachment_id, table_name, attachment_date)
-            return {
-                'status': 'table_exists',
-                'table_name': table_name,
-                'attachment_id': attachment_id
-            }
+        # Decode, detect and parse the attachment once for the whole pipeline
+        unit = IngestUnit.prepare(session, attachment)
+        session.commit()
+        profile = unit.to_dict() if unit and unit.headers else None
         
-        # Read CSV headers from attachment
-        headers = []
+        # Check the schema registry (worker cache first) for the table; a miss is
+        # re-checked under the table lock so concurrent tasks create it once
+        table_schema = get_table_schema(session, table_name)
+        if table_schema is None:
+            lock_table_schema(session, table_name)
+            table_schema = get_table_schema(session, table_name, refresh=True)
         
-        if attachment.content:
-            import base64
-            from src.workers.tasks.csv_file_reader import CSVFileReader
-            
-            try:
-                # Decode and parse CSV headers
-                csv_content = base64.b64decode(attachment.content)
-                headers, encoding, delimiter = CSVFileReader.parse_csv_headers(csv_content)
-                
-                if not headers:
-                    raise ValueError("No headers found in CSV")
-                    
-                logger.info(f"Found {len(headers)} headers in CSV: {headers}")
-                
-            except Exception as e:
-                logger.warning(f"Failed to parse CSV headers: {e}, using defaults")
-                # Fallback to defaults based on filename
-                if 'price' in attachment.filename.lower() or 'stock' in attachment.filename.lower():
-                    headers = ['symbol', 'price', 'volume', 'change', 'percent_change']
-                elif 'report' in attachment.filename.lower():
-                    headers = ['date', 'category', 'amount', 'description', 'status']
-                else:
-                    headers = ['column1', 'column2', 'column3', 'column4', 'column5']
+        if table_schema:
+            session.commit()
+            logger.info(f"Table {table_name} already exists, skipping creation")
+            # Continue with CSV processing
+            load = process_csv_data.si(attachment_id, table_name, attachment_date, profile)
+            return replace_with_load(self, route_by_size(load, attachment.size))
+        
+        # Read headers from the ingest unit
+        if profile:
+            headers = unit.headers
+            logger.info(f"Found {len(headers)} headers in CSV: {headers}")
+        elif unit:
+            logger.warning("Failed to parse CSV headers, using defaults")
+            # Fallback to defaults based on filename
+            if 'price' in attachment.filename.lower() or 'stock' in attachment.filename.lower():
+                headers = ['symbol', 'price', 'volume', 'change', 'percent_change']
+            elif 'report' in attachment.filename.lower():
+                headers = ['date', 'category', 'amount', 'description', 'status']
+            else:
+                headers = ['column1', 'column2', 'column3', 'column4', 'column5']
         else:
             logger.warning("No content in attachment, using default headers")
             headers = ['column1', 'column2', 'column3', 'column4', 'column5']
         
-        # Create table dynamically
-        columns = [Column('id', String, primary_key=True, default=text('gen_random_uuid()'))]
+        # Create table dynamically; ids are generated by the database since rows
+        # are inserted with raw statements that bypass client-side defaults.
+        # Partitioned tables cannot have a primary key without the partition
+        # column (which may be NULL), so there id is only generated. Row hash
+        # tables are not partitioned, since their unique row_hash index could
+        # then only deduplicate rows of the same report date
+        row_hash = row_hash_enabled(table_name)
+        interval = None if row_hash else partition_interval()
+        columns = [Column('id', BigInteger, Identity(), primary_key=not interval, nullable=False)]
         
-        # Add columns for each CSV header
+        # Add columns for each CSV header, typed from the sampled rows (Text if unknown);
+        # headers are already cleaned to identifiers, so columns are named after them
+        column_types = unit.column_types if profile else {}
         for header in headers:
-            sanitized_header = sanitize_table_name(header)
-            columns.append(Column(sanitized_header, Text))
+            columns.append(Column(header, sql_type_for(column_types.get(header))))
         
-        # Add metadata columns
+        # Add metadata columns; the rest of the provenance is kept once per
+        # load in ingest_batches
         columns.extend([
-            Column('insertion_timestamp', DateTime(timezone=True), default=datetime.utcnow),
             Column('attachment_date', DateTime(timezone=True)),
-            Column('source_attachment_id', String),
-            Column('source_filename', String)
+            Column('ingest_batch_id', Integer)
         ])
+        if row_hash:
+            columns.append(Column(ROW_HASH_COLUMN, PG_UUID))
         
-        # Create the table
-        table = Table(table_name, metadata, *columns)
-        table.create(engine)
+        # Natural key (the row hash, configured or inferred from the sampled rows)
+        # so re-runs and overlapping reports are merged instead of duplicated
+        natural_key = [ROW_HASH_COLUMN] if row_hash else None
+        if profile and not row_hash:
+            with unit.open() as csv_content:
+                sample_rows = next(unit.iter_batches(csv_content, TYPE_INFERENCE_SAMPLE_ROWS), [])
+            natural_key = natural_key_for(table_name, headers, column_types, sample_rows)
+            if natural_key and not set(natural_key) <= set(headers) | set(BATCH_METADATA_COLUMNS):
+                logger.warning(f"Natural key {natural_key} for {table_name} names unknown columns, ignoring")
+                natural_key = None
+            if natural_key and interval:
+                natural_key = partitioned_natural_key(natural_key)
         
-        logger.info(f"Successfully created table {table_name} with {len(headers)} data columns")
+        # Create and register the table in one transaction (fresh MetaData so a
+        # worker can create the same name twice); partitioned tables get a
+        # default partition for rows without a date
+        partition_options = {'postgresql_partition_by': f'RANGE ({PARTITION_COLUMN})'} if interval else {}
+        table = Table(table_name, MetaData(), *columns, **partition_options)
+        table.create(session.connection(), checkfirst=True)
+        if interval:
+            create_default_partition(session, table_name)
+        create_ingest_batch_index(session, table_name)
+        if natural_key:
+            create_natural_key_index(session, table_name, natural_key)
+        register_table_schema(
+            session, table_name, {header: column_types.get(header, TEXT) for header in headers}, natural_key, interval,
+            batch_provenance=True
+        )
+        session.commit()
         
-        # Queue CSV processing
-        process_csv_data.delay(attachment_id, table_name, attachment_date)
+        logger.info(
+            f"Successfully created table {table_name} with {len(headers)} data columns "
+            f"(natural key: {natural_key}, partitioned by: {interval})"
+        )
         
-        return {
-            'status': 'created',
-            'table_name': table_name,
-            'attachment_id': attachment_id,
-            'columns_created': len(headers),
-            'headers': headers
-        }
+        # Continue with CSV processing
+        load = process_csv_data.si(attachment_id, table_name, attachment_date, profile)
+        return replace_with_load(self, route_by_size(load, attachment.size))
         
+    except Ignore:
+        # Raised by replace() once process_csv_data is queued
+        raise
     except Exception as e:
         logger.error(f"Table creation failed for attachment {attachment_id}: {e}")
+        session.rollback()
+        record_processing_error(session, attachment_id, e, final=self.request.retries >= self.max_retries)
         raise
     finally:
         session.close()
 
 
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
-def process_csv_data(self, attachment_id: str, table_name: str, attachment_date: Optional[datetime] = None) -> Dict[str, any]:
+def process_csv_data(
+    self,
+    attachment_id: str,
+    table_name: str,
+    attachment_date: Optional[datetime] = None,
+    profile: Optional[Dict[str, any]] = None
+) -> Dict[str, any]:
     """
     Task 3: Process and insert CSV data into the corresponding table.
     
+    Files of at least PARALLEL_INGEST_MIN_BYTES are split into byte ranges at
+    record boundaries; the task then replaces itself with a chord of
+    load_csv_range tasks and finalize_csv_ranges, whose result is the load result.
+    
     Args:
         attachment_id: UUID of the attachment
         table_name: Target table name
         attachment_date: Date extracted from filename
+        profile: Ingest profile detected by create_table_for_attachment
         
     Returns:
         Dict with processing results
     """
+    attachment_date = utc_datetime(attachment_date)
     session = SessionLocal()
     try:
         logger.info(f"Processing CSV data for attachment {attachment_id} into table {table_name}")
@@ -311,153 +567,632 @@ def process_csv_data(self, attachment_id: str, table_name: str, attachment_date:
         if not attachment:
             raise ValueError(f"Attachment {attachment_id} not found")
         
-        # Read actual CSV content from the attachment
-        if attachment.content:
-            import base64
-            from src.workers.tasks.csv_file_reader import CSVFileReader
-            
-            # Decode base64 content
-            try:
-                csv_content = base64.b64decode(attachment.content)
-                
-                # Parse CSV
-                headers, encoding, delimiter = CSVFileReader.parse_csv_headers(csv_content)
-                csv_data = CSVFileReader.parse_csv_data(csv_content, headers, encoding, delimiter)
-                
-                logger.info(f"Parsed {len(csv_data)} rows from CSV with headers: {headers}")
-            except Exception as e:
-                logger.error(f"Failed to parse CSV content: {e}")
-                csv_data = []
-        else:
-            logger.warning(f"No content found for attachment {attachment_id}, using mock data")
-            csv_data = []
-        
-        # Get table column info to generate appropriate data
-        columns_query = text(f"""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name = '{table_name}' 
-            AND column_name NOT IN ('id', 'insertion_timestamp', 'attachment_date', 'source_attachment_id', 'source_filename')
-            ORDER BY ordinal_position
-        """)
-        
-        result = session.execute(columns_query)
-        data_columns = [row[0] for row in result.fetchall()]
-        
-        # Generate sample data based on column names
-        for i in range(5):  # Generate 5 sample rows
-            row = []
-            for col in data_columns:
-                if 'price' in col.lower() or 'amount' in col.lower():
-                    row.append(f"{100.50 + i * 10.25:.2f}")
-                elif 'volume' in col.lower():
-                    row.append(str(1000 + i * 500))
-                elif 'symbol' in col.lower():
-                    row.append(f"STOCK{i+1}")
-                elif 'date' in col.lower() or 'timestamp' in col.lower():
-                    row.append(f"2025-07-{9+i:02d}")
-                elif 'percent' in col.lower() or 'change' in col.lower():
-                    row.append(f"{1.5 + i * 0.3:.2f}%")
-                else:
-                    row.append(f"value_{col}_{i+1}")
-            mock_csv_data.append(row)
+        # Skip content that was already loaded into this table
+        duplicate_result = skip_duplicate_attachment(session, attachment, table_name)
+        if duplicate_result:
+            return duplicate_result
         
-        # Insert data into the table
-        insert_count = 0
-        data_to_insert = csv_data if csv_data else mock_csv_data
+        # Retries count as new attempts; the first run continues create_table's attempt
+        mark_processing_started(session, attachment, table_name, count_attempt=self.request.retries > 0)
         
-        for row_dict in data_to_insert:
-            try:
-                # Build insert statement dynamically
-                data_column_placeholders = ', '.join([f':{col}' for col in data_columns])
-                data_column_names = ', '.join(data_columns)
+        # Reuse the detected profile instead of decoding and parsing again
+        unit = IngestUnit.prepare(session, attachment, profile)
+        
+        # Add columns for new headers so no CSV column is dropped; committed
+        # right away to release the table lock before loading
+        table_schema = None
+        if unit and unit.headers:
+            table_schema = evolve_table_schema(session, table_name, unit.headers, unit.column_types)
+            configured_key = settings.INGEST_NATURAL_KEYS.get(table_name)
+            if configured_key and not table_schema.natural_key:
+                table_schema = apply_natural_key(session, table_name, configured_key)
+        session.commit()
+        
+        # Create the partition for the report date in its own short transaction,
+        # since it locks the table exclusively
+        if table_schema and ensure_partition(session, table_name, table_schema.partition_interval, attachment_date):
+            session.commit()
+        
+        # Large files are parsed and loaded in parallel, then merged in one transaction
+        ranges = plan_csv_ranges(unit) if unit and unit.headers else None
+        if ranges:
+            load_columns = [header for header in unit.headers if header in table_schema.columns]
+            inserted_at = datetime.utcnow()
+            ingest_batch_id = allocate_ingest_batch_id(session) if table_schema.batch_provenance else None
+            drop_range_stages(session, attachment_id)
+            session.commit()
+            logger.info(f"Loading attachment {attachment_id} in {len(ranges)} parallel ranges")
+            
+            range_loads = group(
+                load_csv_range.si(
+                    attachment_id, table_name, attachment_date, unit.to_dict(),
+                    index, start, end, load_columns, inserted_at, ingest_batch_id
+                )
+                for index, (start, end) in enumerate(ranges)
+            )
+            return replace_with_load(
+                self, chord(range_loads, finalize_csv_ranges.s(
+                    attachment_id, table_name, attachment_date, load_columns, ingest_batch_id
+                ))
+            )
+        
+        # Stream CSV content from the attachment into the table batch by batch
+        loader = None
+        profiler = None
+        ingest_batch_id = None
+        if unit and unit.headers:
+            with unit.open() as csv_content:
+                headers = unit.headers
+                logger.info(f"Streaming CSV rows with headers: {headers}")
                 
-                insert_query = text(f"""
-                    INSERT INTO {table_name} 
-                    ({data_column_names}, insertion_timestamp, attachment_date, source_attachment_id, source_filename)
-                    VALUES 
-                    ({data_column_placeholders}, :insertion_timestamp, :attachment_date, :source_attachment_id, :source_filename)
-                """)
+                # Every header has a table column after schema evolution
+                load_columns = [header for header in headers if header in table_schema.columns]
                 
-                # Build parameters dictionary
-                params = {
-                    'insertion_timestamp': datetime.utcnow(),
-                    'attachment_date': attachment_date,
-                    'source_attachment_id': attachment_id,
-                    'source_filename': attachment.filename
-                }
+                # Typed data columns are widened to text if a later value doesn't fit
+                # (dropping the family views over the table first); rows whose
+                # natural key is already present are skipped
+                loader = BulkLoader.for_session(
+                    session,
+                    table_name,
+                    load_columns + metadata_columns(table_schema) + computed_columns(table_schema),
+                    widen_columns=load_columns,
+                    conflict_columns=table_schema.natural_key,
+                    before_alter=drop_family_views
+                )
+                if table_schema.batch_provenance:
+                    ingest_batch_id = allocate_ingest_batch_id(session)
+                provenance = row_metadata(table_schema, attachment, attachment_date, ingest_batch_id, datetime.utcnow())
                 
-                # Add data column values
-                if isinstance(row_dict, dict):
-                    # Real CSV data - use the parsed dictionary
-                    for col in data_columns:
-                        params[col] = row_dict.get(col, None)
-                else:
-                    # Mock data - use list indexing
-                    for i, col in enumerate(data_columns):
-                        params[col] = row_dict[i] if i < len(row_dict) else None
+                ingest_engine = unit.ingest_engine(attachment.filename, attachment.content_type)
+                logger.info(f"Using {ingest_engine.name} ingest engine for {attachment.filename}")
                 
-                session.execute(insert_query, params)
-                insert_count += 1
+                # Column statistics are gathered from the same batches that are loaded
+                if settings.INGEST_COLUMN_STATS:
+                    profiler = ColumnProfiler(load_columns, table_schema.columns)
                 
-            except Exception as e:
-                logger.error(f"Failed to insert row {insert_count + 1}: {e}")
-                continue
+                row_hash = bool(computed_columns(table_schema))
+                for batch in ingest_engine.iter_batches(unit, csv_content, load_columns, provenance):
+                    if row_hash:
+                        batch = with_row_hashes(batch, load_columns)
+                    loader.load_batch(batch)
+                    if profiler:
+                        profiler.observe(batch)
+        else:
+            logger.warning(f"No CSV content found for attachment {attachment_id}, nothing to insert")
         
-        session.commit()
+        load_report = loader.report() if loader else {
+            'rows_loaded': 0, 'rows_skipped': 0, 'rows_rejected': 0, 'rejected_rows': [], 'columns_widened': []
+        }
+        insert_count = load_report['rows_loaded']
         
-        # Mark attachment as processed by updating filename
-        attachment.filename = f"PROCESSED_{attachment.filename}"
+        # Register the ingest and mark the attachment processed in the same
+        # transaction as the inserted rows so a redelivered task finds it
+        record_widened_columns(session, table_name, load_report['columns_widened'])
+        rollup_rebuilds = []
+        if ingest_batch_id:
+            record_ingest_batch(session, ingest_batch_id, attachment, table_name, attachment_date, insert_count)
+            rollup_rebuilds = apply_rollups(session, get_table_schema(session, table_name), ingest_batch_id, attachment_date)
+        if profiler:
+            record_column_stats(session, profiler, attachment, table_name, ingest_batch_id)
+        if attachment.file_hash:
+            record_ingest(session, attachment, attachment.file_hash, table_name, insert_count)
+        mark_processing_completed(session, attachment, rows_inserted=insert_count)
         session.commit()
         
-        logger.info(f"Successfully processed {insert_count} rows into table {table_name}")
+        logger.info(
+            f"Successfully processed {insert_count} rows into table {table_name} "
+            f"({load_report['rows_skipped']} already present, {load_report['rows_rejected']} rejected)"
+        )
+        
+        # Rebuild stale rollups outside the load; dispatch_outbox retries the rest
+        dispatch_outbox_events(session, [event.id for event in rollup_rebuilds])
+        
+        # Union views over the table's families pick up new tables and columns
+        refresh_table_families(session, table_name)
         
         return {
             'status': 'completed',
             'attachment_id': attachment_id,
             'table_name': table_name,
+            'ingest_batch_id': ingest_batch_id,
             'rows_inserted': insert_count,
+            'rows_skipped': load_report['rows_skipped'],
+            'rows_rejected': load_report['rows_rejected'],
+            'rejected_rows': load_report['rejected_rows'],
+            'columns_widened': load_report['columns_widened'],
             'attachment_date': attachment_date.isoformat() if attachment_date else None,
             'processing_timestamp': datetime.utcnow().isoformat()
         }
         
+    except Ignore:
+        # Raised by replace() once the range loads are queued
+        raise
     except Exception as e:
         logger.error(f"CSV processing failed for attachment {attachment_id}: {e}")
         session.rollback()
+        if isinstance(e, (UndefinedColumn, UndefinedTable)):
+            # The cached schema is stale; the retry re-reads the registry
+            invalidate_table_schema(table_name)
+        record_processing_error(session, attachment_id, e, final=self.request.retries >= self.max_retries)
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def load_csv_range(
+    self,
+    attachment_id: str,
+    table_name: str,
+    attachment_date: Optional[datetime],
+    profile: Dict[str, any],
+    range_index: int,
+    start: int,
+    end: int,
+    columns: List[str],
+    inserted_at: datetime,
+    ingest_batch_id: Optional[int] = None
+) -> Dict[str, any]:
+    """
+    Parse one byte range of a large CSV attachment and bulk-load it into its staging table.
+    
+    The staging table is emptied first, so a retried range is loaded once.
+    Rows only reach the target table in finalize_csv_ranges.
+    
+    Args:
+        attachment_id: UUID of the attachment
+        table_name: Target table name
+        attachment_date: Date extracted from filename
+        profile: Ingest profile of the attachment
+        range_index: Position of the range in the file
+        start: First byte of the range (a record boundary)
+        end: Byte after the last record of the range
+        columns: Data columns to load
+        inserted_at: Insertion timestamp shared by all ranges
+        ingest_batch_id: Batch id shared by all ranges (tables with batch provenance)
+        
+    Returns:
+        Dict with the range's staging table, load report and column statistics
+    """
+    attachment_date = utc_datetime(attachment_date)
+    session = SessionLocal()
+    try:
+        attachment = session.query(EmailAttachment).filter(EmailAttachment.id == attachment_id).first()
+        if not attachment:
+            raise ValueError(f"Attachment {attachment_id} not found")
+        
+        unit = IngestUnit.prepare(session, attachment, profile).for_range(start, end)
+        stage_table = range_stage_table(attachment_id, range_index)
+        table_schema = get_table_schema(session, table_name)
+        load_columns = columns + metadata_columns(table_schema) + computed_columns(table_schema)
+        create_range_stage(session, stage_table, table_name, load_columns)
+        
+        # Widening only alters the staging table; the target is widened when merging
+        loader = BulkLoader.for_session(session, stage_table, load_columns, widen_columns=columns)
+        provenance = row_metadata(table_schema, attachment, attachment_date, ingest_batch_id, inserted_at)
+        ingest_engine = unit.ingest_engine(attachment.filename, attachment.content_type)
+        profiler = ColumnProfiler(columns, table_schema.columns) if settings.INGEST_COLUMN_STATS else None
+        row_hash = bool(computed_columns(table_schema))
+        with unit.open() as csv_content:
+            for batch in ingest_engine.iter_batches(unit, csv_content, columns, provenance):
+                if row_hash:
+                    batch = with_row_hashes(batch, columns)
+                loader.load_batch(batch)
+                if profiler:
+                    profiler.observe(batch)
+        session.commit()
+        
+        logger.info(f"Loaded range {range_index} ({start}-{end}) of attachment {attachment_id}: {loader.rows_loaded} rows")
+        return {
+            'range_index': range_index,
+            'stage_table': stage_table,
+            'column_stats': profiler.to_dict() if profiler else None,
+            **loader.report()
+        }
+        
+    except Exception as e:
+        logger.error(f"Loading range {range_index} of attachment {attachment_id} failed: {e}")
+        session.rollback()
+        record_processing_error(session, attachment_id, e, final=self.request.retries >= self.max_retries)
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def finalize_csv_ranges(
+    self,
+    range_results: List[Dict[str, any]],
+    attachment_id: str,
+    table_name: str,
+    attachment_date: Optional[datetime],
+    columns: List[str],
+    ingest_batch_id: Optional[int] = None
+) -> Dict[str, any]:
+    """
+    Chord callback: merge the staged ranges of an attachment into its table in one transaction.
+    
+    Columns a range widened to text are widened on the target first. Rows
+    whose natural key already exists are skipped. The ingest record, the
+    column statistics, the processing state and the dropped staging tables
+    commit with the rows.
+    
+    Args:
+        range_results: Results of load_csv_range
+        attachment_id: UUID of the attachment
+        table_name: Target table name
+        attachment_date: Date extracted from filename
+        columns: Data columns that were loaded
+        ingest_batch_id: Batch id the ranges were loaded with
+        
+    Returns:
+        Dict with processing results (as returned by process_csv_data)
+    """
+    attachment_date = utc_datetime(attachment_date)
+    session = SessionLocal()
+    try:
+        attachment = session.query(EmailAttachment).filter(EmailAttachment.id == attachment_id).first()
+        if not attachment:
+            raise ValueError(f"Attachment {attachment_id} not found")
+        
+        range_results = sorted(range_results, key=lambda result: result['range_index'])
+        columns_widened = sorted({column for result in range_results for column in result['columns_widened']})
+        widen_table_columns(session, table_name, columns_widened)
+        
+        table_schema = get_table_schema(session, table_name, refresh=True)
+        column_list = quote_identifiers(columns + metadata_columns(table_schema) + computed_columns(table_schema))
+        on_conflict = (
+            f" ON CONFLICT ({quote_identifiers(table_schema.natural_key)}) DO NOTHING" if table_schema.natural_key else ""
+        )
+        
+        insert_count = 0
+        for result in range_results:
+            merged = session.execute(text(
+                f"INSERT INTO {quote_identifier(table_name)} ({column_list}) "
+                f"SELECT {column_list} FROM {quote_identifier(result['stage_table'])}{on_conflict}"
+            ))
+            insert_count += merged.rowcount
+        drop_range_stages(session, attachment_id)
+        
+        rows_staged = sum(result['rows_loaded'] for result in range_results)
+        rejected_rows = [
+            {'range_index': result['range_index'], **rejected}
+            for result in range_results
+            for rejected in result['rejected_rows']
+        ]
+        
+        rollup_rebuilds = []
+        if ingest_batch_id:
+            record_ingest_batch(session, ingest_batch_id, attachment, table_name, attachment_date, insert_count)
+            rollup_rebuilds = apply_rollups(session, table_schema, ingest_batch_id, attachment_date)
+        
+        # The ranges' statistics merge into one entry per column, as for a single-pass load
+        range_stats = [result['column_stats'] for result in range_results if result.get('column_stats')]
+        if range_stats:
+            profiler = ColumnProfiler.from_dict(range_stats[0])
+            for stats in range_stats[1:]:
+                profiler.merge(ColumnProfiler.from_dict(stats))
+            record_column_stats(session, profiler, attachment, table_name, ingest_batch_id)
+        if attachment.file_hash:
+            record_ingest(session, attachment, attachment.file_hash, table_name, insert_count)
+        mark_processing_completed(session, attachment, rows_inserted=insert_count)
+        session.commit()
+        
+        logger.info(
+            f"Successfully merged {insert_count} rows from {len(range_results)} ranges into table {table_name} "
+            f"({rows_staged - insert_count} already present)"
+        )
+        
+        # Rebuild stale rollups outside the load; dispatch_outbox retries the rest
+        dispatch_outbox_events(session, [event.id for event in rollup_rebuilds])
+        
+        # Union views over the table's families pick up new tables and columns
+        refresh_table_families(session, table_name)
+        
+        return {
+            'status': 'completed',
+            'attachment_id': attachment_id,
+            'table_name': table_name,
+            'ingest_batch_id': ingest_batch_id,
+            'rows_inserted': insert_count,
+            'rows_skipped': rows_staged - insert_count + sum(result['rows_skipped'] for result in range_results),
+            'rows_rejected': sum(result['rows_rejected'] for result in range_results),
+            'rejected_rows': rejected_rows,
+            'columns_widened': columns_widened,
+            'ranges': len(range_results),
+            'attachment_date': attachment_date.isoformat() if attachment_date else None,
+            'processing_timestamp': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Merging ranges of attachment {attachment_id} failed: {e}")
+        session.rollback()
+        record_processing_error(session, attachment_id, e, final=self.request.retries >= self.max_retries)
         raise
     finally:
         session.close()
 
 
+@celery_app.task(bind=True)
+def summarize_attachment_ingest(self, results: List[Dict[str, any]], orchestrated_at: Optional[str] = None) -> Dict[str, any]:
+    """
+    Chord callback: aggregate the per-attachment pipeline results.
+    
+    Args:
+        results: Results of the per-attachment pipelines (process_csv_data or skip results)
+        orchestrated_at: When the orchestrator started the run
+        
+    Returns:
+        Dict with overall processing results
+    """
+    statuses: Dict[str, int] = {}
+    tables: Dict[str, int] = {}
+    totals = {'rows_inserted': 0, 'rows_skipped': 0, 'rows_rejected': 0}
+    for result in results:
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        if result['status'] == 'completed':
+            tables[result['table_name']] = tables.get(result['table_name'], 0) + result.get('rows_inserted', 0)
+    
+    summary = {
+        'status': 'completed',
+        'attachments_processed': len(results),
+        'statuses': statuses,
+        'rows_inserted_by_table': tables,
+        **totals,
+        'orchestrated_at': orchestrated_at,
+        'completed_at': datetime.utcnow().isoformat()
+    }
+    logger.info(f"Bulk attachment processing completed: {summary}")
+    return summary
+
+
+@celery_app.task(bind=True)
+def dispatch_attachment_ingest(self, extraction_result: Dict[str, any], orchestrated_at: Optional[str] = None) -> Dict[str, any]:
+    """
+    Start one pipeline per extracted attachment as a chord with a summary callback.
+    
+    Returns as soon as the chord is queued; no worker waits on other tasks.
+    
+    Args:
+        extraction_result: Result of extract_attachment_information(queue_ingest=False)
+        orchestrated_at: When the orchestrator started the run
+        
+    Returns:
+        Dict with the dispatched chord
+    """
+    pipelines = [
+        attachment_pipeline(info['attachment_id'], info['original_filename'], info['content_type'], info.get('size'))
+        for info in extraction_result['results']
+    ]
+    if not pipelines:
+        logger.info("No pending attachments to process")
+        return summarize_attachment_ingest([], orchestrated_at)
+    
+    summary = chord(group(pipelines), summarize_attachment_ingest.s(orchestrated_at)).apply_async()
+    logger.info(f"Dispatched {len(pipelines)} attachment pipelines, summary task {summary.id}")
+    
+    return {
+        'status': 'dispatched',
+        'attachments_dispatched': len(pipelines),
+        'summary_task_id': summary.id
+    }
+
+
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
 def process_all_attachments(self) -> Dict[str, any]:
     """
     Orchestrator task to process all unprocessed attachments.
-    This task coordinates the entire pipeline.
+    
+    Queues the pipeline as a canvas and returns immediately: extraction is
+    chained into dispatch_attachment_ingest, which fans out one chord header
+    task per attachment with summarize_attachment_ingest as the callback.
+    Attachments that fail after all retries are recorded on their processing
+    state; a failed header task fails the chord, so no summary is produced
+    for that run.
     
     Returns:
-        Dict with overall processing results
+        Dict with the queued workflow
     """
     try:
         logger.info("Starting bulk attachment processing...")
         
-        # Start the extraction process
-        extraction_result = extract_attachment_information.delay()
+        orchestrated_at = datetime.utcnow().isoformat()
+        workflow = (
+            extract_attachment_information.si(queue_ingest=False)
+            | dispatch_attachment_ingest.s(orchestrated_at)
+        ).apply_async()
+        
+        return {
+            'status': 'dispatched',
+            'workflow_id': workflow.id,
+            'orchestrated_at': orchestrated_at
+        }
+        
+    except Exception as e:
+        logger.error(f"Bulk attachment processing failed: {e}")
+        raise
+
+
+@celery_app.task(bind=True)
+def remove_ingest_batch(self, ingest_batch_id: int, reload: bool = False) -> Dict[str, any]:
+    """
+    Delete the rows one attachment load added to its table (e.g. a bad report).
+    
+    The rollups of the table are recomputed for the batch's period in the
+    same transaction.
+    
+    Args:
+        ingest_batch_id: Id of the batch (see the ingest_batch_id of the load result)
+        reload: Load the attachment again afterwards (e.g. after fixing its routing)
+        
+    Returns:
+        Dict with the number of deleted rows and the refreshed rollups
+    """
+    session = SessionLocal()
+    try:
+        batch = session.get(IngestBatch, ingest_batch_id)
+        if batch is None:
+            logger.warning(f"Ingest batch {ingest_batch_id} not found, nothing to delete")
+            return {
+                'status': 'failed',
+                'ingest_batch_id': ingest_batch_id,
+                'error': f"Ingest batch {ingest_batch_id} not found"
+            }
+        
+        table_name, attachment_date, attachment_id = batch.table_name, batch.attachment_date, batch.attachment_id
+        rows_deleted = delete_ingest_batch(session, ingest_batch_id, reload=reload)
+        rollups_refreshed = refresh_rollup_period(session, get_table_schema(session, table_name), attachment_date)
+        session.commit()
+        
+        if reload:
+            attachment = session.get(EmailAttachment, attachment_id)
+            if attachment is not None:
+                queue_attachment_ingest(str(attachment.id), attachment.filename, attachment.content_type, attachment.size)
+        
+        return {
+            'status': 'deleted',
+            'ingest_batch_id': ingest_batch_id,
+            'rows_deleted': rows_deleted,
+            'rollups_refreshed': rollups_refreshed,
+            'reloaded': reload,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Deleting ingest batch {ingest_batch_id} failed: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@register_outbox_handler(ROLLUP_STALE)
+def handle_rollup_stale(payload: Dict[str, any]) -> None:
+    """Queue the rebuild of a rollup a load marked stale, once the load is committed."""
+    rebuild_ingest_rollup.delay(payload['rollup'])
+
+
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def rebuild_ingest_rollup(self, name: str) -> Dict[str, any]:
+    """
+    Rebuild a rollup from its whole table and archive files.
+    
+    Queued when a load finds a rollup new or out of date (its definition or
+    source column types changed). Until the rebuild commits the rollup is
+    marked stale and loads skip it.
+    
+    Args:
+        name: Rollup name
+        
+    Returns:
+        Dict with whether the rollup was rebuilt
+    """
+    session = SessionLocal()
+    try:
+        rebuilt = rebuild_rollup(session, name)
+        session.commit()
+        
+        return {
+            'status': 'rebuilt' if rebuilt else 'skipped',
+            'rollup': name,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Rebuilding rollup {name} failed: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(bind=True)
+def expire_attachment_partitions(self) -> Dict[str, any]:
+    """
+    Drop (or detach) attachment table partitions older than the retention period.
+    
+    Runs periodically; does nothing unless INGEST_PARTITION_RETENTION_DAYS is
+    set. Tables created before partitioning keep all their rows.
+    
+    Returns:
+        Dict with the expired partitions by table
+    """
+    if settings.INGEST_PARTITION_RETENTION_DAYS <= 0:
+        return {'status': 'disabled', 'expired_partitions': {}}
+    
+    session = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=settings.INGEST_PARTITION_RETENTION_DAYS)
+        tables = session.query(IngestTableSchema.table_name, IngestTableSchema.partition_interval).filter(
+            IngestTableSchema.partition_interval.isnot(None)
+        ).all()
+        
+        expired = {}
+        for table_name, interval in tables:
+            # One transaction per table so each holds its exclusive lock briefly
+            names = expire_partitions(
+                session, table_name, interval, cutoff, detach=settings.INGEST_PARTITION_DETACH_EXPIRED
+            )
+            session.commit()
+            if names:
+                expired[table_name] = names
+        
+        return {
+            'status': 'completed',
+            'expired_partitions': expired,
+            'cutoff': cutoff.isoformat(),
+            'timestamp': datetime.utcnow().isoformat()
+        }
         
-        # Get the result (this will block until completion)
-        result = extraction_result.get(timeout=300)  # 5 minute timeout
+    except Exception as e:
+        logger.error(f"Expiring attachment partitions failed: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@celery_app.task(bind=True)
+def archive_attachment_tables(self) -> Dict[str, any]:
+    """
+    Move rows older than the archive age out of the attachment tables into Parquet files.
+    
+    Runs periodically; does nothing unless INGEST_ARCHIVE_AFTER_DAYS is set.
+    Archived rows stay queryable with cold_archive.query_table_history.
+    
+    Returns:
+        Dict with the number of rows archived by table
+    """
+    if settings.INGEST_ARCHIVE_AFTER_DAYS <= 0:
+        return {'status': 'disabled', 'archived_rows': {}}
+    
+    session = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=settings.INGEST_ARCHIVE_AFTER_DAYS)
+        tables = [name for (name,) in session.query(IngestTableSchema.table_name).order_by(IngestTableSchema.table_name)]
         
-        logger.info(f"Bulk attachment processing completed: {result}")
+        archived = {}
+        for table_name in tables:
+            # Commits once per batch of rows, so each delete holds its locks briefly
+            rows = archive_table_rows(session, table_name, cutoff)
+            if rows:
+                archived[table_name] = rows
         
         return {
             'status': 'completed',
-            'extraction_result': result,
-            'orchestrated_at': datetime.utcnow().isoformat()
+            'archived_rows': archived,
+            'cutoff': cutoff.isoformat(),
+            'timestamp': datetime.utcnow().isoformat()
         }
         
     except Exception as e:
-        logger.error(f"Bulk attachment processing failed: {e}")
+        logger.error(f"Archiving attachment tables failed: {e}")
+        session.rollback()
         raise
+    finally:
+        session.close()
 
 
 # Periodic tasks are now configured in celery_app.py beat_schedule
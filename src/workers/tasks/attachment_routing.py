@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import re
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+from sqlalchemy.dialects.postgresql.base import RESERVED_WORDS
+
+from src.core.config import settings
+from src.workers.tasks.format_readers import FORMAT_CONTENT_TYPES, attachment_format
+from src.workers.tasks.ingest_engines import INGEST_ENGINES
+
+logger = logging.getLogger(__name__)
+
+# Date patterns tried in order, with the group numbers of year, month and day
+DATE_PATTERNS: List[Tuple[Pattern[str], Tuple[int, int, int]]] = [
+    (re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), (1, 2, 3)),  # YYYY-MM-DD
+    (re.compile(r'(\d{4})_(\d{1,2})_(\d{1,2})'), (1, 2, 3)),  # YYYY_MM_DD
+    (re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), (3, 1, 2)),  # MM-DD-YYYY
+    (re.compile(r'(\d{1,2})_(\d{1,2})_(\d{4})'), (3, 1, 2)),  # MM_DD_YYYY
+    (re.compile(r'(\d{4})(\d{2})(\d{2})'), (1, 2, 3)),        # YYYYMMDD
+]
+
+# Date patterns removed in turn from filenames to derive table names (so daily reports share a table)
+DATE_STRIP_PATTERNS = [pattern for pattern, _ in DATE_PATTERNS[:4]] + [re.compile(r'\d{8}')]
+SEPARATOR_PATTERN = re.compile(r'[-\s\.]+')
+NON_IDENTIFIER_PATTERN = re.compile(r'[^a-zA-Z0-9_]')
+UNDERSCORES_PATTERN = re.compile(r'_+')
+
+# Reader options a routing rule may set
+READER_OPTIONS = ('format', 'encoding', 'delimiter', 'engine')
+
+# Filenames whose resolved route is kept per worker
+ROUTE_CACHE_SIZE = 4096
+
+
+class RoutingRule(NamedTuple):
+    """A compiled routing rule: filenames matching pattern go to table, dated by the "date" group."""
+
+    pattern: Pattern[str]
+    table: Optional[str]
+    date_format: Optional[str]
+    options: Mapping[str, str]
+
+
+class Route(NamedTuple):
+    """Where an attachment is loaded: target table, report date and reader options."""
+
+    table_name: str
+    attachment_date: Optional[datetime]
+    options: Mapping[str, str]
+    rule: Optional[str] = None
+
+
+def _identifier(value: str) -> str:
+    value = SEPARATOR_PATTERN.sub('_', value)
+    value = NON_IDENTIFIER_PATTERN.sub('', value)
+    if value and not value[0].isalpha() and value[0] != '_':
+        value = f'table_{value}'
+    value = UNDERSCORES_PATTERN.sub('_', value).strip('_').lower()
+    return f'table_{value}' if value in RESERVED_WORDS else value
+
+
+def sanitize_table_name(filename: str) -> str:
+    """
+    Convert a filename to a valid PostgreSQL table name.
+
+    Args:
+        filename: Original filename
+
+    Returns:
+        Sanitized table name (dates and the extension removed)
+    """
+    base_name = Path(filename).stem
+    for pattern in DATE_STRIP_PATTERNS:
+        base_name = pattern.sub('', base_name)
+    return _identifier(base_name) or 'processed_attachment'
+
+
+def extract_date_from_filename(filename: str) -> Optional[datetime]:
+    """
+    Extract date from filename.
+
+    The first pattern (in DATE_PATTERNS order) whose match is a valid date wins.
+
+    Args:
+        filename: Filename to parse
+
+    Returns:
+        Extracted date or None
+    """
+    for pattern, (year, month, day) in DATE_PATTERNS:
+        match = pattern.search(filename)
+        if match:
+            try:
+                return datetime(int(match.group(year)), int(match.group(month)), int(match.group(day)))
+            except ValueError:
+                continue
+    return None
+
+
+def compile_routing_rules(rules: Sequence[Dict[str, Any]]) -> Tuple[RoutingRule, ...]:
+    """
+    Compile and validate routing rules (e.g. INGEST_ROUTING_RULES).
+
+    Each rule is a dict with a "pattern" (regular expression searched in the
+    filename, case-insensitive) and optionally a "table" (may reference named
+    groups as {name}), a "date_format" (strptime format of the "date" group)
+    and reader "options" (format, encoding, delimiter, engine).
+
+    Args:
+        rules: Rule dicts, in priority order
+
+    Returns:
+        Compiled rules
+
+    Raises:
+        ValueError: If a rule is invalid
+    """
+    compiled = []
+    for index, rule in enumerate(rules):
+        try:
+            pattern = re.compile(rule['pattern'], re.IGNORECASE)
+        except (KeyError, TypeError, re.error) as e:
+            raise ValueError(f"Routing rule {index} needs a valid 'pattern': {e}")
+
+        table = rule.get('table')
+        if table:
+            placeholders = set(re.findall(r'{(\w+)}', table))
+            if not placeholders <= set(pattern.groupindex):
+                raise ValueError(f"Routing rule {index} table '{table}' references groups the pattern does not define")
+            if not placeholders and _identifier(table) != table:
+                raise ValueError(f"Routing rule {index} table '{table}' is not a lowercase identifier")
+
+        date_format = rule.get('date_format')
+        if date_format and 'date' not in pattern.groupindex:
+            raise ValueError(f"Routing rule {index} has a date_format but no (?P<date>...) group")
+
+        options = dict(rule.get('options') or {})
+        unknown = set(options) - set(READER_OPTIONS)
+        if unknown:
+            raise ValueError(f"Routing rule {index} has unknown options {sorted(unknown)}")
+        if 'format' in options and options['format'] not in set(FORMAT_CONTENT_TYPES.values()):
+            raise ValueError(f"Routing rule {index} has unknown format '{options['format']}'")
+        if 'engine' in options and options['engine'] not in INGEST_ENGINES:
+            raise ValueError(f"Routing rule {index} has unknown engine '{options['engine']}'")
+
+        compiled.append(RoutingRule(pattern, table, date_format, MappingProxyType(options)))
+    return tuple(compiled)
+
+
+def route_filename(filename: str, rules: Sequence[RoutingRule]) -> Route:
+    """
+    Resolve the route of a filename: the first matching rule, else the filename heuristics.
+
+    Args:
+        filename: Attachment filename
+        rules: Compiled rules
+
+    Returns:
+        The route
+    """
+    for rule in rules:
+        match = rule.pattern.search(filename)
+        if not match:
+            continue
+
+        groups = {name: value or '' for name, value in match.groupdict().items()}
+        table_name = _identifier(rule.table.format(**groups)) if rule.table else sanitize_table_name(filename)
+
+        attachment_date = None
+        if 'date' in groups and rule.date_format:
+            try:
+                attachment_date = datetime.strptime(groups['date'], rule.date_format)
+            except ValueError:
+                logger.warning(f"Routing rule {rule.pattern.pattern} matched {filename} with an invalid date")
+        else:
+            attachment_date = extract_date_from_filename(groups.get('date') or filename)
+
+        return Route(table_name or 'processed_attachment', attachment_date, rule.options, rule.pattern.pattern)
+
+    return Route(sanitize_table_name(filename), extract_date_from_filename(filename), MappingProxyType({}))
+
+
+# Compiled once per worker process; an invalid configuration fails at startup
+ROUTING_RULES = compile_routing_rules(settings.INGEST_ROUTING_RULES)
+
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def resolve_route(filename: str) -> Route:
+    """Resolve the route of a filename with the configured rules (cached per worker)."""
+    return route_filename(filename, ROUTING_RULES)
+
+
+def routed_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Return the data format of an attachment: a routing rule's format option, else by extension or MIME type.
+
+    Args:
+        filename: Attachment filename
+        content_type: Attachment MIME type
+
+    Returns:
+        Format name, or None if the attachment is not ingested
+    """
+    return resolve_route(filename or '').options.get('format') or attachment_format(filename, content_type)
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+from psycopg2 import DataError
+from psycopg2 import Error as DatabaseError
+from psycopg2 import ProgrammingError
+from psycopg2.extras import execute_values
+
+from src.workers.tasks.schema_registry import quote_identifier, quote_identifiers
+
+logger = logging.getLogger(__name__)
+
+# Rows per statement when falling back from COPY to multi-row INSERTs
+EXECUTE_VALUES_PAGE_SIZE = 1000
+
+# Rejected rows kept in the load report (all are counted)
+REJECTED_ROWS_REPORT_LIMIT = 100
+
+# COPY error context, e.g. 'COPY prices, line 12, column volume: "n/a"'
+COPY_COLUMN_PATTERN = re.compile(r'column (?P<column>\w+)(:|$)')
+
+
+class BulkLoader:
+    """
+    Load row batches into a table with COPY ... FROM STDIN.
+
+    Each batch runs in its own savepoint. If COPY rejects a batch, it is
+    retried with multi-row INSERTs (execute_values), and if that fails too,
+    row by row so only the offending rows are rejected. Rejected rows are
+    counted and reported with their data row number and database error.
+
+    Batches are lists of row tuples or DataFrames with columns in load order;
+    DataFrames are serialized to CSV column-wise without per-row Python work.
+
+    The loader uses the DBAPI connection of the caller's transaction and never
+    commits; loaded rows become visible when the caller commits.
+
+    Values are written in CSV format, where an unquoted empty field is NULL;
+    None and empty strings therefore both load as NULL.
+
+    Columns listed in widen_columns are typed from a sample of the file. When
+    COPY fails because a later value does not fit such a column, the column is
+    altered to text (existing values are cast) and the batch is retried, so
+    the data is kept instead of rejected. Views selecting the column would
+    block the alter, so before_alter is called with the cursor and table name
+    first (e.g. catalog.drop_family_views).
+
+    With conflict_columns (a natural key backed by a unique index), batches
+    are copied into a temporary staging table and merged with INSERT ... ON
+    CONFLICT DO NOTHING; rows whose key already exists are counted as skipped,
+    which makes re-running a load a no-op.
+    """
+
+    def __init__(
+        self,
+        dbapi_connection,
+        table_name: str,
+        columns: Sequence[str],
+        widen_columns: Optional[Sequence[str]] = None,
+        conflict_columns: Optional[Sequence[str]] = None,
+        before_alter: Optional[Callable[[Any, str], Any]] = None
+    ):
+        self.connection = dbapi_connection
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.widen_columns = set(widen_columns or ())
+        self.conflict_columns = list(conflict_columns or ())
+        self.before_alter = before_alter
+        self.rows_loaded = 0
+        self.rows_skipped = 0
+        self.rows_rejected = 0
+        self.rejected_rows: List[Dict[str, Any]] = []
+        self.columns_widened: List[str] = []
+        self._rows_seen = 0
+
+        table = quote_identifier(table_name)
+        column_list = quote_identifiers(self.columns)
+        self._insert_sql = f"INSERT INTO {table} ({column_list}) VALUES %s"
+        if self.conflict_columns:
+            self.stage_table = f"_stage_{table_name}"[:63]
+            stage = quote_identifier(self.stage_table)
+            on_conflict = f"ON CONFLICT ({quote_identifiers(self.conflict_columns)}) DO NOTHING"
+            self._stage_sql = (
+                f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table} WITH NO DATA"
+            )
+            self._copy_sql = f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+            self._merge_sql = (
+                f"INSERT INTO {table} ({column_list}) "
+                f"SELECT {column_list} FROM {stage} {on_conflict}"
+            )
+            self._insert_sql = f"{self._insert_sql} {on_conflict} RETURNING 1"
+        else:
+            self.stage_table = None
+            self._copy_sql = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+
+    @classmethod
+    def for_session(
+        cls,
+        session,
+        table_name: str,
+        columns: Sequence[str],
+        widen_columns: Optional[Sequence[str]] = None,
+        conflict_columns: Optional[Sequence[str]] = None,
+        before_alter: Optional[Callable[[Any, str], Any]] = None
+    ) -> BulkLoader:
+        """Create a loader on the DBAPI connection of a SQLAlchemy session's transaction."""
+        return cls(session.connection().connection, table_name, columns, widen_columns, conflict_columns, before_alter)
+
+    def load_batch(self, rows: Union[List[Sequence[Any]], pd.DataFrame]) -> int:
+        """
+        Load one batch of rows.
+
+        Args:
+            rows: Row tuples or a DataFrame, in column order
+
+        Returns:
+            Number of rows loaded from this batch (excluding skipped duplicates)
+        """
+        if len(rows) == 0:
+            return 0
+
+        first_row_number = self._rows_seen + 1
+        self._rows_seen += len(rows)
+        rejected_before = self.rows_rejected
+
+        with self.connection.cursor() as cursor:
+            if self.stage_table:
+                cursor.execute(self._stage_sql)
+            while True:
+                cursor.execute("SAVEPOINT bulk_load_batch")
+                try:
+                    cursor.copy_expert(self._copy_sql, self._to_csv(rows))
+                    loaded = self._merge_stage(cursor) if self.stage_table else len(rows)
+                except ProgrammingError:
+                    # Missing table or column: not a data problem, let the caller handle it
+                    cursor.execute("ROLLBACK TO SAVEPOINT bulk_load_batch")
+                    raise
+                except DatabaseError as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT bulk_load_batch")
+                    column = self._column_to_widen(e)
+                    if column:
+                        # Widen outside the batch savepoint so the retry keeps it
+                        cursor.execute("RELEASE SAVEPOINT bulk_load_batch")
+                        self._widen_column(cursor, column, e)
+                        continue
+                    logger.warning(f"COPY into {self.table_name} failed, falling back to INSERT batches: {e}")
+                    loaded = self._insert_batch(cursor, self._to_tuples(rows), first_row_number)
+                cursor.execute("RELEASE SAVEPOINT bulk_load_batch")
+                break
+
+        self.rows_loaded += loaded
+        self.rows_skipped += len(rows) - loaded - (self.rows_rejected - rejected_before)
+        return loaded
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the load for task results."""
+        return {
+            'rows_loaded': self.rows_loaded,
+            'rows_skipped': self.rows_skipped,
+            'rows_rejected': self.rows_rejected,
+            'rejected_rows': self.rejected_rows,
+            'columns_widened': self.columns_widened
+        }
+
+    def _column_to_widen(self, error: DatabaseError) -> Optional[str]:
+        """Return the typed column a COPY data error points at, if it may be widened."""
+        if not isinstance(error, DataError) or error.diag is None or not error.diag.context:
+            return None
+        match = COPY_COLUMN_PATTERN.search(error.diag.context)
+        if not match:
+            return None
+        column = match.group('column')
+        if column in self.widen_columns and column not in self.columns_widened:
+            return column
+        return None
+
+    def _widen_column(self, cursor, column: str, error: DatabaseError) -> None:
+        if self.before_alter:
+            self.before_alter(cursor, self.table_name)
+        quoted = quote_identifier(column)
+        for table_name in filter(None, (self.table_name, self.stage_table)):
+            cursor.execute(
+                f"ALTER TABLE {quote_identifier(table_name)} ALTER COLUMN {quoted} TYPE text USING {quoted}::text"
+            )
+        self.columns_widened.append(column)
+        message = str(error).strip().splitlines()[0]
+        logger.warning(f"Widened {self.table_name}.{column} to text after COPY error: {message}")
+
+    def _merge_stage(self, cursor) -> int:
+        cursor.execute(self._merge_sql)
+        merged = cursor.rowcount
+        cursor.execute(f"TRUNCATE {quote_identifier(self.stage_table)}")
+        return merged
+
+    def _to_csv(self, rows: Union[List[Sequence[Any]], pd.DataFrame]) -> io.StringIO:
+        buffer = io.StringIO()
+        if isinstance(rows, pd.DataFrame):
+            rows.to_csv(buffer, header=False, index=False)
+        else:
+            csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        return buffer
+
+    def _to_tuples(self, rows: Union[List[Sequence[Any]], pd.DataFrame]) -> List[Sequence[Any]]:
+        if isinstance(rows, pd.DataFrame):
+            return list(rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None))
+        return rows
+
+    def _insert_batch(self, cursor, rows: List[Sequence[Any]], first_row_number: int) -> int:
+        cursor.execute("SAVEPOINT bulk_load_insert")
+        try:
+            inserted = execute_values(
+                cursor, self._insert_sql, rows, page_size=EXECUTE_VALUES_PAGE_SIZE, fetch=bool(self.conflict_columns)
+            )
+            cursor.execute("RELEASE SAVEPOINT bulk_load_insert")
+            return len(inserted) if self.conflict_columns else len(rows)
+        except DatabaseError:
+            cursor.execute("ROLLBACK TO SAVEPOINT bulk_load_insert")
+
+        # Isolate the rows the database rejects
+        loaded = 0
+        for offset, row in enumerate(rows):
+            cursor.execute("SAVEPOINT bulk_load_row")
+            try:
+                inserted = execute_values(cursor, self._insert_sql, [row], fetch=bool(self.conflict_columns))
+                cursor.execute("RELEASE SAVEPOINT bulk_load_row")
+                loaded += len(inserted) if self.conflict_columns else 1
+            except DatabaseError as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT bulk_load_row")
+                self._reject(first_row_number + offset, e)
+        return loaded
+
+    def _reject(self, row_number: int, error: DatabaseError) -> None:
+        self.rows_rejected += 1
+        message = str(error).strip().splitlines()[0] if str(error).strip() else type(error).__name__
+        if len(self.rejected_rows) < REJECTED_ROWS_REPORT_LIMIT:
+            self.rejected_rows.append({'row_number': row_number, 'error': message})
+        logger.warning(f"Rejected row {row_number} for {self.table_name}: {message}")
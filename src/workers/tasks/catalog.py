@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Sequence, Union
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models.email import IngestTableFamily, IngestTableSchema
+from src.workers.tasks.attachment_routing import resolve_route
+from src.workers.tasks.schema_registry import TableSchema, get_table_schema, lock_table_schema
+from src.workers.tasks.type_inference import TEXT, sql_type_for
+
+logger = logging.getLogger(__name__)
+
+# Column of family views naming the member table of each row
+SOURCE_TABLE_COLUMN = 'source_table'
+IDENTIFIER_PATTERN = re.compile(r'^[a-z_][a-z0-9_]{0,62}$')
+
+# Registered tables with their size, layout and load lineage; row and size
+# figures are planner estimates (summed over partitions), no table is scanned;
+# archived rows are counted from the archive file registry
+CATALOG_QUERY = """
+    SELECT s.table_name, s.version, s.columns, s.natural_key, s.partition_interval, s.batch_provenance,
+           s.created_at, s.updated_at,
+           CASE WHEN rel.relkind = 'p' THEN parts.row_estimate ELSE NULLIF(rel.reltuples, -1) END AS row_estimate,
+           CASE WHEN rel.relkind = 'p' THEN parts.total_bytes ELSE pg_total_relation_size(rel.oid) END AS total_bytes,
+           COALESCE(parts.partitions, 0) AS partitions,
+           COALESCE(loads.loads, 0) AS loads, loads.last_loaded_at, loads.latest_filename,
+           COALESCE(archive.archived_rows, 0) AS archived_rows, COALESCE(archive.archive_bytes, 0) AS archive_bytes
+    FROM ingest_table_schemas s
+    LEFT JOIN pg_class rel ON rel.oid = to_regclass(s.table_name)
+    LEFT JOIN LATERAL (
+        SELECT SUM(NULLIF(child.reltuples, -1)) AS row_estimate,
+               SUM(pg_total_relation_size(child.oid)) AS total_bytes,
+               COUNT(*) AS partitions
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = rel.oid
+    ) parts ON rel.relkind = 'p'
+    LEFT JOIN (
+        SELECT state.table_name, COUNT(*) AS loads, MAX(state.completed_at) AS last_loaded_at,
+               (array_agg(attachment.filename ORDER BY state.completed_at DESC NULLS LAST))[1] AS latest_filename
+        FROM attachment_processing_states state
+        JOIN email_attachments attachment ON attachment.id = state.attachment_id
+        WHERE state.status = 'completed'
+        GROUP BY state.table_name
+    ) loads ON loads.table_name = s.table_name
+    LEFT JOIN (
+        SELECT table_name, SUM(row_count) AS archived_rows, SUM(file_size) AS archive_bytes
+        FROM ingest_archive_files
+        GROUP BY table_name
+    ) archive ON archive.table_name = s.table_name
+    WHERE (:table_name IS NULL OR s.table_name = :table_name)
+    ORDER BY s.table_name
+"""
+
+
+# Family views built over a table (the tables column holds the members)
+FAMILY_VIEWS_OF_TABLE_QUERY = "SELECT name FROM ingest_table_families WHERE tables::jsonb ? %(table_name)s ORDER BY name"
+
+
+class TableFamily(NamedTuple):
+    """A union view over the tables whose names match a pattern (or are listed)."""
+
+    name: str
+    pattern: Pattern[str]
+
+    def matches(self, table_name: str) -> bool:
+        return table_name != self.name and bool(self.pattern.fullmatch(table_name))
+
+
+def compile_table_families(families: Dict[str, Union[str, Sequence[str]]]) -> Dict[str, TableFamily]:
+    """
+    Validate table family definitions (e.g. INGEST_TABLE_FAMILIES).
+
+    Args:
+        families: View name -> regular expression matched against whole table
+            names, or a list of table names
+
+    Returns:
+        View name -> family
+
+    Raises:
+        ValueError: If a definition is invalid
+    """
+    compiled = {}
+    for name, members in families.items():
+        if not IDENTIFIER_PATTERN.match(name):
+            raise ValueError(f"Table family view name '{name}' is not a lowercase identifier")
+        if isinstance(members, str):
+            source = members
+        else:
+            source = '|'.join(re.escape(member) for member in members)
+        try:
+            compiled[name] = TableFamily(name, re.compile(source))
+        except re.error as e:
+            raise ValueError(f"Table family {name} has an invalid pattern: {e}")
+    return compiled
+
+
+# Compiled once per worker process; an invalid configuration fails at startup
+TABLE_FAMILIES = compile_table_families(settings.INGEST_TABLE_FAMILIES)
+
+
+def table_catalog(session: Session, table_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    List the ingested tables with their schema, size estimates and lineage.
+
+    Only tables in the schema registry are listed, so partitions, staging
+    tables, rollups and family views are left out without inspecting names.
+
+    Args:
+        session: Database session
+        table_name: Only this table
+
+    Returns:
+        One dict per table; routing_rule is the pattern of the rule that routes
+        the table's latest attachment (None for the filename heuristics)
+    """
+    entries = []
+    for row in session.execute(text(CATALOG_QUERY), {'table_name': table_name}):
+        entry = dict(row._mapping)
+        entry['row_estimate'] = int(entry['row_estimate']) if entry['row_estimate'] is not None else None
+        entry['total_bytes'] = int(entry['total_bytes']) if entry['total_bytes'] is not None else None
+        entry['archived_rows'], entry['archive_bytes'] = int(entry['archived_rows']), int(entry['archive_bytes'])
+        entry['routing_rule'] = resolve_route(entry['latest_filename']).rule if entry['latest_filename'] else None
+        entry['families'] = [family.name for family in TABLE_FAMILIES.values() if family.matches(entry['table_name'])]
+        entries.append(entry)
+    return entries
+
+
+def family_view_sql(name: str, schemas: Sequence[TableSchema]) -> str:
+    """
+    Build the union view of a family's member tables.
+
+    The view has the columns of every member, in order of first appearance,
+    after the source table and report date; members without a column give
+    NULL, and a column typed differently across members is read as text.
+
+    Args:
+        name: View name
+        schemas: Member table schemas
+
+    Returns:
+        CREATE VIEW statement
+    """
+    column_types: Dict[str, str] = {}
+    for schema in schemas:
+        for column, type_name in schema.columns.items():
+            if column in column_types and column_types[column] != type_name:
+                column_types[column] = TEXT
+            else:
+                column_types.setdefault(column, type_name)
+
+    dialect = postgresql.dialect()
+    with_batches = any(schema.batch_provenance for schema in schemas)
+    selects = []
+    for schema in schemas:
+        selected = [f"'{schema.table_name}'::text AS {SOURCE_TABLE_COLUMN}", "attachment_date"]
+        if with_batches:
+            selected.append("ingest_batch_id" if schema.batch_provenance else "NULL::integer AS ingest_batch_id")
+        for column, type_name in column_types.items():
+            sql_type = sql_type_for(type_name).compile(dialect=dialect)
+            if column not in schema.columns:
+                selected.append(f"NULL::{sql_type} AS {column}")
+            elif schema.columns[column] != type_name:
+                selected.append(f"{column}::{sql_type} AS {column}")
+            else:
+                selected.append(column)
+        selects.append(f"SELECT {', '.join(selected)} FROM {schema.table_name}")
+    return f"CREATE VIEW {name} AS\n" + "\nUNION ALL\n".join(selects)
+
+
+def drop_family_views(cursor, table_name: str) -> List[str]:
+    """
+    Drop the family views built over a table before the type of one of its columns is altered.
+
+    Postgres does not alter the type of a column a view selects. The views
+    are dropped in the caller's transaction, so a rolled back load keeps
+    them; altering the column bumps the table's schema version, so
+    refresh_table_families rebuilds them once the load commits.
+
+    Args:
+        cursor: DBAPI cursor of the transaction altering the table
+        table_name: Table whose columns are altered
+
+    Returns:
+        Names of the dropped views
+    """
+    cursor.execute(FAMILY_VIEWS_OF_TABLE_QUERY, {'table_name': table_name})
+    views = [name for (name,) in cursor.fetchall()]
+    for view in views:
+        cursor.execute(f"DROP VIEW IF EXISTS {view}")
+    if views:
+        logger.info(f"Dropped table family views {views} to alter {table_name}")
+    return views
+
+
+def refresh_table_families(session: Session, table_name: str) -> List[str]:
+    """
+    Rebuild the union views of the families a table belongs to, if their members changed.
+
+    Called after a load commits; a family's fingerprint covers the names and
+    schema versions of its members, so the common case is one registry query.
+    The views are rebuilt in their own transaction, and a failure (e.g. a
+    user view depending on a family view) is logged without failing the load.
+
+    Args:
+        session: Database session (committed or rolled back here)
+        table_name: Table that was loaded
+
+    Returns:
+        Names of the rebuilt views
+    """
+    families = [family for family in TABLE_FAMILIES.values() if family.matches(table_name)]
+    if not families:
+        return []
+
+    rebuilt = []
+    try:
+        registered = dict(session.query(IngestTableSchema.table_name, IngestTableSchema.version).all())
+        for family in families:
+            if family.name in registered:
+                logger.warning(f"Table family view {family.name} is named like an ingested table, skipping")
+                continue
+            members = sorted(name for name in registered if family.matches(name))
+            fingerprint = hashlib.sha256(
+                json.dumps([[name, registered[name]] for name in members]).encode('utf-8')
+            ).hexdigest()
+            entry = session.get(IngestTableFamily, family.name)
+            if entry is not None and entry.fingerprint == fingerprint:
+                continue
+
+            lock_table_schema(session, family.name)
+            entry = session.get(IngestTableFamily, family.name, populate_existing=True)
+            if entry is not None and entry.fingerprint == fingerprint:
+                continue
+            schemas = [get_table_schema(session, name, refresh=True) for name in members]
+            session.execute(text(f"DROP VIEW IF EXISTS {family.name}"))
+            session.execute(text(family_view_sql(family.name, schemas)))
+            if entry is None:
+                entry = IngestTableFamily(name=family.name)
+                session.add(entry)
+            entry.tables = members
+            entry.fingerprint = fingerprint
+            session.commit()
+            rebuilt.append(family.name)
+            logger.info(f"Rebuilt table family view {family.name} over {members}")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Refreshing table family views for {table_name} failed: {e}")
+    return rebuilt
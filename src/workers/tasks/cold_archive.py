@@ -0,0 +1,533 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models.email import IngestArchiveFile
+from src.workers.tasks.partitions import PARTITION_COLUMN, list_partitions, lock_table_partitions
+from src.workers.tasks.schema_registry import get_table_schema, quote_identifier, quote_identifiers
+from src.workers.tasks.type_inference import BOOLEAN, DATE, INTEGER, NUMERIC, TEXT, TIMESTAMP, TIMESTAMPTZ
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional dependency
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# Parquet compression of archive files
+ARCHIVE_COMPRESSION = 'zstd'
+
+# Archive files are kept per table and UTC report date:
+# <INGEST_ARCHIVE_DIR>/<table>/archive_date=2025-07-09/<uuid>.parquet
+ARCHIVE_DATE_DIRECTORY = 'archive_date={}'
+
+# Filesystems whose files do not outlive the container or host (a container's
+# writable layer, memory); archived rows are deleted from Postgres, so their
+# files must not be written there
+EPHEMERAL_FILESYSTEMS = frozenset({'overlay', 'aufs', 'tmpfs', 'ramfs'})
+MOUNTS_FILE = '/proc/self/mounts'
+MOUNT_ESCAPE = re.compile(r'\\([0-7]{3})')
+
+# Column types of archive files, by registry type; numeric columns keep the
+# exact decimal type inferred from their values (float64 if none fits)
+ARROW_TYPES = {
+    TEXT: 'string',
+    INTEGER: 'int64',
+    BOOLEAN: 'bool_',
+    DATE: 'date32',
+}
+# Metadata columns; any other column outside the registry is kept as text
+METADATA_ARROW_TYPES = {
+    'id': 'int64',
+    'ingest_batch_id': 'int64',
+    'row_hash': 'string',
+}
+
+
+# Rows fetched per Arrow batch when hot rows are streamed into a history query
+HISTORY_FETCH_ROWS = 10000
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is required to archive ingested rows")
+
+
+def arrow_type(column: str, type_name: Optional[str]) -> Any:
+    """
+    Return the Arrow type archived values of a column are written as.
+
+    Args:
+        column: Column name
+        type_name: Registry type of the column (None for metadata columns)
+
+    Returns:
+        pyarrow DataType, or None to infer it from the values (numeric)
+    """
+    _require_pyarrow()
+    if column == PARTITION_COLUMN or type_name == TIMESTAMPTZ:
+        return pa.timestamp('us', tz='UTC')
+    if type_name == TIMESTAMP:
+        return pa.timestamp('us')
+    if type_name == NUMERIC:
+        return None
+    if type_name is None:
+        return getattr(pa, METADATA_ARROW_TYPES.get(column, 'string'))()
+    return getattr(pa, ARROW_TYPES.get(type_name, 'string'))()
+
+
+def rows_to_arrow(columns: Sequence[str], rows: Sequence[Sequence[Any]], column_types: Dict[str, str]) -> Any:
+    """
+    Convert rows read from an ingested table into an Arrow table.
+
+    Hot rows read for a query and archived rows go through the same types,
+    so both read back alike.
+
+    Args:
+        columns: Column names, in row order
+        rows: Row tuples
+        column_types: Registry types of the data columns
+
+    Returns:
+        pyarrow Table
+    """
+    _require_pyarrow()
+    arrays = []
+    for index, column in enumerate(columns):
+        values = [row[index] for row in rows]
+        target = arrow_type(column, column_types.get(column))
+        if target == pa.string():
+            # e.g. uuid values of provenance columns
+            values = [str(value) if value is not None else None for value in values]
+        try:
+            arrays.append(pa.array(values, type=target))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Numeric values wider than any decimal type
+            arrays.append(pa.array([float(value) if value is not None else None for value in values], pa.float64()))
+    return pa.Table.from_arrays(arrays, names=list(columns))
+
+
+def archive_path(table_name: str, archive_date: date) -> Path:
+    """Return a new file path in the archive directory of a table and date."""
+    directory = Path(settings.INGEST_ARCHIVE_DIR) / table_name / ARCHIVE_DATE_DIRECTORY.format(archive_date.isoformat())
+    return directory / f"{uuid.uuid4().hex}.parquet"
+
+
+def archive_filesystem(directory: Path, mounts_file: str = MOUNTS_FILE) -> Optional[str]:
+    """
+    Return the type of the filesystem a directory is on, from the mount table.
+
+    Args:
+        directory: Existing directory
+        mounts_file: Mount table (fstab format)
+
+    Returns:
+        Filesystem type of the innermost mount containing the directory, or
+        None if the mount table cannot be read (e.g. not Linux)
+    """
+    try:
+        with open(mounts_file, encoding='utf-8') as mounts:
+            entries = [line.split() for line in mounts]
+    except OSError:
+        return None
+
+    resolved = os.path.realpath(directory)
+    best_mount, filesystem = '', None
+    for entry in entries:
+        if len(entry) < 3:
+            continue
+        # Spaces and other separators in mount points are octal escaped (\040)
+        mount_point = MOUNT_ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), entry[1])
+        inside = resolved == mount_point or resolved.startswith(mount_point.rstrip('/') + '/')
+        if inside and len(mount_point) >= len(best_mount):
+            best_mount, filesystem = mount_point, entry[2]
+    return filesystem
+
+
+def ensure_archive_storage() -> Path:
+    """
+    Create the archive directory and check it is on persistent storage.
+
+    Returns:
+        The archive directory
+
+    Raises:
+        RuntimeError: If the directory is on an ephemeral filesystem, e.g. the
+            writable layer of a container without a volume at INGEST_ARCHIVE_DIR
+    """
+    directory = Path(settings.INGEST_ARCHIVE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    filesystem = archive_filesystem(directory)
+    if filesystem in EPHEMERAL_FILESYSTEMS:
+        raise RuntimeError(
+            f"Archive directory {directory.resolve()} is on an ephemeral {filesystem} filesystem; "
+            f"mount a persistent volume at INGEST_ARCHIVE_DIR before archiving"
+        )
+    return directory
+
+
+def _archive_date(value: datetime) -> date:
+    return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+
+
+def archive_table_rows(session: Session, table_name: str, before: datetime) -> int:
+    """
+    Move the rows of a table reported before a cutoff into Parquet files.
+
+    Rows are deleted in batches of INGEST_ARCHIVE_BATCH_ROWS with DELETE ...
+    RETURNING, and each batch is written out as one file per report date
+    before its transaction commits, together with the files' entries in
+    ingest_archive_files. A failed batch removes its files and leaves its
+    rows in place; a file whose entry never committed is ignored by queries.
+    Partitions left empty are dropped afterwards, so they cost no vacuum.
+
+    Rollups keep covering archived rows (a rebuild reads the archive files
+    back, see rollups.merge_archived_rows) and so do column statistics;
+    natural key and row hash deduplication only see the rows still in the
+    table.
+
+    Args:
+        session: Database session (committed here, once per batch)
+        table_name: Ingested table
+        before: Cutoff; rows with an attachment_date before it are archived
+
+    Returns:
+        Number of rows archived
+
+    Raises:
+        RuntimeError: If the archive directory is not on persistent storage
+    """
+    _require_pyarrow()
+    ensure_archive_storage()
+    schema = get_table_schema(session, table_name)
+    column_types = schema.columns if schema else {}
+    archived = 0
+
+    while True:
+        # tableoid qualifies ctid, which is only unique within one partition
+        result = session.execute(text(f"""
+            DELETE FROM {table_name}
+            WHERE (tableoid, ctid) IN (
+                SELECT tableoid, ctid FROM {table_name}
+                WHERE {PARTITION_COLUMN} < :before
+                LIMIT :batch_rows
+            )
+            RETURNING *
+        """), {'before': before, 'batch_rows': settings.INGEST_ARCHIVE_BATCH_ROWS})
+        columns = list(result.keys())
+        rows = result.fetchall()
+        if not rows:
+            session.rollback()
+            break
+
+        date_index = columns.index(PARTITION_COLUMN)
+        rows_by_date: Dict[date, List[Any]] = {}
+        for row in rows:
+            rows_by_date.setdefault(_archive_date(row[date_index]), []).append(row)
+
+        written = []
+        try:
+            for archive_date, date_rows in sorted(rows_by_date.items()):
+                path = archive_path(table_name, archive_date)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Written under a temporary name so a partial file never has the final one
+                partial_path = path.with_suffix('.partial')
+                pq.write_table(
+                    rows_to_arrow(columns, date_rows, column_types), partial_path, compression=ARCHIVE_COMPRESSION
+                )
+                os.replace(partial_path, path)
+                written.append(path)
+                session.add(IngestArchiveFile(
+                    table_name=table_name,
+                    archive_date=archive_date,
+                    path=str(path),
+                    row_count=len(date_rows),
+                    file_size=path.stat().st_size
+                ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            for path in written:
+                path.unlink(missing_ok=True)
+            raise
+
+        archived += len(rows)
+        logger.info(f"Archived {len(rows)} rows of {table_name} into {len(written)} files")
+
+    if schema and schema.partition_interval:
+        drop_empty_partitions(session, table_name, schema.partition_interval, before)
+        session.commit()
+    return archived
+
+
+def drop_empty_partitions(session: Session, table_name: str, interval: str, before: datetime) -> List[str]:
+    """
+    Drop the partitions of a table that end on or before a cutoff and hold no rows (the caller commits).
+
+    Each partition is locked before it is checked, so a late load into it
+    either finished before the check or waits and then fails its insert.
+
+    Args:
+        session: Database session
+        table_name: Partitioned table
+        interval: Partition interval of the table
+        before: Cutoff the table was archived up to
+
+    Returns:
+        Names of the dropped partitions
+    """
+    lock_table_partitions(session, table_name)
+    dropped = []
+    for partition in list_partitions(session, table_name, interval):
+        if partition.end > before:
+            continue
+        session.execute(text(f"LOCK TABLE {partition.name} IN ACCESS EXCLUSIVE MODE"))
+        if session.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {partition.name})")).scalar():
+            session.execute(text(f"DROP TABLE {partition.name}"))
+            dropped.append(partition.name)
+
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} archived partitions of {table_name}: {dropped}")
+    return dropped
+
+
+def archive_files(
+    session: Session,
+    table_name: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[str]:
+    """
+    List the archive files of a table that may hold rows reported in [start, end).
+
+    Args:
+        session: Database session
+        table_name: Ingested table
+        start: First report date to include
+        end: Report date to stop before
+
+    Returns:
+        File paths, oldest report date first
+    """
+    query = session.query(IngestArchiveFile.path).filter(IngestArchiveFile.table_name == table_name)
+    if start is not None:
+        query = query.filter(IngestArchiveFile.archive_date >= _archive_date(start))
+    if end is not None:
+        # Rows before end are reported on or before the date of its previous instant
+        query = query.filter(IngestArchiveFile.archive_date <= _archive_date(end - timedelta(microseconds=1)))
+    return [path for (path,) in query.order_by(IngestArchiveFile.archive_date, IngestArchiveFile.id)]
+
+
+def connect_table_history(
+    table_name: str,
+    files: Sequence[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    hot_rows: Any = None,
+    columns: Optional[Sequence[str]] = None
+) -> Any:
+    """
+    Open a DuckDB connection with a view named after a table over its archive files.
+
+    Args:
+        table_name: Ingested table (the view name)
+        files: Archive files to scan (see archive_files)
+        start: First report date to include
+        end: Report date to stop before
+        hot_rows: Arrow table or record batch reader of rows still in Postgres,
+            read along with the files (a reader can only be scanned once)
+        columns: Columns the view exposes (all by default); the others are
+            not read from the files
+
+    Returns:
+        DuckDB connection (the caller closes it)
+    """
+    if duckdb is None:
+        raise RuntimeError("duckdb is required to query archived rows")
+    connection = duckdb.connect()
+    try:
+        connection.execute("SET TimeZone = 'UTC'")
+        relations = []
+        if hot_rows is not None:
+            connection.register('hot_rows', hot_rows)
+            relations.append("SELECT * FROM hot_rows")
+        if files:
+            file_list = ', '.join("'" + path.replace("'", "''") + "'" for path in files)
+            bounds = []
+            if start is not None:
+                bounds.append(f"{PARTITION_COLUMN} >= '{_utc_isoformat(start)}'::TIMESTAMPTZ")
+            if end is not None:
+                bounds.append(f"{PARTITION_COLUMN} < '{_utc_isoformat(end)}'::TIMESTAMPTZ")
+            relations.append(
+                f"SELECT * FROM read_parquet([{file_list}], union_by_name = true, hive_partitioning = false)"
+                + (f" WHERE {' AND '.join(bounds)}" if bounds else "")
+            )
+        relation = ' UNION ALL BY NAME '.join(relations)
+        if columns:
+            # Projected over the union, so columns missing from older files read as NULL
+            relation = f"SELECT {quote_identifiers(list(columns))} FROM ({relation})"
+        connection.execute(f"CREATE VIEW {quote_identifier(table_name)} AS {relation}")
+        return connection
+    except Exception:
+        connection.close()
+        raise
+
+
+def stream_hot_rows(
+    session: Session,
+    table_name: str,
+    column_types: Dict[str, str],
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_rows: int = HISTORY_FETCH_ROWS
+) -> Any:
+    """
+    Stream a table's rows reported in [start, end) as Arrow record batches.
+
+    Rows are fetched batch_rows at a time from a server-side cursor, with the
+    projection and the report date bounds applied in Postgres (so partitions
+    outside the bounds are not read). The stream must be consumed while the
+    session's transaction is open.
+
+    Numeric columns keep the decimal scale of the first batch for the whole
+    stream; later values with more decimal places are truncated to it (with
+    a warning).
+
+    Args:
+        session: Database session
+        table_name: Ingested table
+        column_types: Registry types of the data columns
+        columns: Columns to read (all by default)
+        start: First report date to include
+        end: Report date to stop before
+        batch_rows: Rows per batch
+
+    Returns:
+        pyarrow RecordBatchReader
+    """
+    _require_pyarrow()
+    conditions = []
+    params: Dict[str, Any] = {}
+    if start is not None:
+        conditions.append(f"{PARTITION_COLUMN} >= :start")
+        params['start'] = start
+    if end is not None:
+        conditions.append(f"{PARTITION_COLUMN} < :end")
+        params['end'] = end
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    selected = quote_identifiers(list(columns)) if columns else '*'
+
+    result = session.connection().execution_options(stream_results=True).execute(
+        text(f"SELECT {selected} FROM {quote_identifier(table_name)}{where}"), params
+    )
+    names = list(result.keys())
+    first = rows_to_arrow(names, result.fetchmany(batch_rows), column_types)
+    schema = _stream_schema(first, column_types)
+
+    def batches():
+        try:
+            batch = first
+            while True:
+                yield from _conform(batch, schema, table_name).to_batches()
+                rows = result.fetchmany(batch_rows)
+                if not rows:
+                    break
+                batch = rows_to_arrow(names, rows, column_types)
+        finally:
+            result.close()
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
+
+
+def _stream_schema(first: Any, column_types: Dict[str, str]) -> Any:
+    """Fix the types a stream keeps; numeric types are inferred per batch, so they are widened."""
+    fields = []
+    for field in first.schema:
+        arrow = field.type
+        if column_types.get(field.name) == NUMERIC:
+            if pa.types.is_decimal(arrow):
+                arrow = pa.decimal128(38, arrow.scale) if arrow.precision <= 38 else pa.decimal256(76, arrow.scale)
+            elif pa.types.is_null(arrow):
+                arrow = pa.float64()
+        fields.append(pa.field(field.name, arrow))
+    return pa.schema(fields)
+
+
+def _conform(batch: Any, schema: Any, table_name: str) -> Any:
+    try:
+        return batch.cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        logger.warning(f"Numeric values of {table_name} do not fit the streamed type, truncating: {e}")
+        return batch.cast(schema, safe=False)
+
+
+def query_table_history(
+    session: Session,
+    table_name: str,
+    sql: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Query a table's rows in Postgres and in its archive together, with DuckDB.
+
+    The hot rows reported in [start, end) are streamed from Postgres in
+    batches and the archive files covering those dates are scanned in place;
+    the SQL sees both as one relation named after the table (e.g. "SELECT
+    symbol, sum(volume) FROM prices GROUP BY symbol"), which it may scan only
+    once. Columns added or widened since a file was archived read as NULL or
+    the wider type. Without a start the query covers the
+    INGEST_HISTORY_DEFAULT_DAYS days before end (or now).
+
+    Args:
+        session: Database session
+        table_name: Ingested table
+        sql: DuckDB query over the table (every row by default)
+        start: First report date to include
+        end: Report date to stop before
+        columns: Columns the SQL reads (all by default); only these are
+            fetched from Postgres and read from the files
+
+    Returns:
+        Query result
+    """
+    if duckdb is None:
+        raise RuntimeError("duckdb is required to query archived rows")
+    schema = get_table_schema(session, table_name)
+    if schema is None:
+        raise ValueError(f"Table {table_name} is not an ingested table")
+    if start is None:
+        start = (end or datetime.now(timezone.utc)) - timedelta(days=settings.INGEST_HISTORY_DEFAULT_DAYS)
+
+    hot_rows = stream_hot_rows(session, table_name, schema.columns, columns, start, end)
+    connection = connect_table_history(
+        table_name, archive_files(session, table_name, start, end), start, end, hot_rows=hot_rows, columns=columns
+    )
+    try:
+        return connection.execute(sql or f"SELECT * FROM {quote_identifier(table_name)}").fetch_df()
+    finally:
+        connection.close()
+
+
+def _utc_isoformat(value: datetime) -> str:
+    return (value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
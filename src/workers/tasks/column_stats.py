@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import base64
+import logging
+import math
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from src.models.email import EmailAttachment, IngestColumnStats
+from src.workers.tasks.type_inference import INTEGER, NUMERIC, TEXT
+
+logger = logging.getLogger(__name__)
+
+# HyperLogLog precision: 2 ** 12 one-byte registers per column, about 1.6% standard error
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+# Bits of the 64-bit hash left for the rank once the register index is taken
+HLL_RANK_BITS = 64 - HLL_PRECISION
+HLL_RANK_MASK = np.uint64((1 << HLL_RANK_BITS) - 1)
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+# Columns whose min/max are compared as numbers and which are summed
+NUMERIC_TYPES = (INTEGER, NUMERIC)
+
+# Longest min/max text stored (a longer value keeps its prefix)
+STATS_VALUE_MAX_LENGTH = 256
+
+
+def hll_add(registers: np.ndarray, values: pd.Series) -> None:
+    """
+    Add values to HyperLogLog registers in place.
+
+    Values are hashed in their text form, so the same value read from CSV or
+    a typed format counts once.
+
+    Args:
+        registers: Registers of the column (HLL_REGISTERS uint8 values)
+        values: Non-null values
+    """
+    if values.empty:
+        return
+    hashes = pd.util.hash_array(values.astype(str).to_numpy(dtype=object))
+    index = (hashes >> np.uint64(HLL_RANK_BITS)).astype(np.intp)
+    # The rank is the position of the first set bit of the remaining bits; they
+    # fit in a float64 mantissa, so frexp gives their exact bit length
+    _, bit_length = np.frexp((hashes & HLL_RANK_MASK).astype(np.float64))
+    rank = (HLL_RANK_BITS - bit_length + 1).astype(np.uint8)
+    np.maximum.at(registers, index, rank)
+
+
+def hll_estimate(registers: np.ndarray) -> int:
+    """
+    Estimate the number of distinct values added to HyperLogLog registers.
+
+    Args:
+        registers: Registers of the column
+
+    Returns:
+        Distinct value estimate
+    """
+    estimate = HLL_ALPHA * HLL_REGISTERS ** 2 / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        # Linear counting is more accurate while few registers are set
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+    return int(round(estimate))
+
+
+class ColumnProfile:
+    """Statistics of one column over the rows seen so far; profiles of the same column merge."""
+
+    def __init__(self, column_type: str = TEXT):
+        self.column_type = column_type
+        self.row_count = 0
+        self.null_count = 0
+        self.registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+        self.min_value: Any = None
+        self.max_value: Any = None
+        self.value_sum: Any = None
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.column_type in NUMERIC_TYPES
+
+    def observe(self, values: pd.Series) -> None:
+        """Add a batch of values of the column (None or empty strings are null)."""
+        nulls = values.isna()
+        if values.dtype == object:
+            nulls |= values.eq("")
+        present = values[~nulls.to_numpy(dtype=bool)]
+
+        self.row_count += len(values)
+        self.null_count += len(values) - len(present)
+        hll_add(self.registers, present)
+        if present.empty:
+            return
+
+        if self.is_numeric:
+            numbers = pd.to_numeric(present, errors="coerce").dropna()
+            if numbers.empty:
+                return
+            if self.column_type == INTEGER and numbers.dtype.kind in "iu":
+                # Python integers, so sums of large values do not overflow
+                batch_sum = int(numbers.to_numpy().sum(dtype=object))
+            else:
+                batch_sum = float(numbers.sum())
+            self._update(_python_value(numbers.min()), _python_value(numbers.max()), batch_sum)
+        else:
+            text = present.astype(str)
+            self._update(text.min(), text.max(), None)
+
+    def merge(self, other: ColumnProfile) -> None:
+        """Add the rows of another profile of the same column."""
+        self.row_count += other.row_count
+        self.null_count += other.null_count
+        np.maximum(self.registers, other.registers, out=self.registers)
+        if other.min_value is not None:
+            self._update(other.min_value, other.max_value, other.value_sum)
+
+    @property
+    def distinct_estimate(self) -> int:
+        return hll_estimate(self.registers)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the profile (e.g. into a task result)."""
+        return {
+            'column_type': self.column_type,
+            'row_count': self.row_count,
+            'null_count': self.null_count,
+            'hll': base64.b64encode(self.registers.tobytes()).decode('ascii'),
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'value_sum': self.value_sum
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> ColumnProfile:
+        """Restore a profile serialized with to_dict."""
+        profile = cls(data['column_type'])
+        profile.row_count = data['row_count']
+        profile.null_count = data['null_count']
+        profile.registers = np.frombuffer(base64.b64decode(data['hll']), dtype=np.uint8).copy()
+        profile.min_value = data['min_value']
+        profile.max_value = data['max_value']
+        profile.value_sum = data['value_sum']
+        return profile
+
+    def _update(self, min_value: Any, max_value: Any, value_sum: Any) -> None:
+        if self.min_value is None or min_value < self.min_value:
+            self.min_value = min_value
+        if self.max_value is None or max_value > self.max_value:
+            self.max_value = max_value
+        if value_sum is not None:
+            self.value_sum = value_sum if self.value_sum is None else self.value_sum + value_sum
+
+
+class ColumnProfiler:
+    """
+    Profile the data columns of load batches as they stream past the loader.
+
+    Batches are the engines' load batches (row tuples or DataFrames with the
+    data columns first and provenance columns after them), so profiling adds
+    vectorized work per batch but no second pass over the file. Statistics
+    describe the rows read from the attachment, including rows the load
+    skipped as duplicates or rejected.
+    """
+
+    def __init__(self, columns: Sequence[str], column_types: Optional[Dict[str, str]] = None):
+        self.columns = list(columns)
+        self.profiles = {
+            column: ColumnProfile((column_types or {}).get(column, TEXT)) for column in self.columns
+        }
+
+    def observe(self, batch: Any) -> None:
+        """
+        Profile one load batch.
+
+        Args:
+            batch: Row tuples or a DataFrame, data columns first
+        """
+        if len(batch) == 0:
+            return
+        if isinstance(batch, pd.DataFrame):
+            column_values: Iterable[pd.Series] = (batch[column] for column in self.columns)
+        else:
+            # Transposed in C; provenance values past the data columns are ignored
+            column_values = (pd.Series(values, dtype=object) for values in zip(*batch))
+        for column, values in zip(self.columns, column_values):
+            self.profiles[column].observe(values)
+
+    def merge(self, other: ColumnProfiler) -> None:
+        """Add the rows profiled by another profiler of the same columns (e.g. another byte range)."""
+        for column, profile in other.profiles.items():
+            if column in self.profiles:
+                self.profiles[column].merge(profile)
+            else:
+                self.columns.append(column)
+                self.profiles[column] = profile
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the profiles (e.g. into a range load result)."""
+        return {column: self.profiles[column].to_dict() for column in self.columns}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> ColumnProfiler:
+        """Restore a profiler serialized with to_dict."""
+        profiler = cls([])
+        for column, profile in data.items():
+            profiler.columns.append(column)
+            profiler.profiles[column] = ColumnProfile.from_dict(profile)
+        return profiler
+
+
+def record_column_stats(
+    session: Session,
+    profiler: ColumnProfiler,
+    attachment: EmailAttachment,
+    table_name: str,
+    ingest_batch_id: Optional[int] = None
+) -> List[IngestColumnStats]:
+    """
+    Store the column statistics of a load in the same transaction as its rows (the caller commits).
+
+    Args:
+        session: Database session
+        profiler: Profiler that observed the load batches
+        attachment: Loaded attachment
+        table_name: Target table name
+        ingest_batch_id: Batch id of the load (tables with batch provenance)
+
+    Returns:
+        The stored statistics, one per column
+    """
+    entries = []
+    for column in profiler.columns:
+        profile = profiler.profiles[column]
+        entry = IngestColumnStats(
+            table_name=table_name,
+            attachment_id=attachment.id,
+            ingest_batch_id=ingest_batch_id,
+            column_name=column,
+            column_type=profile.column_type,
+            row_count=profile.row_count,
+            null_count=profile.null_count,
+            distinct_estimate=profile.distinct_estimate,
+            min_value=_stats_value(profile.min_value),
+            max_value=_stats_value(profile.max_value),
+            value_sum=Decimal(str(profile.value_sum)) if profile.value_sum is not None else None,
+            hll=profile.registers.tobytes()
+        )
+        session.add(entry)
+        entries.append(entry)
+    return entries
+
+
+def table_column_stats(session: Session, table_name: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Combine the stored statistics of every load into a table, per column.
+
+    Distinct estimates merge the loads' HyperLogLog registers, so values
+    repeated across daily files count once; nothing reads the table itself.
+
+    Args:
+        session: Database session
+        table_name: Table name
+
+    Returns:
+        Mapping of column name to row_count, null_count, distinct_estimate,
+        min_value, max_value and value_sum (None when unknown)
+    """
+    entries = session.query(IngestColumnStats).filter(
+        IngestColumnStats.table_name == table_name
+    ).order_by(IngestColumnStats.id).all()
+
+    profiles: Dict[str, ColumnProfile] = {}
+    for entry in entries:
+        profile = ColumnProfile(entry.column_type)
+        profile.row_count = entry.row_count
+        profile.null_count = entry.null_count
+        profile.registers = np.frombuffer(entry.hll, dtype=np.uint8).copy()
+        if entry.min_value is not None:
+            parse = Decimal if profile.is_numeric else str
+            profile.min_value, profile.max_value = parse(entry.min_value), parse(entry.max_value)
+        profile.value_sum = entry.value_sum
+        if entry.column_name in profiles:
+            profiles[entry.column_name].merge(profile)
+        else:
+            profiles[entry.column_name] = profile
+
+    return {
+        column: {
+            'row_count': profile.row_count,
+            'null_count': profile.null_count,
+            'distinct_estimate': profile.distinct_estimate,
+            'min_value': profile.min_value,
+            'max_value': profile.max_value,
+            'value_sum': profile.value_sum
+        }
+        for column, profile in profiles.items()
+    }
+
+
+def _python_value(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _stats_value(value: Any) -> Optional[str]:
+    return str(value)[:STATS_VALUE_MAX_LENGTH] if value is not None else None
@@ -1,32 +1,161 @@
 from __future__ import annotations
 
+import codecs
 import csv
 import io
 import logging
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 import chardet
 import pandas as pd
+from sqlalchemy.dialects.postgresql.base import RESERVED_WORDS
+
+from src.workers.tasks.row_hashes import ROW_HASH_COLUMN
+from src.workers.tasks.schema_registry import BATCH_METADATA_COLUMNS, KEY_COLUMNS, METADATA_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+# Raw attachment bytes: bytes, or a (memory-mapped) buffer sliced without copying
+ContentBuffer = Union[bytes, bytearray, memoryview]
+
+# Size of the chunks fed to the encoding detector and the text decoder
+READ_CHUNK_SIZE = 64 * 1024
+
+# Names a data column cannot take: SQL reserved words and the columns the loader adds itself
+RESERVED_COLUMN_NAMES = (
+    set(RESERVED_WORDS) | set(KEY_COLUMNS + METADATA_COLUMNS + BATCH_METADATA_COLUMNS) | {ROW_HASH_COLUMN}
+)
+# PostgreSQL truncates longer identifiers, which could make distinct names collide
+MAX_IDENTIFIER_LENGTH = 63
+
+# Bytes examined by encoding detection and dialect sniffing
+ENCODING_SAMPLE_SIZE = 1024 * 1024
+CHARDET_SAMPLE_SIZE = 64 * 1024
+DIALECT_SAMPLE_SIZE = 16 * 1024
+
+# Number of rows per batch yielded by CSVFileReader.iter_csv_batches
+DEFAULT_BATCH_SIZE = 5000
+
+# Byte order marks, longest first so UTF-32 is not mistaken for UTF-16
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+CANDIDATE_DELIMITERS = ',;\t|'
+
+# A parsed row: values in header order, None for empty cells
+CSVRow = Tuple[Optional[str], ...]
+
+
+class CSVFormat(NamedTuple):
+    """Detected encoding and delimiter of a CSV file."""
+    encoding: str
+    delimiter: str
+
+
+# Detected formats keyed by attachment content hash (per worker process)
+FORMAT_CACHE_SIZE = 1024
+_format_cache: "OrderedDict[str, CSVFormat]" = OrderedDict()
+
+
+class BufferStream(io.RawIOBase):
+    """Read-only raw stream over a bytes-like buffer that copies only what is read."""
+    
+    def __init__(self, buffer: ContentBuffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+    
+    def readinto(self, target) -> int:
+        size = min(len(target), len(self._view) - self._position)
+        target[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+    
+    def close(self) -> None:
+        if not self.closed:
+            # Release our export so a memory map behind the buffer can be closed
+            self._view.release()
+        super().close()
+
 
 class CSVFileReader:
     """Helper class for reading and parsing CSV files from email attachments."""
     
     @staticmethod
-    def detect_encoding(file_content: bytes) -> str:
+    def open_text_stream(file_content: ContentBuffer, encoding: str) -> io.TextIOWrapper:
+        """
+        Open a decoding text stream over raw file content.
+        
+        The content is decoded incrementally as it is read, so the whole file
+        never exists as a Python string.
+        
+        Args:
+            file_content: Raw file content
+            encoding: File encoding
+            
+        Returns:
+            Text stream suitable for csv.reader
+        """
+        return io.TextIOWrapper(
+            io.BufferedReader(BufferStream(file_content), buffer_size=READ_CHUNK_SIZE),
+            encoding=encoding,
+            errors='replace',
+            newline=''
+        )
+    
+    @staticmethod
+    def detect_encoding(file_content: ContentBuffer, sample_size: int = ENCODING_SAMPLE_SIZE) -> str:
         """
         Detect the encoding of a file.
         
+        Byte order marks are checked first, then the sample is validated as
+        strict UTF-8; chardet only runs on a bounded sample when both fail.
+        
         Args:
             file_content: Raw file content
+            sample_size: Number of bytes to examine
             
         Returns:
             Detected encoding
         """
+        view = memoryview(file_content)
+        head = bytes(view[:4])
+        for bom, encoding in BOM_ENCODINGS:
+            if head.startswith(bom):
+                return encoding
+        
+        sample = bytes(view[:sample_size])
+        try:
+            # A multi-byte sequence cut off at the end of the sample is not an error
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=len(view) <= sample_size)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        
         try:
-            detected = chardet.detect(file_content)
+            detected = chardet.detect(sample[:CHARDET_SAMPLE_SIZE])
             encoding = detected.get('encoding', 'utf-8')
             if encoding:
                 return encoding
@@ -35,6 +164,60 @@ class CSVFileReader:
         
         return 'utf-8'
     
+    @staticmethod
+    def detect_dialect(csv_sample: str) -> str:
+        """
+        Detect the CSV delimiter with quote-aware sniffing.
+        
+        Delimiters inside quoted fields are ignored and candidates must occur
+        consistently across lines. Falls back to character counting when the
+        sample is too irregular to sniff.
+        
+        Args:
+            csv_sample: Decoded head of the CSV content
+            
+        Returns:
+            Detected delimiter
+        """
+        # Only sniff complete lines
+        cut = csv_sample.rfind('\n')
+        if cut > 0:
+            csv_sample = csv_sample[:cut]
+        
+        try:
+            return csv.Sniffer().sniff(csv_sample, delimiters=CANDIDATE_DELIMITERS).delimiter
+        except csv.Error:
+            return CSVFileReader.detect_delimiter(csv_sample)
+    
+    @staticmethod
+    def detect_csv_format(file_content: ContentBuffer, cache_key: Optional[str] = None) -> CSVFormat:
+        """
+        Detect the encoding and delimiter of CSV content.
+        
+        Args:
+            file_content: Raw file content
+            cache_key: Attachment content hash; results are cached under it
+            
+        Returns:
+            Detected CSV format
+        """
+        if cache_key and cache_key in _format_cache:
+            _format_cache.move_to_end(cache_key)
+            return _format_cache[cache_key]
+        
+        encoding = CSVFileReader.detect_encoding(file_content)
+        sample = codecs.getincrementaldecoder(encoding)(errors='replace').decode(
+            bytes(memoryview(file_content)[:DIALECT_SAMPLE_SIZE])
+        )
+        csv_format = CSVFormat(encoding, CSVFileReader.detect_dialect(sample))
+        
+        if cache_key:
+            _format_cache[cache_key] = csv_format
+            if len(_format_cache) > FORMAT_CACHE_SIZE:
+                _format_cache.popitem(last=False)
+        
+        return csv_format
+    
     @staticmethod
     def detect_delimiter(csv_content: str, sample_size: int = 1024) -> str:
         """
@@ -65,49 +248,76 @@ class CSVFileReader:
         return ','  # Default to comma
     
     @staticmethod
-    def parse_csv_headers(file_content: bytes) -> Tuple[List[str], str, str]:
+    def clean_headers(headers: List[str]) -> List[str]:
+        """
+        Turn raw column names into unique lowercase identifiers usable as column names.
+        
+        Args:
+            headers: Raw column names (CSV header row, Parquet schema, ...)
+            
+        Returns:
+            Cleaned headers; names left empty or starting with a digit become column_<n>,
+            reserved words and the loader's own columns become column_<name>, and
+            repeated names get a _2, _3, ... suffix
+        """
+        cleaned_headers = []
+        seen = set()
+        for header in headers:
+            # Strip whitespace and replace problematic characters
+            cleaned_header = str(header).strip().replace(' ', '_').replace('-', '_')
+            cleaned_header = ''.join(c for c in cleaned_header if c.isalnum() or c == '_').lower()
+            if not cleaned_header or cleaned_header[0].isdigit():
+                cleaned_header = f'column_{len(cleaned_headers) + 1}'
+            elif cleaned_header in RESERVED_COLUMN_NAMES:
+                cleaned_header = f'column_{cleaned_header}'
+            cleaned_header = cleaned_header[:MAX_IDENTIFIER_LENGTH]
+            
+            unique_header, suffix = cleaned_header, 1
+            while unique_header in seen:
+                suffix += 1
+                unique_header = f'{cleaned_header[:MAX_IDENTIFIER_LENGTH - len(str(suffix)) - 1]}_{suffix}'
+            cleaned_headers.append(unique_header)
+            seen.add(unique_header)
+        return cleaned_headers
+    
+    @staticmethod
+    def parse_csv_headers(
+        file_content: ContentBuffer,
+        cache_key: Optional[str] = None,
+        encoding: Optional[str] = None,
+        delimiter: Optional[str] = None
+    ) -> Tuple[List[str], str, str]:
         """
         Parse CSV headers from file content.
         
         Args:
             file_content: Raw file content
+            cache_key: Attachment content hash used to cache format detection
+            encoding: Known encoding (e.g. from a routing rule); detected if not given
+            delimiter: Known delimiter; detected if not given
             
         Returns:
             Tuple of (headers, encoding, delimiter)
         """
         try:
-            # Detect encoding
-            encoding = CSVFileReader.detect_encoding(file_content)
-            
-            # Decode content
-            csv_content = file_content.decode(encoding, errors='replace')
+            # Detect encoding and delimiter unless both are known
+            if not (encoding and delimiter):
+                detected = CSVFileReader.detect_csv_format(file_content, cache_key)
+                encoding, delimiter = encoding or detected.encoding, delimiter or detected.delimiter
             
-            # Detect delimiter
-            delimiter = CSVFileReader.detect_delimiter(csv_content)
+            with CSVFileReader.open_text_stream(file_content, encoding) as text_stream:
+                # Parse headers
+                csv_reader = csv.reader(text_stream, delimiter=delimiter)
+                headers = next(csv_reader, [])
             
-            # Parse headers
-            csv_reader = csv.reader(io.StringIO(csv_content), delimiter=delimiter)
-            headers = next(csv_reader, [])
-            
-            # Clean headers
-            cleaned_headers = []
-            for header in headers:
-                # Strip whitespace and replace problematic characters
-                cleaned_header = str(header).strip().replace(' ', '_').replace('-', '_')
-                cleaned_header = ''.join(c for c in cleaned_header if c.isalnum() or c == '_')
-                if cleaned_header and not cleaned_header[0].isdigit():
-                    cleaned_headers.append(cleaned_header.lower())
-                else:
-                    cleaned_headers.append(f'column_{len(cleaned_headers) + 1}')
-            
-            return cleaned_headers, encoding, delimiter
+            return CSVFileReader.clean_headers(headers), encoding, delimiter
             
         except Exception as e:
             logger.error(f"Failed to parse CSV headers: {e}")
             return [], 'utf-8', ','
     
     @staticmethod
-    def parse_csv_data(file_content: bytes, headers: List[str], encoding: str, delimiter: str) -> List[Dict[str, str]]:
+    def parse_csv_data(file_content: ContentBuffer, headers: List[str], encoding: str, delimiter: str) -> List[Dict[str, str]]:
         """
         Parse CSV data from file content.
         
@@ -121,31 +331,29 @@ class CSVFileReader:
             List of row dictionaries
         """
         try:
-            # Decode content
-            csv_content = file_content.decode(encoding, errors='replace')
-            
-            # Parse data
-            csv_reader = csv.reader(io.StringIO(csv_content), delimiter=delimiter)
-            
-            # Skip header row
-            next(csv_reader, None)
-            
-            rows = []
-            for row_data in csv_reader:
-                # Create row dictionary
-                row = {}
-                for i, value in enumerate(row_data):
-                    if i < len(headers):
-                        row[headers[i]] = str(value).strip() if value else None
-                    else:
-                        row[f'extra_column_{i + 1}'] = str(value).strip() if value else None
+            with CSVFileReader.open_text_stream(file_content, encoding) as text_stream:
+                # Parse data as it is decoded
+                csv_reader = csv.reader(text_stream, delimiter=delimiter)
                 
-                # Ensure all headers have values (even if None)
-                for header in headers:
-                    if header not in row:
-                        row[header] = None
+                # Skip header row
+                next(csv_reader, None)
                 
-                rows.append(row)
+                rows = []
+                for row_data in csv_reader:
+                    # Create row dictionary
+                    row = {}
+                    for i, value in enumerate(row_data):
+                        if i < len(headers):
+                            row[headers[i]] = str(value).strip() if value else None
+                        else:
+                            row[f'extra_column_{i + 1}'] = str(value).strip() if value else None
+                    
+                    # Ensure all headers have values (even if None)
+                    for header in headers:
+                        if header not in row:
+                            row[header] = None
+                    
+                    rows.append(row)
             
             return rows
             
@@ -154,7 +362,61 @@ class CSVFileReader:
             return []
     
     @staticmethod
-    def validate_csv_content(file_content: bytes) -> Dict[str, any]:
+    def iter_csv_batches(
+        file_content: ContentBuffer,
+        headers: List[str],
+        encoding: str,
+        delimiter: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        skip_header: bool = True
+    ) -> Iterator[List[CSVRow]]:
+        """
+        Stream CSV data rows in fixed-size batches.
+        
+        Rows are yielded as tuples in header order: values are stripped, empty
+        values become None, short rows are padded with None, values beyond the
+        last header are dropped and blank lines are skipped. Memory use is bounded by the batch size, not the file size.
+        
+        Args:
+            file_content: Raw file content
+            headers: Column headers
+            encoding: File encoding
+            delimiter: CSV delimiter
+            batch_size: Maximum number of rows per batch
+            skip_header: The content starts with the header row (false for a byte range of records)
+            
+        Yields:
+            Lists of row tuples
+        """
+        width = len(headers)
+        padding = (None,) * width
+        
+        with CSVFileReader.open_text_stream(file_content, encoding) as text_stream:
+            csv_reader = csv.reader(text_stream, delimiter=delimiter)
+            
+            # Skip header row
+            if skip_header:
+                next(csv_reader, None)
+            
+            batch = []
+            for row_data in csv_reader:
+                if not row_data:
+                    continue
+                
+                row = tuple([value.strip() or None for value in row_data[:width]])
+                if len(row) < width:
+                    row += padding[len(row):]
+                batch.append(row)
+                
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            
+            if batch:
+                yield batch
+    
+    @staticmethod
+    def validate_csv_content(file_content: ContentBuffer) -> Dict[str, any]:
         """
         Validate and analyze CSV content.
         
@@ -176,16 +438,21 @@ class CSVFileReader:
                     'delimiter': delimiter
                 }
             
-            # Parse a sample of data to validate structure
-            sample_rows = CSVFileReader.parse_csv_data(file_content, headers, encoding, delimiter)
+            # Stream the data to validate structure, keeping only a preview
+            row_count = 0
+            sample_rows = []
+            for batch in CSVFileReader.iter_csv_batches(file_content, headers, encoding, delimiter):
+                if not sample_rows:
+                    sample_rows = [dict(zip(headers, row)) for row in batch[:5]]  # First 5 rows for preview
+                row_count += len(batch)
             
             return {
                 'valid': True,
                 'headers': headers,
                 'encoding': encoding,
                 'delimiter': delimiter,
-                'row_count': len(sample_rows),
-                'sample_rows': sample_rows[:5]  # First 5 rows for preview
+                'row_count': row_count,
+                'sample_rows': sample_rows
             }
             
         except Exception as e:
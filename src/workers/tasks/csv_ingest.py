@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.core.attachment_storage import ensure_spooled, open_attachment_buffer
+from src.models.email import AttachmentIngestProfile, EmailAttachment
+from src.workers.tasks.attachment_archives import respool_archive_member
+from src.workers.tasks.attachment_routing import resolve_route, routed_format
+from src.workers.tasks.csv_file_reader import DEFAULT_BATCH_SIZE, ContentBuffer, CSVFileReader, CSVRow
+from src.workers.tasks.format_readers import CSV, get_format_reader
+from src.workers.tasks.ingest_engines import get_ingest_engine, select_ingest_engine
+from src.workers.tasks.type_inference import TYPE_INFERENCE_SAMPLE_ROWS, infer_column_types
+
+logger = logging.getLogger(__name__)
+
+
+class IngestUnit:
+    """
+    A tabular attachment that has been decoded, detected and header-parsed once.
+
+    The unit is persisted as an AttachmentIngestProfile and passed between tasks
+    as a plain dict, so table creation, data loading and retries all reuse
+    the same detection results instead of re-running them.
+
+    For CSV the unit records the detected encoding and delimiter. For the other
+    formats (Parquet, Arrow IPC, XLSX, JSON Lines) the format reader supplies
+    the headers, types and batches, and encoding/delimiter are placeholders.
+
+    A CSV unit restricted to a byte range (see for_range) covers whole data
+    records only, without the header row.
+    """
+
+    def __init__(
+        self,
+        attachment_id: str,
+        file_path: str,
+        file_hash: Optional[str],
+        encoding: str,
+        delimiter: str,
+        headers: List[str],
+        column_types: Optional[Dict[str, str]] = None,
+        byte_range: Optional[Tuple[int, int]] = None,
+        file_format: str = CSV
+    ):
+        self.attachment_id = attachment_id
+        self.file_path = file_path
+        self.file_hash = file_hash
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.headers = headers
+        self.column_types = column_types or {}
+        self.byte_range = byte_range
+        self.file_format = file_format
+
+    @classmethod
+    def prepare(
+        cls,
+        session: Session,
+        attachment: EmailAttachment,
+        profile: Optional[Dict[str, any]] = None
+    ) -> Optional[IngestUnit]:
+        """
+        Build the ingest unit for an attachment, detecting and parsing only once.
+
+        The detected format is taken from the profile passed in by the previous
+        task, then from the persisted profile, and only detected from the
+        content when neither exists; a routing rule's reader options (format,
+        encoding, delimiter) take the place of detection. A newly detected
+        profile is added to the session; the caller commits.
+
+        Args:
+            session: Database session
+            attachment: Attachment to ingest
+            profile: Profile dict carried over from a previous task
+
+        Returns:
+            The ingest unit, or None if the attachment has no content
+        """
+        # Spool the decoded content to disk (no-op if already spooled); archive
+        # members have no database content and are decompressed again instead
+        file_path = ensure_spooled(attachment) or respool_archive_member(session, attachment)
+        if not file_path:
+            return None
+
+        attachment_id = str(attachment.id)
+        if profile:
+            return cls(
+                attachment_id=attachment_id,
+                file_path=file_path,
+                file_hash=attachment.file_hash,
+                encoding=profile['encoding'],
+                delimiter=profile['delimiter'],
+                headers=profile['headers'],
+                column_types=profile.get('column_types'),
+                file_format=profile.get('file_format', CSV)
+            )
+
+        stored = session.query(AttachmentIngestProfile).filter(
+            AttachmentIngestProfile.attachment_id == attachment.id
+        ).first()
+        if stored:
+            return cls(
+                attachment_id, file_path, attachment.file_hash,
+                stored.encoding, stored.delimiter, stored.headers, stored.column_types,
+                file_format=stored.file_format
+            )
+
+        options = resolve_route(attachment.filename).options
+        file_format = routed_format(attachment.filename, attachment.content_type) or CSV
+        with open_attachment_buffer(file_path) as content:
+            native_types = None
+            if file_format == CSV:
+                headers, encoding, delimiter = CSVFileReader.parse_csv_headers(
+                    content, attachment.file_hash, options.get('encoding'), options.get('delimiter')
+                )
+            else:
+                reader = get_format_reader(file_format)
+                names, native_types = reader.read_schema(content)
+                headers, encoding, delimiter = CSVFileReader.clean_headers(names), reader.encoding, ''
+            unit = cls(
+                attachment_id, file_path, attachment.file_hash, encoding, delimiter, headers, file_format=file_format
+            )
+            if native_types is not None:
+                # Typed formats carry their column types
+                unit.column_types = {header: native_types[i] for i, header in enumerate(headers)}
+            elif headers:
+                # Infer column types from the head of the file
+                sample_rows = next(unit.iter_batches(content, TYPE_INFERENCE_SAMPLE_ROWS), [])
+                unit.column_types = infer_column_types(headers, sample_rows)
+
+        if headers:
+            session.add(AttachmentIngestProfile(
+                attachment_id=attachment.id,
+                file_hash=attachment.file_hash,
+                encoding=encoding,
+                delimiter=delimiter,
+                headers=headers,
+                column_types=unit.column_types,
+                file_format=file_format
+            ))
+        logger.info(
+            f"Detected {file_format} profile for attachment {attachment_id}: {encoding}, '{delimiter}', {len(headers)} headers"
+        )
+        return unit
+
+    def to_dict(self) -> Dict[str, any]:
+        """Serialize the detected profile for passing to the next task."""
+        return {
+            'attachment_id': self.attachment_id,
+            'encoding': self.encoding,
+            'delimiter': self.delimiter,
+            'headers': self.headers,
+            'column_types': self.column_types,
+            'file_format': self.file_format
+        }
+
+    def for_range(self, start: int, end: int) -> IngestUnit:
+        """Return a unit covering the data records in bytes [start, end) of the file."""
+        return IngestUnit(
+            self.attachment_id, self.file_path, self.file_hash, self.encoding,
+            self.delimiter, self.headers, self.column_types, byte_range=(start, end), file_format=self.file_format
+        )
+
+    @contextmanager
+    def open(self) -> Iterator[ContentBuffer]:
+        """Open the attachment content (or the unit's byte range of it) as a memory-mapped buffer."""
+        with open_attachment_buffer(self.file_path) as content:
+            if self.byte_range:
+                start, end = self.byte_range
+                content = content[start:end]
+            try:
+                yield content
+            finally:
+                if self.byte_range:
+                    content.release()
+
+    def iter_batches(self, content: ContentBuffer, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[CSVRow]]:
+        """
+        Stream the data rows of the attachment in batches, as text.
+
+        Args:
+            content: Buffer returned by open()
+            batch_size: Maximum number of rows per batch
+
+        Yields:
+            Lists of row tuples in header order
+        """
+        if self.file_format != CSV:
+            return get_format_reader(self.file_format).iter_rows(self, content, batch_size)
+        return CSVFileReader.iter_csv_batches(
+            content, self.headers, self.encoding, self.delimiter, batch_size,
+            skip_header=self.byte_range is None
+        )
+
+    def ingest_engine(self, filename: str, content_type: Optional[str] = None):
+        """
+        Return the engine that streams load batches for this unit.
+
+        CSV units use the engine of the attachment's routing rule, else the one
+        configured for its type; other formats are read by their format reader.
+
+        Args:
+            filename: Attachment filename
+            content_type: Attachment MIME type
+
+        Returns:
+            Engine (or format reader) instance
+        """
+        if self.file_format != CSV:
+            return get_format_reader(self.file_format)
+        engine = resolve_route(filename).options.get('engine')
+        return get_ingest_engine(engine) if engine else select_ingest_engine(filename, content_type)
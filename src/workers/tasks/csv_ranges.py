@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.workers.tasks.csv_file_reader import ContentBuffer
+from src.workers.tasks.format_readers import CSV
+from src.workers.tasks.schema_registry import quote_identifier, quote_identifiers
+
+logger = logging.getLogger(__name__)
+
+# A half-open byte range [start, end) of whole CSV records
+ByteRange = Tuple[int, int]
+
+# Bytes scanned at a time when looking for a record boundary
+BOUNDARY_SCAN_SIZE = 64 * 1024
+
+QUOTE = b'"'
+NEWLINE = b'\n'
+
+# Prefix of the staging tables that range loads are copied into
+RANGE_STAGE_PREFIX = "_ingest_range_"
+
+
+def can_split_encoding(encoding: str) -> bool:
+    """Return whether quotes and newlines are single ASCII bytes in an encoding (not UTF-16/32)."""
+    try:
+        return '"\n'.encode(encoding) == QUOTE + NEWLINE
+    except (LookupError, UnicodeError):
+        return False
+
+
+def _count_quotes(view: memoryview, start: int, end: int) -> int:
+    return sum(
+        bytes(view[offset:min(offset + BOUNDARY_SCAN_SIZE, end)]).count(QUOTE)
+        for offset in range(start, end, BOUNDARY_SCAN_SIZE)
+    )
+
+
+def _next_record_boundary(view: memoryview, position: int, in_quotes: bool) -> Tuple[int, bool]:
+    """
+    Find the first newline at or after position that ends a record.
+
+    A newline ends a record when it is not inside a quoted value, i.e. an even
+    number of quotes precede it (escaped quotes are doubled, so they do not
+    change the parity).
+
+    Args:
+        view: File content
+        position: Offset to start looking at
+        in_quotes: Whether position is inside a quoted value
+
+    Returns:
+        Tuple of (offset just past the newline or the end of the content, whether
+        the end of the content was reached inside a quoted value)
+    """
+    size = len(view)
+    while position < size:
+        chunk = bytes(view[position:position + BOUNDARY_SCAN_SIZE])
+        newline = chunk.find(NEWLINE)
+        if newline < 0:
+            in_quotes ^= chunk.count(QUOTE) % 2 == 1
+            position += len(chunk)
+            continue
+        in_quotes ^= chunk.count(QUOTE, 0, newline) % 2 == 1
+        position += newline + 1
+        if not in_quotes:
+            return position, False
+    return size, in_quotes
+
+
+def split_csv_ranges(content: ContentBuffer, range_bytes: int) -> Optional[List[ByteRange]]:
+    """
+    Split CSV content after the header record into ranges of whole records.
+
+    Each range ends at the first record boundary after range_bytes, so
+    newlines inside quoted values never split a record. Only quote bytes are
+    counted (in C), so splitting costs a fraction of parsing the file.
+
+    Args:
+        content: Raw file content in a splittable encoding (see can_split_encoding)
+        range_bytes: Target size of each range
+
+    Returns:
+        Consecutive ranges covering all data records, or None if the quoting
+        is unbalanced (a stray quote makes the boundaries unreliable)
+    """
+    view = memoryview(content)
+    size = len(view)
+    start, in_quotes = _next_record_boundary(view, 0, False)
+    if in_quotes:
+        return None
+
+    ranges: List[ByteRange] = []
+    while start < size:
+        target = min(start + range_bytes, size)
+        in_quotes = _count_quotes(view, start, target) % 2 == 1
+        end, in_quotes = _next_record_boundary(view, target, in_quotes)
+        if in_quotes:
+            return None
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def plan_csv_ranges(unit) -> Optional[List[ByteRange]]:
+    """
+    Decide whether an attachment is loaded in parallel ranges, and compute them.
+
+    Files smaller than PARALLEL_INGEST_MIN_BYTES, in encodings that cannot be
+    split on bytes, or with unbalanced quoting, and non-CSV formats are loaded
+    by a single task.
+
+    Args:
+        unit: IngestUnit of the attachment
+
+    Returns:
+        Byte ranges of PARALLEL_INGEST_RANGE_BYTES each, or None to load the file whole
+    """
+    if unit.file_format != CSV or os.path.getsize(unit.file_path) < settings.PARALLEL_INGEST_MIN_BYTES:
+        return None
+    if not can_split_encoding(unit.encoding):
+        logger.info(f"Not splitting attachment {unit.attachment_id}: {unit.encoding} is not byte-splittable")
+        return None
+
+    with unit.open() as content:
+        ranges = split_csv_ranges(content, settings.PARALLEL_INGEST_RANGE_BYTES)
+    if ranges is None:
+        logger.warning(f"Not splitting attachment {unit.attachment_id}: unbalanced quotes")
+        return None
+    return ranges if len(ranges) > 1 else None
+
+
+def range_stage_table(attachment_id: str, index: int) -> str:
+    """Name of the staging table a range of an attachment is loaded into."""
+    return f"{RANGE_STAGE_PREFIX}{attachment_id.replace('-', '')}_{index}"
+
+
+def create_range_stage(session: Session, stage_table: str, table_name: str, columns: List[str]) -> None:
+    """
+    Create (or empty, on a retry) the staging table of a range.
+
+    Staging tables are unlogged copies of the load columns of the target
+    table; they are merged and dropped by drop_range_stages.
+
+    Args:
+        session: Database session
+        stage_table: Staging table name
+        table_name: Target table name
+        columns: Load columns
+    """
+    session.execute(text(
+        f"CREATE UNLOGGED TABLE IF NOT EXISTS {quote_identifier(stage_table)} AS "
+        f"SELECT {quote_identifiers(columns)} FROM {quote_identifier(table_name)} WITH NO DATA"
+    ))
+    session.execute(text(f"TRUNCATE {quote_identifier(stage_table)}"))
+
+
+def drop_range_stages(session: Session, attachment_id: str) -> int:
+    """
+    Drop the staging tables of an attachment, including leftovers of failed attempts.
+
+    Args:
+        session: Database session
+        attachment_id: UUID of the attachment
+
+    Returns:
+        Number of tables dropped
+    """
+    prefix = range_stage_table(attachment_id, 0)[:-1]
+    stage_tables = session.execute(text("""
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = 'public' AND starts_with(tablename, :prefix)
+    """), {'prefix': prefix}).scalars().all()
+    for stage_table in stage_tables:
+        session.execute(text(f"DROP TABLE IF EXISTS {quote_identifier(stage_table)}"))
+    return len(stage_tables)
@@ -2,19 +2,22 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from uuid import UUID
 
 from celery import Celery
 from celery.schedules import crontab
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, func, text
 from sqlalchemy.orm import sessionmaker
 
+from src.core.attachment_storage import spool_attachment_content, spool_attachment_stream
 from src.core.config import settings
 from src.core.imap_service import create_imap_service
 from src.models.email import EmailAccount, EmailMessage, EmailAttachment
 from src.workers.celery_app import celery_app
+from src.workers.tasks.outbox import ATTACHMENT_STORED, add_outbox_event, dispatch_outbox_events
+from src.workers.tasks.processing_state import create_processing_state
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +26,86 @@ engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def build_email_message(
+    account_id: str,
+    uid: int,
+    headers: Dict[str, any],
+    text_body: Optional[str],
+    html_body: Optional[str],
+    processing_status: str = "completed"
+) -> EmailMessage:
+    """Build the record of a fetched message from its headers and bodies ("pending" until they are stored)."""
+    return EmailMessage(
+        account_id=account_id,
+        message_id=headers.get("message_id", f"uid_{uid}"),
+        uid=uid,
+        folder="INBOX",
+        subject=headers.get("subject"),
+        from_address=headers.get("from"),
+        to_address=headers.get("to"),
+        cc_address=headers.get("cc"),
+        bcc_address=headers.get("bcc"),
+        reply_to=headers.get("reply_to"),
+        body_text=text_body,
+        body_html=html_body,
+        date_sent=datetime.fromisoformat(headers.get("date")) if headers.get("date") else None,
+        date_received=datetime.utcnow(),
+        is_read="\\Seen" in headers.get("flags", []),
+        is_flagged="\\Flagged" in headers.get("flags", []),
+        is_deleted="\\Deleted" in headers.get("flags", []),
+        is_draft="\\Draft" in headers.get("flags", []),
+        is_answered="\\Answered" in headers.get("flags", []),
+        processing_status=processing_status,
+        processed_at=datetime.utcnow() if processing_status == "completed" else None
+    )
+
+
+def lock_email_message(session, account_id: str, uid: int, wait: bool = True) -> bool:
+    """
+    Serialize storing a message of an account until the current transaction ends.
+    
+    Args:
+        session: Database session
+        account_id: UUID of the email account
+        uid: IMAP UID of the message
+        wait: Wait for the lock; otherwise give up if another transaction holds it
+        
+    Returns:
+        Whether the lock was taken
+    """
+    key = f"email_message:{account_id}:{uid}"
+    if wait:
+        session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {'key': key})
+        return True
+    return bool(session.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"), {'key': key}).scalar())
+
+
+def store_attachment(session, email_message: EmailMessage, outbox_events: List, **fields) -> EmailAttachment:
+    """
+    Add an attachment of a message and queue its ingest in the same transaction (the caller commits).
+    
+    Args:
+        session: Database session
+        email_message: Message the attachment belongs to (flushed)
+        outbox_events: Outbox events to dispatch after the commit; appended to
+        **fields: EmailAttachment fields
+        
+    Returns:
+        The new attachment
+    """
+    attachment = EmailAttachment(message_id=email_message.id, **fields)
+    session.add(attachment)
+    # Queue CSV and compressed attachments for ingest in the same transaction
+    if create_processing_state(session, attachment):
+        outbox_events.append(add_outbox_event(session, ATTACHMENT_STORED, {
+            'attachment_id': str(attachment.id),
+            'filename': attachment.filename,
+            'content_type': attachment.content_type,
+            'size': attachment.size
+        }))
+    return attachment
+
+
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
 def sync_email_account(self, account_id: str) -> Dict[str, any]:
     """
@@ -49,6 +132,7 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
         
         messages_processed = 0
         messages_failed = 0
+        deferred_message_ids = []
         sync_started_at = datetime.utcnow()
         
         # Connect and process emails using asyncio
@@ -67,9 +151,16 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
             async with imap_service:
                 # Get recent messages (last 50)
                 message_ids = await imap_service.search_messages("ALL", limit=50)
+                # Sizes first, so large messages are never fetched whole here
+                message_sizes = await imap_service.fetch_message_sizes(message_ids)
                 
                 for message_id in message_ids:
                     try:
+                        # A large message's task holds the lock while it streams the message
+                        if not lock_email_message(session, account_id, message_id, wait=False):
+                            logger.debug(f"Message {message_id} is being stored by another task, skipping")
+                            continue
+                        
                         # Check if message already exists
                         existing_msg = session.query(EmailMessage).filter(
                             EmailMessage.account_id == account_id,
@@ -77,7 +168,34 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
                         ).first()
                         
                         if existing_msg:
+                            pending_since = datetime.now(timezone.utc) - timedelta(
+                                minutes=settings.LARGE_MESSAGE_PENDING_MINUTES
+                            )
+                            if existing_msg.processing_status == "pending" and existing_msg.updated_at < pending_since:
+                                # Its task was lost; queue it again
+                                existing_msg.updated_at = func.now()
+                                session.commit()
+                                deferred_message_ids.append(message_id)
+                                logger.warning(f"Message {message_id} is still pending, deferring it again")
+                                continue
                             logger.debug(f"Message {message_id} already exists, skipping")
+                            session.rollback()  # Release the message lock
+                            continue
+                        
+                        if message_sizes.get(message_id, 0) > settings.LARGE_MESSAGE_BYTES:
+                            # Streamed part by part by a worker of the large-task queue; the
+                            # pending record keeps later syncs from queueing it again
+                            headers = await imap_service.fetch_message_headers(message_id)
+                            email_message = build_email_message(
+                                account_id, message_id, headers, None, None, processing_status="pending"
+                            )
+                            email_message.size = message_sizes[message_id]
+                            session.add(email_message)
+                            session.commit()
+                            deferred_message_ids.append(message_id)
+                            logger.info(
+                                f"Deferring message {message_id} ({message_sizes[message_id]} bytes) to the large-task queue"
+                            )
                             continue
                         
                         # Fetch message data
@@ -86,55 +204,44 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
                         attachments = await imap_service.fetch_message_attachments(message_id)
                         
                         # Create message record
-                        email_message = EmailMessage(
-                            account_id=account_id,
-                            message_id=headers.get("message_id", f"uid_{message_id}"),
-                            uid=message_id,
-                            folder="INBOX",
-                            subject=headers.get("subject"),
-                            from_address=headers.get("from"),
-                            to_address=headers.get("to"),
-                            cc_address=headers.get("cc"),
-                            bcc_address=headers.get("bcc"),
-                            reply_to=headers.get("reply_to"),
-                            body_text=text_body,
-                            body_html=html_body,
-                            date_sent=datetime.fromisoformat(headers.get("date")) if headers.get("date") else None,
-                            date_received=datetime.utcnow(),
-                            is_read="\\Seen" in headers.get("flags", []),
-                            is_flagged="\\Flagged" in headers.get("flags", []),
-                            is_deleted="\\Deleted" in headers.get("flags", []),
-                            is_draft="\\Draft" in headers.get("flags", []),
-                            is_answered="\\Answered" in headers.get("flags", []),
-                            processing_status="completed",
-                            processed_at=datetime.utcnow()
-                        )
+                        email_message = build_email_message(account_id, message_id, headers, text_body, html_body)
                         
                         session.add(email_message)
                         session.flush()  # Get the ID
                         
                         # Process attachments
+                        outbox_events = []
                         for attachment_data in attachments:
                             # Convert binary content to base64 string for storage
                             content = attachment_data.get("content")
                             content_base64 = None
+                            file_path = None
+                            file_hash = None
                             if content:
                                 import base64
                                 content_base64 = base64.b64encode(content).decode('utf-8')
+                                # Spool to a content-addressed file for zero-copy reads
+                                file_path, file_hash = spool_attachment_content(content)
                             
-                            attachment = EmailAttachment(
-                                message_id=email_message.id,
+                            store_attachment(
+                                session,
+                                email_message,
+                                outbox_events,
                                 filename=attachment_data["filename"],
                                 content_type=attachment_data["content_type"],
                                 size=attachment_data["size"],
                                 content_disposition=attachment_data.get("content_disposition"),
                                 content_id=attachment_data.get("content_id"),
+                                file_path=file_path,
+                                file_hash=file_hash,  # Used to skip re-ingesting identical files
                                 content=content_base64  # Store base64 encoded content
                             )
-                            session.add(attachment)
                         
                         session.commit()
                         messages_processed += 1
+                        
+                        # Start ingest right away; undispatched events are retried by dispatch_outbox
+                        dispatch_outbox_events(session, [event.id for event in outbox_events])
                         logger.info(f"Processed message {message_id}: {headers.get('subject', 'No subject')}")
                         
                     except Exception as e:
@@ -146,6 +253,9 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
         # Run the async function
         asyncio.run(process_emails())
         
+        for message_id in deferred_message_ids:
+            sync_large_message.apply_async((account_id, message_id), queue=settings.LARGE_TASK_QUEUE)
+        
         # Update account last sync time
         account.last_sync = datetime.utcnow()
         session.commit()
@@ -157,6 +267,7 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
             "account_id": account_id,
             "messages_processed": messages_processed,
             "messages_failed": messages_failed,
+            "messages_deferred": len(deferred_message_ids),
             "sync_started_at": sync_started_at.isoformat(),
             "sync_completed_at": sync_completed_at.isoformat(),
             "duration_seconds": (sync_completed_at - sync_started_at).total_seconds()
@@ -173,6 +284,131 @@ def sync_email_account(self, account_id: str) -> Dict[str, any]:
         session.close()
 
 
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def sync_large_message(self, account_id: str, uid: int) -> Dict[str, any]:
+    """
+    Store a message too large to fetch whole, streaming its attachments into the spool.
+    
+    Queued by sync_email_account on the large-task queue for messages over
+    LARGE_MESSAGE_BYTES. The message's structure (BODYSTRUCTURE) is fetched
+    first; each attachment is then fetched IMAP_FETCH_CHUNK_BYTES at a time
+    with partial fetches, decoded and spooled as it arrives, so memory use
+    does not depend on the message size. Attachment content is only kept in
+    the spool, not in the database.
+    
+    The message's lock is held until the commit, and the "pending" record
+    added by sync_email_account is completed in place, so a message queued
+    twice is stored once.
+    
+    Args:
+        account_id: UUID of the email account
+        uid: IMAP UID of the message in the account's INBOX
+        
+    Returns:
+        Dict with the stored attachments
+    """
+    session = SessionLocal()
+    try:
+        account = session.query(EmailAccount).filter(EmailAccount.id == account_id).first()
+        if not account:
+            raise ValueError(f"Email account {account_id} not found")
+        
+        lock_email_message(session, account_id, uid)
+        existing_msg = session.query(EmailMessage).filter(
+            EmailMessage.account_id == account_id,
+            EmailMessage.uid == uid
+        ).first()
+        if existing_msg and existing_msg.processing_status != "pending":
+            logger.info(f"Message {uid} already exists, skipping")
+            return {"status": "already_synced", "account_id": account_id, "uid": uid}
+        
+        async def stream_message():
+            imap_service = create_imap_service(
+                server=account.imap_server,
+                port=account.imap_port,
+                username=account.username,
+                password=account.password,
+                use_ssl=account.use_ssl
+            )
+            
+            async with imap_service:
+                await imap_service.select_folder("INBOX")
+                headers = await imap_service.fetch_message_headers(uid) if not existing_msg else None
+                parts = await imap_service.fetch_message_structure(uid)
+                
+                # Inline text bodies are read whole unless they are large themselves
+                bodies = {}
+                for part in parts:
+                    if part.is_attachment or part.content_type not in ("text/plain", "text/html"):
+                        continue
+                    if part.content_type in bodies or part.size > settings.LARGE_MESSAGE_BYTES:
+                        continue
+                    content = imap_service.open_message_part(uid, part).read()
+                    try:
+                        bodies[part.content_type] = content.decode(part.charset or "utf-8", errors="ignore")
+                    except LookupError:
+                        bodies[part.content_type] = content.decode("utf-8", errors="ignore")
+                
+                if existing_msg:
+                    email_message = existing_msg
+                    email_message.body_text = bodies.get("text/plain")
+                    email_message.body_html = bodies.get("text/html")
+                    email_message.processing_status = "completed"
+                    email_message.processed_at = datetime.utcnow()
+                else:
+                    email_message = build_email_message(
+                        account_id, uid, headers, bodies.get("text/plain"), bodies.get("text/html")
+                    )
+                    session.add(email_message)
+                    session.flush()  # Get the ID
+                
+                outbox_events = []
+                attachments = []
+                for part in parts:
+                    if not part.is_attachment:
+                        continue
+                    file_path, file_hash, size = spool_attachment_stream(imap_service.open_message_part(uid, part))
+                    attachments.append(store_attachment(
+                        session,
+                        email_message,
+                        outbox_events,
+                        filename=part.filename,
+                        content_type=part.content_type,
+                        size=size,
+                        content_disposition=part.disposition,
+                        content_id=part.content_id,
+                        file_path=file_path,
+                        file_hash=file_hash  # Used to skip re-ingesting identical files
+                    ))
+                    logger.info(f"Streamed attachment {part.filename} ({size} bytes) of message {uid}")
+                
+                session.commit()
+                
+                # Start ingest right away; undispatched events are retried by dispatch_outbox
+                dispatch_outbox_events(session, [event.id for event in outbox_events])
+                return email_message, attachments
+        
+        email_message, attachments = asyncio.run(stream_message())
+        
+        return {
+            "status": "completed",
+            "account_id": account_id,
+            "uid": uid,
+            "message_id": str(email_message.id),
+            "attachments": [
+                {"attachment_id": str(attachment.id), "filename": attachment.filename, "size": attachment.size}
+                for attachment in attachments
+            ]
+        }
+        
+    except Exception as e:
+        logger.error(f"Streaming message {uid} of account {account_id} failed: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
 @celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
 def sync_all_active_accounts(self) -> Dict[str, any]:
     """
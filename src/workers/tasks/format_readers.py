@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from pathlib import PurePosixPath
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+import pandas as pd
+
+from src.workers.tasks.csv_file_reader import DEFAULT_BATCH_SIZE, BufferStream, ContentBuffer, CSVFileReader, CSVRow
+from src.workers.tasks.ingest_engines import LoadBatch
+from src.workers.tasks.type_inference import (
+    BOOLEAN,
+    DATE,
+    INTEGER,
+    NUMERIC,
+    TEXT,
+    TIMESTAMP,
+    TIMESTAMPTZ,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - optional dependency
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+# Attachment formats
+CSV = "csv"
+PARQUET = "parquet"
+ARROW = "arrow"
+XLSX = "xlsx"
+JSONL = "jsonl"
+
+FORMAT_EXTENSIONS = {
+    ".csv": CSV,
+    ".parquet": PARQUET,
+    ".arrow": ARROW,
+    ".feather": ARROW,
+    ".ipc": ARROW,
+    ".xlsx": XLSX,
+    ".jsonl": JSONL,
+    ".ndjson": JSONL,
+}
+FORMAT_CONTENT_TYPES = {
+    "text/csv": CSV,
+    "application/vnd.apache.parquet": PARQUET,
+    "application/x-parquet": PARQUET,
+    "application/vnd.apache.arrow.file": ARROW,
+    "application/vnd.apache.arrow.stream": ARROW,
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": XLSX,
+    "application/x-ndjson": JSONL,
+    "application/jsonl": JSONL,
+}
+
+# MIME type given to archive members of each format
+CONTENT_TYPES_BY_FORMAT = {
+    CSV: "text/csv",
+    PARQUET: "application/vnd.apache.parquet",
+    ARROW: "application/vnd.apache.arrow.file",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    JSONL: "application/x-ndjson",
+}
+
+# Records scanned for the keys of a JSON Lines file; keys first seen later are not loaded
+JSONL_SCHEMA_SAMPLE_RECORDS = 1000
+
+
+def attachment_format(filename: Optional[str], content_type: Optional[str] = None) -> Optional[str]:
+    """
+    Return the data format of an attachment, by extension first and then MIME type.
+
+    Args:
+        filename: Attachment filename
+        content_type: Attachment MIME type
+
+    Returns:
+        CSV, PARQUET, ARROW, XLSX or JSONL, or None if the attachment is not ingested
+    """
+    suffix = PurePosixPath((filename or "").lower()).suffix
+    if suffix in FORMAT_EXTENSIONS:
+        return FORMAT_EXTENSIONS[suffix]
+    mime_type = (content_type or "").lower().split(";")[0].strip()
+    if mime_type in FORMAT_CONTENT_TYPES:
+        return FORMAT_CONTENT_TYPES[mime_type]
+    return CSV if "csv" in mime_type else None
+
+
+def text_value(value: Any) -> Optional[str]:
+    """Render a typed value as the text type inference and natural keys work on."""
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dt.datetime, pd.Timestamp)):
+        return value.isoformat(sep=" ")
+    if isinstance(value, dt.date):
+        return value.isoformat()
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    if hasattr(value, "tolist"):
+        # Nested Arrow values arrive as numpy arrays
+        return json.dumps(value.tolist(), default=str)
+    return value
+
+
+class FormatReader(ABC):
+    """
+    Reader for a non-CSV attachment format, used as the ingest engine for its units.
+
+    Subclasses read the column names (and, when the format is typed, their
+    types) and stream DataFrames with one column per header; batches for
+    BulkLoader and text rows for type and natural key inference are derived
+    from those frames, so every format feeds the same loading path.
+    """
+
+    name = ""
+    # Stored as the unit's encoding (the profile requires one)
+    encoding = "binary"
+
+    @abstractmethod
+    def read_schema(self, content: ContentBuffer) -> Tuple[List[str], Optional[Dict[int, str]]]:
+        """
+        Read the raw column names and, for typed formats, the type of each column position.
+
+        Args:
+            content: Raw file content
+
+        Returns:
+            Tuple of (column names, inferred type name by position or None)
+        """
+
+    @abstractmethod
+    def iter_frames(self, content: ContentBuffer, headers: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Stream the data as DataFrames.
+
+        Args:
+            content: Raw file content
+            headers: Cleaned headers, one per column position
+            batch_size: Preferred number of rows per frame
+
+        Yields:
+            DataFrames with the headers as columns (None for missing values)
+        """
+
+    def iter_rows(self, unit, content: ContentBuffer, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[CSVRow]]:
+        """
+        Stream the data as text row tuples in header order (for inference).
+
+        Args:
+            unit: IngestUnit of the attachment
+            content: Buffer returned by unit.open()
+            batch_size: Maximum number of rows per batch
+
+        Yields:
+            Lists of row tuples
+        """
+        for frame in self.iter_frames(content, unit.headers, batch_size):
+            for offset in range(0, len(frame), batch_size):
+                chunk = frame.iloc[offset:offset + batch_size]
+                yield [tuple(text_value(value) for value in row) for row in chunk.itertuples(index=False, name=None)]
+
+    def iter_batches(
+        self,
+        unit,
+        content: ContentBuffer,
+        columns: Sequence[str],
+        row_metadata: Tuple,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[LoadBatch]:
+        """
+        Stream load-ready batches from an ingest unit (the ingest engine interface).
+
+        Args:
+            unit: IngestUnit of the attachment
+            content: Buffer returned by unit.open()
+            columns: Headers to load, in load order
+            row_metadata: Values appended to every row (provenance columns)
+            batch_size: Preferred number of rows per batch
+
+        Yields:
+            DataFrames with the selected columns followed by the metadata columns
+        """
+        columns = list(columns)
+        metadata_columns = [f"__metadata_{i}" for i in range(len(row_metadata))]
+
+        for frame in self.iter_frames(content, unit.headers, batch_size):
+            frame = frame[columns].copy()
+            for column, value in zip(metadata_columns, row_metadata):
+                frame[column] = value
+            yield frame
+
+
+class ArrowFormatReader(FormatReader):
+    """Base for pyarrow-backed formats: batches are read from the buffer without copying."""
+
+    def _require_pyarrow(self) -> None:
+        if pa is None:
+            raise RuntimeError(f"pyarrow is required to ingest {self.name} attachments")
+
+    @abstractmethod
+    def open_schema(self, source) -> "pa.Schema":
+        """Read the Arrow schema from a pyarrow input stream."""
+
+    @abstractmethod
+    def iter_record_batches(self, source, batch_size: int) -> Iterator["pa.RecordBatch"]:
+        """Stream record batches of about batch_size rows from a pyarrow input stream."""
+
+    def read_schema(self, content: ContentBuffer) -> Tuple[List[str], Optional[Dict[int, str]]]:
+        self._require_pyarrow()
+        schema = self.open_schema(pa.BufferReader(pa.py_buffer(content)))
+        return list(schema.names), {i: arrow_column_type(field.type) for i, field in enumerate(schema)}
+
+    def iter_frames(self, content: ContentBuffer, headers: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        self._require_pyarrow()
+        for record_batch in self.iter_record_batches(pa.BufferReader(pa.py_buffer(content)), batch_size):
+            # Integer columns with nulls stay integers (not float) so they load as bigint
+            frame = record_batch.to_pandas(integer_object_nulls=True, date_as_object=True)
+            frame.columns = headers
+            for position, field in enumerate(record_batch.schema):
+                if pa.types.is_nested(field.type):
+                    frame[headers[position]] = frame[headers[position]].map(_json_value)
+            yield frame.astype(object).where(frame.notna(), None)
+
+
+class ParquetReader(ArrowFormatReader):
+    """Apache Parquet files, read row group by row group."""
+
+    name = PARQUET
+
+    def open_schema(self, source) -> "pa.Schema":
+        return pq.ParquetFile(source).schema_arrow
+
+    def iter_record_batches(self, source, batch_size: int) -> Iterator["pa.RecordBatch"]:
+        return pq.ParquetFile(source).iter_batches(batch_size=batch_size)
+
+
+class ArrowIPCReader(ArrowFormatReader):
+    """Arrow IPC files (Feather v2) and streams; record batches reference the buffer directly."""
+
+    name = ARROW
+
+    @staticmethod
+    def _open(source):
+        try:
+            return pa.ipc.open_file(source)
+        except pa.ArrowInvalid:
+            source.seek(0)
+            return pa.ipc.open_stream(source)
+
+    def open_schema(self, source) -> "pa.Schema":
+        return self._open(source).schema
+
+    def iter_record_batches(self, source, batch_size: int) -> Iterator["pa.RecordBatch"]:
+        reader = self._open(source)
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+        else:
+            yield from reader
+
+
+class XLSXReader(FormatReader):
+    """Excel workbooks; the first worksheet is streamed row by row in openpyxl's read-only mode."""
+
+    name = XLSX
+
+    def _iter_sheet_rows(self, content: ContentBuffer) -> Iterator[Tuple]:
+        if openpyxl is None:
+            raise RuntimeError("openpyxl is required to ingest xlsx attachments")
+        workbook = openpyxl.load_workbook(BufferStream(content), read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                if any(value is not None for value in row):
+                    yield row
+        finally:
+            workbook.close()
+
+    def read_schema(self, content: ContentBuffer) -> Tuple[List[str], Optional[Dict[int, str]]]:
+        header = next(self._iter_sheet_rows(content), ())
+        return [value if value is not None else "" for value in header], None
+
+    def iter_frames(self, content: ContentBuffer, headers: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        width = len(headers)
+        rows = self._iter_sheet_rows(content)
+        next(rows, None)
+        batch = []
+        for row in rows:
+            batch.append((tuple(row) + (None,) * width)[:width])
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=headers, dtype=object)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=headers, dtype=object)
+
+
+class JSONLinesReader(FormatReader):
+    """JSON Lines: one object per line; columns are the keys seen in the first records."""
+
+    name = JSONL
+    encoding = "utf-8"
+
+    def _iter_records(self, content: ContentBuffer) -> Iterator[Dict[str, Any]]:
+        with CSVFileReader.open_text_stream(content, self.encoding) as text_stream:
+            for line in text_stream:
+                line = line.strip()
+                if line:
+                    record = json.loads(line, parse_float=Decimal)
+                    if isinstance(record, dict):
+                        yield record
+
+    def read_schema(self, content: ContentBuffer) -> Tuple[List[str], Optional[Dict[int, str]]]:
+        keys: Dict[str, None] = {}
+        for count, record in enumerate(self._iter_records(content)):
+            if count >= JSONL_SCHEMA_SAMPLE_RECORDS:
+                break
+            keys.update(dict.fromkeys(record))
+        return list(keys), None
+
+    def iter_frames(self, content: ContentBuffer, headers: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        # Headers are cleaned in key order, so keys map to headers positionally
+        keys, _ = self.read_schema(content)
+        batch = []
+        for record in self._iter_records(content):
+            batch.append(tuple(_json_value(record.get(key)) for key in keys))
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=headers, dtype=object)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=headers, dtype=object)
+
+
+def arrow_column_type(arrow_type) -> str:
+    """Map an Arrow data type to an inferred type name."""
+    if pa.types.is_boolean(arrow_type):
+        return BOOLEAN
+    if pa.types.is_integer(arrow_type):
+        return INTEGER
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return NUMERIC
+    if pa.types.is_date(arrow_type):
+        return DATE
+    if pa.types.is_timestamp(arrow_type):
+        return TIMESTAMPTZ if arrow_type.tz else TIMESTAMP
+    return TEXT
+
+
+FORMAT_READERS: Dict[str, Type[FormatReader]] = {
+    ParquetReader.name: ParquetReader,
+    ArrowIPCReader.name: ArrowIPCReader,
+    XLSXReader.name: XLSXReader,
+    JSONLinesReader.name: JSONLinesReader,
+}
+
+
+def get_format_reader(file_format: str) -> FormatReader:
+    """
+    Instantiate the reader of a non-CSV format.
+
+    Args:
+        file_format: Format name (see attachment_format)
+
+    Returns:
+        Reader instance
+    """
+    if file_format not in FORMAT_READERS:
+        raise ValueError(f"No reader for format '{file_format}', expected one of {sorted(FORMAT_READERS)}")
+    return FORMAT_READERS[file_format]()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.models.email import AttachmentIngest, AttachmentProcessingState, EmailAttachment, IngestBatch, IngestColumnStats
+from src.workers.tasks.processing_state import PENDING
+from src.workers.tasks.schema_registry import TableSchema
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_batch_index_name(table_name: str) -> str:
+    """Name of the index on a table's ingest_batch_id column (within the 63 byte limit)."""
+    return f"ix_{table_name[:40]}_ingest_batch_id"
+
+
+def create_ingest_batch_index(session: Session, table_name: str) -> None:
+    """
+    Index the batch id of a table's rows, so one batch can be deleted without a full scan.
+
+    Batches are appended in id order, so a BRIN index stays a few pages in
+    size however large the table grows.
+
+    Args:
+        session: Database session
+        table_name: Table name
+    """
+    session.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {ingest_batch_index_name(table_name)} "
+        f"ON {table_name} USING brin (ingest_batch_id)"
+    ))
+
+
+def allocate_ingest_batch_id(session: Session) -> int:
+    """
+    Reserve an ingest batch id for a load.
+
+    The id is taken from the sequence up front, so rows (and range staging
+    tables) can carry it before the batch is recorded in the load's final
+    transaction; a failed load only leaves a gap in the sequence.
+
+    Args:
+        session: Database session
+
+    Returns:
+        The batch id
+    """
+    return session.execute(text("SELECT nextval(pg_get_serial_sequence('ingest_batches', 'id'))")).scalar()
+
+
+def row_metadata(
+    schema: TableSchema,
+    attachment: EmailAttachment,
+    attachment_date: Optional[datetime],
+    ingest_batch_id: Optional[int],
+    inserted_at: datetime
+) -> Tuple:
+    """
+    Return the provenance values loaded with every row of an attachment (see metadata_columns).
+
+    Args:
+        schema: Schema of the target table
+        attachment: Attachment being loaded
+        attachment_date: Date extracted from the filename
+        ingest_batch_id: Batch id of the load (tables with batch provenance)
+        inserted_at: Insertion timestamp (tables without batch provenance)
+
+    Returns:
+        Tuple of values in metadata column order
+    """
+    if schema.batch_provenance:
+        return (attachment_date, ingest_batch_id)
+    return (inserted_at, attachment_date, str(attachment.id), attachment.filename)
+
+
+def record_ingest_batch(
+    session: Session,
+    ingest_batch_id: int,
+    attachment: EmailAttachment,
+    table_name: str,
+    attachment_date: Optional[datetime],
+    rows_inserted: int
+) -> IngestBatch:
+    """
+    Record the provenance of a load in the same transaction as its rows (the caller commits).
+
+    Args:
+        session: Database session
+        ingest_batch_id: Id from allocate_ingest_batch_id
+        attachment: Loaded attachment
+        table_name: Target table name
+        attachment_date: Date extracted from the filename
+        rows_inserted: Number of rows loaded
+
+    Returns:
+        The batch
+    """
+    batch = IngestBatch(
+        id=ingest_batch_id,
+        table_name=table_name,
+        attachment_id=attachment.id,
+        source_filename=attachment.filename,
+        attachment_date=attachment_date,
+        rows_inserted=rows_inserted
+    )
+    session.add(batch)
+    return batch
+
+
+def delete_ingest_batch(session: Session, ingest_batch_id: int, reload: bool = False) -> int:
+    """
+    Delete the rows of one ingest batch and forget that its content was loaded (the caller commits).
+
+    The delete is bounded to the batch's partition when it has a report date.
+    The attachment's ingest registry entry and the batch's column statistics
+    are removed too, so its content is not skipped as already loaded. The
+    attachment itself stays completed (a bad report is not loaded again)
+    unless reload is set: then its processing state is reset to pending with
+    no attempts, and the sweep loads it again.
+
+    Args:
+        session: Database session
+        ingest_batch_id: Batch to delete
+        reload: Queue the attachment to be loaded again
+
+    Returns:
+        Number of rows deleted
+    """
+    batch = session.get(IngestBatch, ingest_batch_id)
+    if batch is None:
+        raise ValueError(f"Ingest batch {ingest_batch_id} not found")
+
+    date_filter = "attachment_date = :attachment_date" if batch.attachment_date else "attachment_date IS NULL"
+    deleted = session.execute(
+        text(f"DELETE FROM {batch.table_name} WHERE ingest_batch_id = :ingest_batch_id AND {date_filter}"),
+        {'ingest_batch_id': ingest_batch_id, 'attachment_date': batch.attachment_date}
+    ).rowcount
+
+    ingest_ids = session.query(AttachmentIngest.id).filter(
+        AttachmentIngest.attachment_id == batch.attachment_id,
+        AttachmentIngest.table_name == batch.table_name
+    ).scalar_subquery()
+    session.query(EmailAttachment).filter(EmailAttachment.ingest_id.in_(ingest_ids)).update(
+        {EmailAttachment.ingest_id: None}, synchronize_session=False
+    )
+    session.query(AttachmentIngest).filter(
+        AttachmentIngest.attachment_id == batch.attachment_id,
+        AttachmentIngest.table_name == batch.table_name
+    ).delete(synchronize_session=False)
+    session.query(IngestColumnStats).filter(
+        IngestColumnStats.ingest_batch_id == ingest_batch_id
+    ).delete(synchronize_session=False)
+    if reload:
+        session.query(AttachmentProcessingState).filter(
+            AttachmentProcessingState.attachment_id == batch.attachment_id
+        ).update({
+            AttachmentProcessingState.status: PENDING,
+            AttachmentProcessingState.attempts: 0,
+            AttachmentProcessingState.rows_inserted: None,
+            AttachmentProcessingState.completed_at: None
+        }, synchronize_session=False)
+    session.delete(batch)
+
+    logger.info(f"Deleted ingest batch {ingest_batch_id}: {deleted} rows from {batch.table_name}")
+    return deleted
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import csv
+import io
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+import pandas as pd
+
+from src.core.config import settings
+from src.workers.tasks.csv_file_reader import DEFAULT_BATCH_SIZE, ContentBuffer, CSVFileReader
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pa_csv = None
+
+logger = logging.getLogger(__name__)
+
+# A batch ready for BulkLoader.load_batch: row tuples or a DataFrame in load column order
+LoadBatch = Union[List[Tuple], pd.DataFrame]
+
+# Bytes per record batch read by the pyarrow CSV reader
+ARROW_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class PythonCSVEngine:
+    """Row-wise engine built on the csv module (CSVFileReader.iter_csv_batches)."""
+
+    name = "python"
+
+    def iter_batches(
+        self,
+        unit,
+        content: ContentBuffer,
+        columns: Sequence[str],
+        row_metadata: Tuple,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[LoadBatch]:
+        """
+        Stream load-ready batches from an ingest unit.
+
+        Args:
+            unit: IngestUnit of the attachment
+            content: Buffer returned by unit.open()
+            columns: Headers to load, in load order
+            row_metadata: Values appended to every row (provenance columns)
+            batch_size: Maximum number of rows per batch
+
+        Yields:
+            Lists of row tuples: the selected columns followed by row_metadata
+        """
+        positions = [unit.headers.index(column) for column in columns]
+        project_all = positions == list(range(len(unit.headers)))
+
+        for batch in unit.iter_batches(content, batch_size):
+            if project_all:
+                yield [row + row_metadata for row in batch]
+            else:
+                yield [tuple([row[i] for i in positions]) + row_metadata for row in batch]
+
+
+class PandasCSVEngine:
+    """
+    Column-wise engine built on pyarrow's streaming CSV reader or pandas.read_csv.
+
+    The pyarrow reader is used when pyarrow is installed; it reads the
+    memory-mapped buffer without copying and converts each record batch to
+    a DataFrame. Otherwise pandas.read_csv parses the decoded stream in chunks
+    (its C parser skips rows with more values than headers). Cleaning (strip,
+    empty to NULL) runs vectorized per column.
+    """
+
+    name = "pandas"
+
+    def iter_batches(
+        self,
+        unit,
+        content: ContentBuffer,
+        columns: Sequence[str],
+        row_metadata: Tuple,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[LoadBatch]:
+        """
+        Stream load-ready batches from an ingest unit.
+
+        Args:
+            unit: IngestUnit of the attachment
+            content: Buffer returned by unit.open()
+            columns: Headers to load, in load order
+            row_metadata: Values appended to every row (provenance columns)
+            batch_size: Maximum number of rows per batch (pandas reader only)
+
+        Yields:
+            DataFrames with the selected columns followed by the metadata columns
+        """
+        columns = list(columns)
+        metadata_columns = [f"__metadata_{i}" for i in range(len(row_metadata))]
+
+        for frame in self.iter_frames(unit, content, batch_size):
+            frame = self.clean_frame(frame[columns])
+            for column, value in zip(metadata_columns, row_metadata):
+                frame[column] = value
+            yield frame
+
+    def iter_frames(self, unit, content: ContentBuffer, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Stream raw string DataFrames with one column per header.
+
+        Args:
+            unit: IngestUnit of the attachment
+            content: Buffer returned by unit.open()
+            batch_size: Maximum number of rows per frame (pandas reader only)
+
+        Yields:
+            DataFrames of strings (None for missing values)
+        """
+        if pa_csv is not None:
+            yield from self._iter_arrow_frames(unit, content)
+        else:
+            yield from self._iter_pandas_frames(unit, content, batch_size)
+
+    @staticmethod
+    def clean_frame(frame: pd.DataFrame) -> pd.DataFrame:
+        """Strip string values and turn empty values into None, column by column."""
+        cleaned = {}
+        for column in frame.columns:
+            values = frame[column].str.strip()
+            cleaned[column] = values.where(values.notna() & (values != ""), None)
+        return pd.DataFrame(cleaned, index=frame.index)
+
+    def _iter_arrow_frames(self, unit, content: ContentBuffer) -> Iterator[pd.DataFrame]:
+        headers = unit.headers
+        invalid_rows: List[str] = []
+
+        def collect_invalid_row(row) -> str:
+            # Rows with too few or too many values are re-parsed below so they are
+            # padded / truncated like the python engine instead of being lost
+            invalid_rows.append(row.text)
+            return "skip"
+
+        reader = pa_csv.open_csv(
+            pa.BufferReader(pa.py_buffer(content)),
+            read_options=pa_csv.ReadOptions(
+                column_names=headers,
+                skip_rows=0 if unit.byte_range else 1,
+                encoding=unit.encoding,
+                block_size=ARROW_BLOCK_SIZE
+            ),
+            parse_options=pa_csv.ParseOptions(
+                delimiter=unit.delimiter,
+                newlines_in_values=True,
+                invalid_row_handler=collect_invalid_row
+            ),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={header: pa.string() for header in headers},
+                # Only empty values are NULL; markers like "n/a" are data
+                null_values=[""],
+                strings_can_be_null=True
+            )
+        )
+        for record_batch in reader:
+            yield record_batch.to_pandas()
+            if invalid_rows:
+                yield self._frame_from_lines(invalid_rows, headers, unit.delimiter)
+                invalid_rows.clear()
+        if invalid_rows:
+            yield self._frame_from_lines(invalid_rows, headers, unit.delimiter)
+
+    @staticmethod
+    def _frame_from_lines(lines: List[str], headers: List[str], delimiter: str) -> pd.DataFrame:
+        width = len(headers)
+        rows = [
+            (row + [None] * width)[:width]
+            for row in csv.reader(io.StringIO("\n".join(lines)), delimiter=delimiter)
+            if row
+        ]
+        return pd.DataFrame(rows, columns=headers, dtype=object)
+
+    def _iter_pandas_frames(self, unit, content: ContentBuffer, batch_size: int) -> Iterator[pd.DataFrame]:
+        with CSVFileReader.open_text_stream(content, unit.encoding) as text_stream:
+            chunks = pd.read_csv(
+                text_stream,
+                sep=unit.delimiter,
+                header=None if unit.byte_range else 0,
+                names=unit.headers,
+                dtype=str,
+                keep_default_na=False,
+                na_values=[""],
+                skip_blank_lines=True,
+                on_bad_lines="warn",
+                chunksize=batch_size
+            )
+            for frame in chunks:
+                yield frame.astype(object).where(frame.notna(), None)
+
+
+INGEST_ENGINES: Dict[str, Type] = {
+    PythonCSVEngine.name: PythonCSVEngine,
+    PandasCSVEngine.name: PandasCSVEngine,
+}
+
+
+def get_ingest_engine(name: str):
+    """
+    Instantiate an ingest engine by name.
+
+    Args:
+        name: Engine name ('python' or 'pandas')
+
+    Returns:
+        Engine instance
+    """
+    if name not in INGEST_ENGINES:
+        raise ValueError(f"Unknown ingest engine '{name}', expected one of {sorted(INGEST_ENGINES)}")
+    return INGEST_ENGINES[name]()
+
+
+def select_ingest_engine(filename: str, content_type: Optional[str] = None):
+    """
+    Choose the ingest engine for an attachment.
+
+    INGEST_ENGINE_BY_TYPE maps content types (e.g. "text/csv") or file
+    extensions (e.g. ".tsv") to engine names; the content type wins.
+
+    Args:
+        filename: Attachment filename
+        content_type: Attachment MIME type
+
+    Returns:
+        Engine instance
+    """
+    engines_by_type = settings.INGEST_ENGINE_BY_TYPE
+    extension = Path(filename).suffix.lower()
+    name = engines_by_type.get(content_type or "") or engines_by_type.get(extension) or settings.DEFAULT_INGEST_ENGINE
+    return get_ingest_engine(name)
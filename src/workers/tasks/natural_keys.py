@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import re
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence
+
+from src.core.config import settings
+from src.workers.tasks.type_inference import DATE, TIMESTAMP, TIMESTAMPTZ
+
+# Largest number of data columns combined into an inferred key
+MAX_NATURAL_KEY_COLUMNS = 2
+
+# Inferred keys need this many sampled rows to be trusted
+MIN_NATURAL_KEY_SAMPLE_ROWS = 10
+
+# Only identifier-like or temporal columns are key candidates, so that a value
+# column that happens to be unique in the sample (e.g. a price) is never chosen
+IDENTIFIER_PATTERN = re.compile(
+    r'(^|_)(id|key|code|symbol|ticker|sku|isin|cusip|account|number|no|ref|reference)($|_)'
+)
+TEMPORAL_TYPES = frozenset({DATE, TIMESTAMP, TIMESTAMPTZ})
+
+# Report date column added to keys without a temporal column, so the same row
+# in reports for different days is kept while re-sent reports are no-ops
+REPORT_DATE_COLUMN = 'attachment_date'
+
+
+def _is_unique(sample_rows: Sequence[Sequence[Optional[str]]], positions: Sequence[int]) -> bool:
+    keys = set()
+    for row in sample_rows:
+        key = tuple(row[i] for i in positions)
+        if None in key or key in keys:
+            return False
+        keys.add(key)
+    return True
+
+
+def infer_natural_key(
+    headers: List[str],
+    column_types: Dict[str, str],
+    sample_rows: Sequence[Sequence[Optional[str]]]
+) -> Optional[List[str]]:
+    """
+    Infer a natural key from sampled rows.
+
+    The smallest combination of candidate columns that is non-null and unique
+    across the sample wins; earlier columns are preferred on ties.
+
+    Args:
+        headers: Column headers
+        column_types: Inferred type per header
+        sample_rows: Row tuples in header order
+
+    Returns:
+        Key columns (including attachment_date when no temporal column is part
+        of the key), or None if no candidate is unique
+    """
+    if len(sample_rows) < MIN_NATURAL_KEY_SAMPLE_ROWS:
+        return None
+
+    candidates = [
+        i for i, header in enumerate(headers)
+        if IDENTIFIER_PATTERN.search(header) or column_types.get(header) in TEMPORAL_TYPES
+    ]
+    for size in range(1, MAX_NATURAL_KEY_COLUMNS + 1):
+        for positions in combinations(candidates, size):
+            if _is_unique(sample_rows, positions):
+                key = [headers[i] for i in positions]
+                if not any(column_types.get(column) in TEMPORAL_TYPES for column in key):
+                    key.append(REPORT_DATE_COLUMN)
+                return key
+    return None
+
+
+def partitioned_natural_key(natural_key: List[str]) -> List[str]:
+    """
+    Add the report date to a natural key of a partitioned table.
+
+    Unique indexes on a partitioned table must include the partition key, so
+    on such tables a key without attachment_date only deduplicates rows of
+    the same report date.
+
+    Args:
+        natural_key: Key columns
+
+    Returns:
+        Key columns including attachment_date
+    """
+    if REPORT_DATE_COLUMN in natural_key:
+        return list(natural_key)
+    return list(natural_key) + [REPORT_DATE_COLUMN]
+
+
+def natural_key_for(
+    table_name: str,
+    headers: List[str],
+    column_types: Dict[str, str],
+    sample_rows: Sequence[Sequence[Optional[str]]]
+) -> Optional[List[str]]:
+    """
+    Return the configured natural key of a table, or infer one if enabled.
+
+    Inference is off unless INGEST_INFER_NATURAL_KEYS is set, since a key
+    guessed from a sample makes every later row that collides with it a
+    skipped duplicate.
+
+    Args:
+        table_name: Target table name
+        headers: Column headers
+        column_types: Inferred type per header
+        sample_rows: Row tuples in header order
+
+    Returns:
+        Key columns, or None to load without a key
+    """
+    if table_name in settings.INGEST_NATURAL_KEYS:
+        return list(settings.INGEST_NATURAL_KEYS[table_name])
+    if settings.INGEST_INFER_NATURAL_KEYS:
+        return infer_natural_key(headers, column_types, sample_rows)
+    return None
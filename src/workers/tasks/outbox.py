@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models.email import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Event types
+ATTACHMENT_STORED = "attachment.stored"
+ROLLUP_STALE = "rollup.stale"
+
+OutboxHandler = Callable[[Dict[str, Any]], Any]
+
+# Handlers per event type, registered by the task modules that consume them
+_handlers: Dict[str, OutboxHandler] = {}
+
+
+def register_outbox_handler(event_type: str) -> Callable[[OutboxHandler], OutboxHandler]:
+    """
+    Register the function that publishes events of a type (typically by queueing a task).
+
+    Handlers may run more than once for the same event (at-least-once delivery),
+    so the work they trigger must be idempotent.
+
+    Args:
+        event_type: Event type to handle
+    """
+    def decorator(handler: OutboxHandler) -> OutboxHandler:
+        _handlers[event_type] = handler
+        return handler
+    return decorator
+
+
+def add_outbox_event(session: Session, event_type: str, payload: Dict[str, Any]) -> OutboxEvent:
+    """
+    Record an event in the caller's transaction (the caller commits).
+
+    Args:
+        session: Database session
+        event_type: Event type
+        payload: JSON-serializable event data
+
+    Returns:
+        The new event (its id is assigned on flush)
+    """
+    event = OutboxEvent(event_type=event_type, payload=payload, attempts=0)
+    session.add(event)
+    return event
+
+
+def dispatch_outbox_events(
+    session: Session,
+    event_ids: Optional[List[Any]] = None,
+    limit: int = 100,
+    max_attempts: Optional[int] = None
+) -> int:
+    """
+    Publish undispatched events to their handlers and mark them dispatched.
+
+    Rows are claimed with FOR UPDATE SKIP LOCKED, so the dispatch right after a
+    commit and the periodic dispatch never publish the same event concurrently.
+    Failures are logged and counted on the event; it is retried by the next
+    periodic dispatch. Events with the fewest attempts go first, so failing
+    events cannot hold up the rest, and events that used max_attempts
+    attempts are parked (left undispatched for inspection). Never raises.
+
+    Args:
+        session: Database session
+        event_ids: Only dispatch these events (e.g. the ones just committed)
+        limit: Maximum number of events to dispatch
+        max_attempts: Attempts after which an event is parked (default OUTBOX_MAX_ATTEMPTS)
+
+    Returns:
+        Number of events dispatched
+    """
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    try:
+        query = session.query(OutboxEvent).filter(
+            OutboxEvent.dispatched_at.is_(None),
+            OutboxEvent.attempts < max_attempts
+        )
+        if event_ids is not None:
+            if not event_ids:
+                return 0
+            query = query.filter(OutboxEvent.id.in_(event_ids))
+        events = query.order_by(
+            OutboxEvent.attempts, OutboxEvent.created_at
+        ).limit(limit).with_for_update(skip_locked=True).all()
+
+        dispatched = 0
+        for event in events:
+            handler = _handlers.get(event.event_type)
+            if handler is None:
+                logger.error(f"No handler registered for outbox event type {event.event_type}")
+                _count_failed_attempt(event, max_attempts)
+                continue
+            try:
+                handler(event.payload)
+                event.dispatched_at = datetime.now(timezone.utc)
+                dispatched += 1
+            except Exception as e:
+                logger.error(f"Failed to dispatch outbox event {event.id} ({event.event_type}): {e}")
+                _count_failed_attempt(event, max_attempts)
+
+        session.commit()
+        return dispatched
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Outbox dispatch failed: {e}")
+        return 0
+
+
+def _count_failed_attempt(event: OutboxEvent, max_attempts: int) -> None:
+    event.attempts += 1
+    if event.attempts >= max_attempts:
+        logger.error(f"Parking outbox event {event.id} ({event.event_type}) after {event.attempts} failed attempts")
+
+
+def purge_dispatched_events(session: Session, retention_days: int) -> int:
+    """
+    Delete dispatched events older than the retention period (the caller commits).
+
+    Args:
+        session: Database session
+        retention_days: Days to keep dispatched events
+
+    Returns:
+        Number of events deleted
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    return session.query(OutboxEvent).filter(
+        OutboxEvent.dispatched_at.isnot(None),
+        OutboxEvent.dispatched_at < cutoff
+    ).delete(synchronize_session=False)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.config import settings
+from src.workers.celery_app import celery_app
+from src.workers.tasks.outbox import dispatch_outbox_events, purge_dispatched_events
+
+logger = logging.getLogger(__name__)
+
+# Database setup
+engine = create_engine(settings.database_url)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@celery_app.task(bind=True)
+def dispatch_outbox(self) -> Dict[str, any]:
+    """
+    Dispatch outbox events that were not published right after their commit.
+
+    Runs periodically as a safety net; the lookup uses the partial index on
+    undispatched events, so it is cheap when there is nothing to do.
+
+    Returns:
+        Dict with dispatch results
+    """
+    session = SessionLocal()
+    try:
+        dispatched = 0
+        while True:
+            batch = dispatch_outbox_events(session, limit=settings.OUTBOX_DISPATCH_BATCH_SIZE)
+            dispatched += batch
+            if batch < settings.OUTBOX_DISPATCH_BATCH_SIZE:
+                break
+
+        purged = purge_dispatched_events(session, settings.OUTBOX_RETENTION_DAYS)
+        session.commit()
+
+        if dispatched or purged:
+            logger.info(f"Dispatched {dispatched} outbox events, purged {purged} old events")
+
+        return {
+            'status': 'completed',
+            'events_dispatched': dispatched,
+            'events_purged': purged,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+    except Exception as e:
+        logger.error(f"Outbox dispatch failed: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
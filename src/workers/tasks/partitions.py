@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Attachment tables are range partitioned on the report date of each row
+PARTITION_COLUMN = 'attachment_date'
+
+# Partition intervals
+DAY = 'day'
+MONTH = 'month'
+PARTITION_INTERVALS = (DAY, MONTH)
+
+# Partition name suffixes ("_p202507" for a month, "_p20250709" for a day)
+PARTITION_SUFFIX_FORMATS = {
+    DAY: '%Y%m%d',
+    MONTH: '%Y%m',
+}
+PARTITION_SUFFIX_PATTERN = re.compile(r'_p(\d{6}|\d{8})$')
+
+# Rows without an attachment_date (and any date without a partition) land here
+DEFAULT_PARTITION_SUFFIX = '_default'
+
+# Longest table name prefix that leaves room for a suffix within the 63 byte limit
+PARTITION_NAME_PREFIX_LENGTH = 52
+
+
+class Partition(NamedTuple):
+    """A date partition of an attachment table; covers [start, end)."""
+
+    name: str
+    start: datetime
+    end: datetime
+
+
+def partition_interval() -> Optional[str]:
+    """
+    Return the configured interval for new attachment tables.
+
+    Returns:
+        DAY or MONTH, or None when new tables are not partitioned
+    """
+    interval = (settings.INGEST_PARTITION_INTERVAL or '').lower()
+    if interval in ('', 'none'):
+        return None
+    if interval not in PARTITION_INTERVALS:
+        raise ValueError(f"Unknown partition interval '{interval}', expected one of {PARTITION_INTERVALS} or 'none'")
+    return interval
+
+
+def utc_datetime(value: Optional[Union[datetime, str]]) -> Optional[datetime]:
+    """
+    Return an attachment_date as an aware UTC datetime.
+
+    Dates extracted from filenames are naive and mean UTC; they are made
+    explicit so they do not depend on the TimeZone of the database session.
+
+    Args:
+        value: attachment_date (datetime or ISO string), or None
+
+    Returns:
+        The date in UTC, or None
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def partition_bounds(value: datetime, interval: str) -> Tuple[datetime, datetime]:
+    """
+    Return the [start, end) range of the partition holding a date.
+
+    Args:
+        value: attachment_date of a row
+        interval: DAY or MONTH
+
+    Returns:
+        Tuple of (start, end), with the time zone of value
+    """
+    start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == DAY:
+        return start, start + timedelta(days=1)
+
+    start = start.replace(day=1)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def partition_name(table_name: str, start: datetime, interval: str) -> str:
+    """Name of the partition of a table starting at start."""
+    return f"{table_name[:PARTITION_NAME_PREFIX_LENGTH]}_p{start.strftime(PARTITION_SUFFIX_FORMATS[interval])}"
+
+
+def default_partition_name(table_name: str) -> str:
+    """Name of the default partition of a table."""
+    return f"{table_name[:PARTITION_NAME_PREFIX_LENGTH]}{DEFAULT_PARTITION_SUFFIX}"
+
+
+def lock_table_partitions(session: Session, table_name: str) -> None:
+    """
+    Serialize partition changes to a table until the current transaction ends.
+
+    This is a separate lock from the schema lock: creating or dropping a
+    partition waits for loads into the table to finish, and loads take the
+    schema lock when they commit.
+
+    Args:
+        session: Database session
+        table_name: Partitioned table
+    """
+    session.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:lock_name))"),
+        {'lock_name': f"{table_name}:partitions"}
+    )
+
+
+def create_default_partition(session: Session, table_name: str) -> str:
+    """
+    Create the default partition of a newly created partitioned table (the caller commits).
+
+    Args:
+        session: Database session
+        table_name: Partitioned table
+
+    Returns:
+        Name of the default partition
+    """
+    name = default_partition_name(table_name)
+    session.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table_name} DEFAULT"))
+    return name
+
+
+def ensure_partition(
+    session: Session,
+    table_name: str,
+    interval: Optional[str],
+    attachment_date: Optional[Union[datetime, str]]
+) -> Optional[str]:
+    """
+    Create the partition that rows with an attachment_date will be routed to.
+
+    Every row of an attachment has the same attachment_date, so one partition
+    is checked per load; the common case (partition exists) costs one catalog
+    lookup. Creating a partition locks the parent table exclusively, so the
+    caller should commit right away, before loading.
+
+    Args:
+        session: Database session
+        table_name: Target table
+        interval: Partition interval of the table (None if not partitioned)
+        attachment_date: Date extracted from the filename (datetime or ISO string)
+
+    Returns:
+        Name of the partition, or None if the rows go to the default
+        partition (no date) or the table is not partitioned
+    """
+    if not interval or attachment_date is None:
+        return None
+
+    # Bounds are UTC midnights, written as explicit UTC timestamptz literals
+    start, end = partition_bounds(utc_datetime(attachment_date), interval)
+    name = partition_name(table_name, start, interval)
+    if _is_partition_of(session, name, table_name):
+        return name
+
+    # A detached partition of the same name makes the CREATE fail rather
+    # than rows silently going to the default partition
+    lock_table_partitions(session, table_name)
+    if _is_partition_of(session, name, table_name):
+        return name
+
+    session.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table_name} "
+        f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+    ))
+    logger.info(f"Created partition {name} of {table_name} for [{start}, {end})")
+    return name
+
+
+def list_partitions(session: Session, table_name: str, interval: str) -> List[Partition]:
+    """
+    List the date partitions of a table (the default partition is not included).
+
+    Args:
+        session: Database session
+        table_name: Partitioned table
+        interval: Partition interval of the table
+
+    Returns:
+        Partitions ordered by start
+    """
+    names = session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(:table_name)
+    """), {'table_name': table_name}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_SUFFIX_PATTERN.search(name)
+        if not match:
+            continue
+        start = datetime.strptime(match.group(1), PARTITION_SUFFIX_FORMATS[interval])
+        partitions.append(Partition(name, *partition_bounds(start, interval)))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def expire_partitions(
+    session: Session,
+    table_name: str,
+    interval: str,
+    before: datetime,
+    detach: bool = False
+) -> List[str]:
+    """
+    Drop (or detach) the partitions of a table that end on or before a cutoff.
+
+    Both are catalog operations, so retention costs the same however many
+    rows a partition holds. Detached partitions remain as standalone tables
+    (e.g. to be archived). The caller commits.
+
+    Args:
+        session: Database session
+        table_name: Partitioned table
+        interval: Partition interval of the table
+        before: Cutoff; partitions with rows on or after it are kept
+        detach: Detach instead of drop
+
+    Returns:
+        Names of the expired partitions
+    """
+    lock_table_partitions(session, table_name)
+    expired = [partition.name for partition in list_partitions(session, table_name, interval) if partition.end <= before]
+    for name in expired:
+        if detach:
+            session.execute(text(f"ALTER TABLE {table_name} DETACH PARTITION {name}"))
+        else:
+            session.execute(text(f"DROP TABLE {name}"))
+
+    if expired:
+        logger.info(f"{'Detached' if detach else 'Dropped'} {len(expired)} partitions of {table_name}: {expired}")
+    return expired
+
+
+def _is_partition_of(session: Session, name: str, table_name: str) -> bool:
+    return session.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(:name) AND inhparent = to_regclass(:table_name)
+        )
+    """), {'name': name, 'table_name': table_name}).scalar()
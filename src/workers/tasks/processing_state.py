@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from src.models.email import AttachmentProcessingState, EmailAttachment, EmailMessage
+from src.workers.tasks.attachment_archives import archive_format
+from src.workers.tasks.attachment_routing import routed_format
+
+logger = logging.getLogger(__name__)
+
+# Processing statuses; the sweep picks up pending attachments, and processing
+# ones whose worker was lost (started longer ago than the stale timeout)
+PENDING = "pending"
+PROCESSING = "processing"
+COMPLETED = "completed"
+DUPLICATE = "duplicate"
+EXPANDED = "expanded"
+FAILED = "failed"
+
+# Longest error message kept on the state row
+LAST_ERROR_MAX_LENGTH = 2000
+
+
+def is_ingestible_attachment(filename: Optional[str], content_type: Optional[str]) -> bool:
+    """Return whether an attachment is ingested: a CSV or other tabular file, or a compressed archive."""
+    return routed_format(filename, content_type) is not None or archive_format(filename, content_type) is not None
+
+
+def create_processing_state(session: Session, attachment: EmailAttachment) -> Optional[AttachmentProcessingState]:
+    """
+    Queue a newly stored attachment for ingest if it is a data file or an archive (the caller commits).
+
+    Args:
+        session: Database session
+        attachment: New attachment
+
+    Returns:
+        The pending state, or None for attachments that are not ingested
+    """
+    if not is_ingestible_attachment(attachment.filename, attachment.content_type):
+        return None
+    if attachment.id is None:
+        session.flush([attachment])
+
+    state = AttachmentProcessingState(attachment_id=attachment.id, status=PENDING, attempts=0)
+    session.add(state)
+    return state
+
+
+def get_processing_state(session: Session, attachment: EmailAttachment) -> AttachmentProcessingState:
+    """Return the state of an attachment, creating it for attachments stored before states existed."""
+    state = session.get(AttachmentProcessingState, attachment.id)
+    if state is None:
+        state = AttachmentProcessingState(attachment_id=attachment.id, status=PENDING, attempts=0)
+        session.add(state)
+    return state
+
+
+def query_pending_attachments(
+    session: Session,
+    limit: Optional[int] = None,
+    older_than: Optional[timedelta] = None,
+    stale_after: Optional[timedelta] = None,
+    max_attempts: Optional[int] = None
+) -> List[EmailAttachment]:
+    """
+    Fetch attachments waiting for ingest, oldest first.
+
+    The lookup walks the partial indexes on pending and processing states, so
+    its cost depends on the number of unfinished attachments rather than the
+    size of the table.
+
+    Args:
+        session: Database session
+        limit: Maximum number of attachments
+        older_than: Only attachments pending for at least this long
+        stale_after: Also fetch attachments still processing this long after
+            their last attempt started (its worker was killed, e.g. out of memory)
+        max_attempts: Leave out stale attachments with this many attempts
+
+    Returns:
+        Pending and stale attachments
+    """
+    now = datetime.now(timezone.utc)
+    pending = AttachmentProcessingState.status == PENDING
+    if older_than is not None:
+        pending = and_(pending, AttachmentProcessingState.created_at <= now - older_than)
+    unfinished = pending
+    if stale_after is not None:
+        stale = and_(
+            AttachmentProcessingState.status == PROCESSING,
+            AttachmentProcessingState.started_at <= now - stale_after
+        )
+        if max_attempts is not None:
+            stale = and_(stale, AttachmentProcessingState.attempts < max_attempts)
+        unfinished = or_(pending, stale)
+
+    query = session.query(EmailAttachment).join(
+        AttachmentProcessingState, AttachmentProcessingState.attachment_id == EmailAttachment.id
+    ).join(
+        EmailMessage, EmailAttachment.message_id == EmailMessage.id
+    ).filter(
+        unfinished,
+        EmailMessage.processing_status.in_(['completed', 'pending'])
+    ).order_by(AttachmentProcessingState.created_at)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def fail_stale_attachments(session: Session, stale_after: timedelta, max_attempts: int) -> int:
+    """
+    Mark attachments failed that were lost while processing on their last allowed attempt (the caller commits).
+
+    Args:
+        session: Database session
+        stale_after: Time after which a processing attempt counts as lost
+        max_attempts: Attempts an attachment is allowed
+
+    Returns:
+        Number of attachments marked failed
+    """
+    return session.query(AttachmentProcessingState).filter(
+        AttachmentProcessingState.status == PROCESSING,
+        AttachmentProcessingState.started_at <= datetime.now(timezone.utc) - stale_after,
+        AttachmentProcessingState.attempts >= max_attempts
+    ).update({
+        AttachmentProcessingState.status: FAILED,
+        AttachmentProcessingState.last_error: f"Worker lost while processing, gave up after {max_attempts} attempts"
+    }, synchronize_session=False)
+
+
+def is_processing_finished(session: Session, attachment: EmailAttachment) -> bool:
+    """Return whether an attachment was already ingested (skipped as a duplicate, or expanded if an archive)."""
+    state = session.get(AttachmentProcessingState, attachment.id)
+    return state is not None and state.status in (COMPLETED, DUPLICATE, EXPANDED)
+
+
+def mark_processing_started(
+    session: Session,
+    attachment: EmailAttachment,
+    table_name: str,
+    count_attempt: bool = True
+) -> AttachmentProcessingState:
+    """
+    Mark an attachment as being ingested (the caller commits).
+
+    Args:
+        session: Database session
+        attachment: Attachment being ingested
+        table_name: Target table name
+        count_attempt: Count this run as a new attempt
+
+    Returns:
+        The updated state
+    """
+    state = get_processing_state(session, attachment)
+    state.status = PROCESSING
+    state.table_name = table_name
+    if count_attempt:
+        state.attempts = (state.attempts or 0) + 1
+        state.started_at = datetime.now(timezone.utc)
+    return state
+
+
+def mark_processing_completed(
+    session: Session,
+    attachment: EmailAttachment,
+    rows_inserted: Optional[int] = None,
+    status: str = COMPLETED,
+    table_name: Optional[str] = None
+) -> AttachmentProcessingState:
+    """
+    Mark an attachment as ingested (the caller commits, with the loaded rows).
+
+    Args:
+        session: Database session
+        attachment: Ingested attachment
+        rows_inserted: Number of rows loaded
+        status: COMPLETED, DUPLICATE when the content was already loaded, or
+            EXPANDED for an archive whose members were queued
+        table_name: Target table name, if not set when the ingest started
+
+    Returns:
+        The updated state
+    """
+    state = get_processing_state(session, attachment)
+    state.status = status
+    if table_name:
+        state.table_name = table_name
+    state.rows_inserted = rows_inserted
+    state.last_error = None
+    state.completed_at = datetime.now(timezone.utc)
+    return state
+
+
+def record_processing_error(session: Session, attachment_id: str, error: Exception, final: bool) -> None:
+    """
+    Record a failed ingest attempt and commit it.
+
+    Called after the failed transaction was rolled back. Errors here are
+    logged rather than raised so the original error is what the task reports.
+
+    Args:
+        session: Database session
+        attachment_id: UUID of the attachment
+        error: Error of the failed attempt
+        final: No retries are left; the attachment is marked failed
+    """
+    try:
+        state = session.get(AttachmentProcessingState, attachment_id)
+        if state is None:
+            return
+        state.last_error = str(error)[:LAST_ERROR_MAX_LENGTH]
+        if final:
+            state.status = FAILED
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Failed to record processing error for attachment {attachment_id}: {e}")
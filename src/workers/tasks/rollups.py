@@ -0,0 +1,532 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.models.email import IngestRollup, OutboxEvent
+from src.workers.tasks.cold_archive import archive_files, connect_table_history
+from src.workers.tasks.outbox import ROLLUP_STALE, add_outbox_event
+from src.workers.tasks.schema_registry import TableSchema, get_table_schema
+from src.workers.tasks.type_inference import INTEGER, NUMERIC, TEXT, sql_type_for
+
+logger = logging.getLogger(__name__)
+
+# Rollup periods bucket the report date of rows (in UTC)
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+ROLLUP_GRAINS = (DAY, WEEK, MONTH)
+PERIOD_COLUMN = 'period_start'
+
+# Aggregates a measure may use, e.g. "sum(volume)", "avg(price)" or "count(*)"
+MEASURE_PATTERN = re.compile(r'^\s*(?P<function>sum|count|avg|min|max)\s*\(\s*(?P<column>\*|[a-z_][a-z0-9_]*)\s*\)\s*$')
+IDENTIFIER_PATTERN = re.compile(r'^[a-z_][a-z0-9_]{0,62}$')
+# Aggregates of numbers only
+NUMERIC_FUNCTIONS = ('sum', 'avg')
+NUMERIC_TYPES = (INTEGER, NUMERIC)
+
+
+class Measure(NamedTuple):
+    """An aggregate column of a rollup: function over a data column (None for count(*))."""
+
+    name: str
+    function: str
+    column: Optional[str]
+
+
+class Rollup(NamedTuple):
+    """A rollup of a target table: measures per period of the report date and group columns."""
+
+    name: str
+    table_name: str
+    grain: Optional[str]
+    group_by: Tuple[str, ...]
+    measures: Tuple[Measure, ...]
+
+    @property
+    def key_columns(self) -> List[str]:
+        return ([PERIOD_COLUMN] if self.grain else []) + list(self.group_by)
+
+    @property
+    def source_columns(self) -> List[str]:
+        """Data columns of the target table the rollup reads."""
+        columns = list(self.group_by) + [measure.column for measure in self.measures if measure.column]
+        return list(dict.fromkeys(columns))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'table': self.table_name,
+            'grain': self.grain,
+            'group_by': list(self.group_by),
+            'measures': {
+                measure.name: f"{measure.function}({measure.column or '*'})" for measure in self.measures
+            }
+        }
+
+
+def _measure_columns(rollup: Rollup, column_types: Dict[str, str]) -> List[Tuple[str, str, str, str]]:
+    """(column, aggregate, SQL type, merge expression) of each rollup table measure column."""
+    dialect = postgresql.dialect()
+    columns = []
+    for measure in rollup.measures:
+        source = measure.column or '*'
+        if measure.function == 'count':
+            columns.append((measure.name, f"count({source})", 'bigint', '{t}.{c} + excluded.{c}'))
+        elif measure.function in ('min', 'max'):
+            sql_type = sql_type_for(column_types.get(measure.column, TEXT)).compile(dialect=dialect)
+            merge = 'LEAST' if measure.function == 'min' else 'GREATEST'
+            columns.append((measure.name, f"{measure.function}({source})", sql_type, merge + '({t}.{c}, excluded.{c})'))
+        else:
+            # Averages are kept as a sum and a count, so they can be merged
+            sum_column = measure.name if measure.function == 'sum' else f"{measure.name}_sum"
+            columns.append((sum_column, f"sum({source})", 'numeric', 'COALESCE({t}.{c} + excluded.{c}, {t}.{c}, excluded.{c})'))
+            if measure.function == 'avg':
+                columns.append((f"{measure.name}_count", f"count({source})", 'bigint', '{t}.{c} + excluded.{c}'))
+    return columns
+
+
+def compile_rollups(definitions: Dict[str, Sequence[Dict[str, Any]]]) -> Dict[str, Tuple[Rollup, ...]]:
+    """
+    Validate rollup definitions (e.g. INGEST_ROLLUPS) per target table.
+
+    Each definition is a dict with a "name" (the rollup table), an optional
+    "grain" (day, week or month of the report date), optional "group_by"
+    columns and "measures" mapping output columns to aggregates such as
+    "sum(volume)", "avg(price)", "min(price)" or "count(*)".
+
+    Args:
+        definitions: Target table name -> rollup definitions
+
+    Returns:
+        Target table name -> compiled rollups
+
+    Raises:
+        ValueError: If a definition is invalid
+    """
+    compiled: Dict[str, Tuple[Rollup, ...]] = {}
+    names = set()
+    for table_name, rollups in definitions.items():
+        table_rollups = []
+        for definition in rollups:
+            name = definition.get('name') or ''
+            if not IDENTIFIER_PATTERN.match(name) or name in names:
+                raise ValueError(f"Rollup of {table_name} needs a unique lowercase identifier 'name', got '{name}'")
+            names.add(name)
+
+            grain = definition.get('grain')
+            if grain is not None and grain not in ROLLUP_GRAINS:
+                raise ValueError(f"Rollup {name} has unknown grain '{grain}', expected one of {ROLLUP_GRAINS}")
+
+            group_by = tuple(definition.get('group_by') or ())
+            invalid = [column for column in group_by if not IDENTIFIER_PATTERN.match(column)]
+            if invalid:
+                raise ValueError(f"Rollup {name} groups by invalid columns {invalid}")
+            if not grain and not group_by:
+                raise ValueError(f"Rollup {name} needs a grain or group_by columns")
+
+            measures = []
+            for measure_name, expression in (definition.get('measures') or {}).items():
+                match = MEASURE_PATTERN.match(str(expression).lower())
+                if not IDENTIFIER_PATTERN.match(measure_name) or not match:
+                    raise ValueError(f"Rollup {name} has invalid measure {measure_name}: '{expression}'")
+                column = None if match.group('column') == '*' else match.group('column')
+                if column is None and match.group('function') != 'count':
+                    raise ValueError(f"Rollup {name} measure {measure_name}: only count may use *")
+                measures.append(Measure(measure_name, match.group('function'), column))
+            if not measures:
+                raise ValueError(f"Rollup {name} has no measures")
+
+            rollup = Rollup(name, table_name, grain, group_by, tuple(measures))
+            output = rollup.key_columns + [column for column, _, _, _ in _measure_columns(rollup, {})]
+            if len(set(output)) != len(output):
+                raise ValueError(f"Rollup {name} has duplicate output columns {output}")
+            table_rollups.append(rollup)
+        compiled[table_name] = tuple(table_rollups)
+    return compiled
+
+
+# Compiled once per worker process; an invalid configuration fails at startup
+ROLLUPS = compile_rollups(settings.INGEST_ROLLUPS)
+
+
+def period_bounds(value: datetime, grain: str) -> Tuple[date, datetime, datetime]:
+    """
+    Return the period of a report date.
+
+    Args:
+        value: attachment_date of a row
+        grain: DAY, WEEK or MONTH
+
+    Returns:
+        Tuple of (period start date, start, end) with start and end in UTC
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    day = value.date()
+    if grain == DAY:
+        start, end = day, day + timedelta(days=1)
+    elif grain == WEEK:
+        # ISO weeks start on Monday, as date_trunc('week', ...) does
+        start = day - timedelta(days=day.weekday())
+        end = start + timedelta(days=7)
+    else:
+        start = day.replace(day=1)
+        end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, _utc_midnight(start), _utc_midnight(end)
+
+
+def _utc_midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def lock_rollup(session: Session, name: str, shared: bool = False) -> None:
+    """
+    Lock a rollup until the current transaction ends.
+
+    Loads merging a batch take the lock shared, so they do not wait for each
+    other (their upserts are row-level safe); rebuilds and period refreshes
+    take it exclusively, so they see every batch merged before them and the
+    loads after them see their result.
+
+    Args:
+        session: Database session
+        name: Rollup name
+        shared: Take the lock in shared mode
+    """
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    session.execute(text(f"SELECT {function}(hashtext(:name))"), {'name': name})
+
+
+def rollup_fingerprint(rollup: Rollup, schema: TableSchema) -> str:
+    """Hash of a rollup's definition and the types of the columns it reads; a change rebuilds the rollup."""
+    definition = {**rollup.to_dict(), 'types': {column: schema.columns.get(column) for column in rollup.source_columns}}
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def rollup_problem(rollup: Rollup, schema: TableSchema) -> Optional[str]:
+    """Return why a rollup cannot be maintained over a table's current schema, or None."""
+    missing = [column for column in rollup.source_columns if column not in schema.columns]
+    if missing:
+        return f"columns {missing} are not in {schema.table_name}"
+    if not schema.batch_provenance:
+        return f"{schema.table_name} has no ingest batches"
+    not_numeric = [
+        measure.column for measure in rollup.measures
+        if measure.function in NUMERIC_FUNCTIONS and schema.columns[measure.column] not in NUMERIC_TYPES
+    ]
+    if not_numeric:
+        return f"columns {not_numeric} are not numeric"
+    return None
+
+
+def _upsert_clause(rollup: Rollup, measure_columns: List[Tuple[str, str, str, str]]) -> str:
+    updates = ', '.join(
+        f"{column} = " + merge.format(t=rollup.name, c=column) for column, _, _, merge in measure_columns
+    )
+    return f"ON CONFLICT ({', '.join(rollup.key_columns)}) DO UPDATE SET {updates}"
+
+
+def _aggregate_sql(rollup: Rollup, column_types: Dict[str, str], where: str) -> str:
+    measure_columns = _measure_columns(rollup, column_types)
+    period = f"date_trunc('{rollup.grain}', attachment_date AT TIME ZONE 'UTC')::date" if rollup.grain else None
+    keys = ([period] if period else []) + list(rollup.group_by)
+    selected = keys + [aggregate for _, aggregate, _, _ in measure_columns]
+    columns = rollup.key_columns + [column for column, _, _, _ in measure_columns]
+    positions = ', '.join(str(i + 1) for i in range(len(keys)))
+    return (
+        f"INSERT INTO {rollup.name} ({', '.join(columns)}) "
+        f"SELECT {', '.join(selected)} FROM {rollup.table_name} WHERE {where} "
+        f"GROUP BY {positions} ORDER BY {positions} "
+        + _upsert_clause(rollup, measure_columns)
+    )
+
+
+def merge_archived_rows(
+    session: Session,
+    rollup: Rollup,
+    schema: TableSchema,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> int:
+    """
+    Merge the archived rows of a table reported in [start, end) into a rollup (the caller commits).
+
+    Rows moved into archive files are no longer in the table, so rebuilding
+    a rollup or one of its periods from the table alone would lose them.
+    The archive files are aggregated with DuckDB and merged like a batch.
+
+    Args:
+        session: Database session
+        rollup: Rollup being rebuilt
+        schema: Schema of the target table
+        start: First report date to include
+        end: Report date to stop before
+
+    Returns:
+        Number of rollup rows merged
+    """
+    files = archive_files(session, rollup.table_name, start, end)
+    if not files:
+        return 0
+
+    measure_columns = _measure_columns(rollup, schema.columns)
+    # DuckDB truncates timestamps in the connection's time zone (UTC)
+    keys = ([f"date_trunc('{rollup.grain}', attachment_date)::date"] if rollup.grain else []) + list(rollup.group_by)
+    positions = ', '.join(str(i + 1) for i in range(len(keys)))
+    connection = connect_table_history(rollup.table_name, files, start, end)
+    try:
+        rows = connection.execute(
+            f"SELECT {', '.join(keys + [aggregate for _, aggregate, _, _ in measure_columns])} "
+            f"FROM {rollup.table_name} GROUP BY {positions}"
+        ).fetchall()
+    finally:
+        connection.close()
+    if not rows:
+        return 0
+
+    columns = rollup.key_columns + [column for column, _, _, _ in measure_columns]
+    session.execute(
+        text(
+            f"INSERT INTO {rollup.name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(f':{column}' for column in columns)}) "
+            + _upsert_clause(rollup, measure_columns)
+        ),
+        [dict(zip(columns, row)) for row in rows]
+    )
+    return len(rows)
+
+
+def _build_rollup(session: Session, rollup: Rollup, schema: TableSchema, fingerprint: str) -> None:
+    dialect = postgresql.dialect()
+    key_columns = ([f"{PERIOD_COLUMN} date"] if rollup.grain else []) + [
+        f"{column} {sql_type_for(schema.columns[column]).compile(dialect=dialect)}" for column in rollup.group_by
+    ]
+    measure_columns = [f"{column} {sql_type}" for column, _, sql_type, _ in _measure_columns(rollup, schema.columns)]
+
+    session.execute(text(f"DROP TABLE IF EXISTS {rollup.name}"))
+    session.execute(text(f"CREATE TABLE {rollup.name} ({', '.join(key_columns + measure_columns)})"))
+    session.execute(text(
+        f"CREATE UNIQUE INDEX uq_{rollup.name[:50]}_key ON {rollup.name} ({', '.join(rollup.key_columns)}) NULLS NOT DISTINCT"
+    ))
+    session.execute(text(_aggregate_sql(rollup, schema.columns, 'true')))
+    merge_archived_rows(session, rollup, schema)
+
+    entry = session.get(IngestRollup, rollup.name)
+    if entry is None:
+        entry = IngestRollup(name=rollup.name)
+        session.add(entry)
+    entry.table_name = rollup.table_name
+    entry.definition = rollup.to_dict()
+    entry.fingerprint = fingerprint
+    entry.stale = False
+    logger.info(f"Built rollup {rollup.name} over {rollup.table_name}")
+
+
+def _drop_rollup(session: Session, rollup: Rollup, entry: Optional[IngestRollup], problem: str) -> None:
+    logger.warning(f"Skipping rollup {rollup.name}: {problem}")
+    if entry is not None:
+        # e.g. a summed column was widened to text: drop rather than serve stale rows
+        session.execute(text(f"DROP TABLE IF EXISTS {rollup.name}"))
+        session.delete(entry)
+
+
+def _mark_rollup_stale(session: Session, rollup: Rollup, entry: Optional[IngestRollup]) -> OutboxEvent:
+    if entry is None:
+        # Registered before its table exists, so readers see it is being built
+        entry = IngestRollup(name=rollup.name, table_name=rollup.table_name, definition=rollup.to_dict(), fingerprint='')
+        session.add(entry)
+    entry.stale = True
+    logger.info(f"Rollup {rollup.name} needs a rebuild, queued")
+    return add_outbox_event(session, ROLLUP_STALE, {'rollup': rollup.name})
+
+
+def apply_rollups(
+    session: Session,
+    schema: TableSchema,
+    ingest_batch_id: int,
+    attachment_date: Optional[datetime]
+) -> List[OutboxEvent]:
+    """
+    Add the rows of a new ingest batch to the rollups of its table (the caller commits).
+
+    Runs in the load's transaction, so each batch is counted exactly once.
+    Only the batch's rows are aggregated (its partition and batch id bound
+    the scan) and merged into existing rollup rows. A rollup that does not
+    exist yet, or whose definition or source column types changed, is not
+    rebuilt here: it is marked stale and a rebuild is queued through the
+    outbox. Stale rollups skip the merge, since the rebuild reads every
+    batch committed before it.
+
+    Args:
+        session: Database session
+        schema: Schema of the target table
+        ingest_batch_id: Batch that was loaded
+        attachment_date: Report date of the batch
+
+    Returns:
+        Rebuild events of the rollups marked stale, to dispatch after commit
+    """
+    rebuilds = []
+    for rollup in ROLLUPS.get(schema.table_name, ()):
+        lock_rollup(session, rollup.name, shared=True)
+        entry = session.get(IngestRollup, rollup.name)
+        problem = rollup_problem(rollup, schema)
+        if problem:
+            _drop_rollup(session, rollup, entry, problem)
+            continue
+
+        if entry is None or entry.stale or entry.fingerprint != rollup_fingerprint(rollup, schema):
+            if entry is None or not entry.stale:
+                rebuilds.append(_mark_rollup_stale(session, rollup, entry))
+            continue
+
+        date_filter = "attachment_date = :attachment_date" if attachment_date else "attachment_date IS NULL"
+        session.execute(
+            text(_aggregate_sql(rollup, schema.columns, f"ingest_batch_id = :ingest_batch_id AND {date_filter}")),
+            {'ingest_batch_id': ingest_batch_id, 'attachment_date': attachment_date}
+        )
+    return rebuilds
+
+
+def rebuild_rollup(session: Session, name: str) -> bool:
+    """
+    Rebuild a stale rollup from its whole table and archive files (the caller commits).
+
+    Args:
+        session: Database session
+        name: Rollup name
+
+    Returns:
+        Whether the rollup was rebuilt (False if it is current, no longer
+        configured or cannot be maintained)
+    """
+    rollup = next((rollup for rollups in ROLLUPS.values() for rollup in rollups if rollup.name == name), None)
+    if rollup is None:
+        logger.warning(f"Rollup {name} is not configured, not rebuilding")
+        return False
+
+    lock_rollup(session, rollup.name)
+    entry = session.get(IngestRollup, rollup.name)
+    schema = get_table_schema(session, rollup.table_name, refresh=True)
+    if schema is None:
+        logger.warning(f"Table {rollup.table_name} of rollup {name} does not exist, not rebuilding")
+        return False
+    problem = rollup_problem(rollup, schema)
+    if problem:
+        _drop_rollup(session, rollup, entry, problem)
+        return False
+
+    fingerprint = rollup_fingerprint(rollup, schema)
+    if entry is not None and not entry.stale and entry.fingerprint == fingerprint:
+        return False
+    _build_rollup(session, rollup, schema, fingerprint)
+    return True
+
+
+def refresh_rollup_period(session: Session, schema: TableSchema, attachment_date: Optional[datetime]) -> List[str]:
+    """
+    Recompute the rollup rows of the period holding a report date (e.g. after deleting a batch).
+
+    Sums and counts could be subtracted, but minima and maxima cannot, so
+    the period is aggregated again from the table and its archived rows
+    (the caller commits).
+
+    Args:
+        session: Database session
+        schema: Schema of the target table
+        attachment_date: Report date whose period changed
+
+    Returns:
+        Names of the rollups that were refreshed
+    """
+    refreshed = []
+    for rollup in ROLLUPS.get(schema.table_name, ()):
+        if rollup_problem(rollup, schema):
+            continue
+        lock_rollup(session, rollup.name)
+        entry = session.get(IngestRollup, rollup.name)
+        if entry is None or entry.stale or entry.fingerprint != rollup_fingerprint(rollup, schema):
+            # Rebuilt from the whole table by its queued rebuild (or the next load)
+            continue
+
+        params: Dict[str, Any] = {}
+        if not rollup.grain:
+            delete_filter, where = 'true', 'true'
+        elif attachment_date is None:
+            delete_filter, where = f"{PERIOD_COLUMN} IS NULL", 'attachment_date IS NULL'
+        else:
+            params['period'], params['start'], params['end'] = period_bounds(attachment_date, rollup.grain)
+            delete_filter = f"{PERIOD_COLUMN} = :period"
+            where = 'attachment_date >= :start AND attachment_date < :end'
+        session.execute(text(f"DELETE FROM {rollup.name} WHERE {delete_filter}"), params)
+        session.execute(text(_aggregate_sql(rollup, schema.columns, where)), params)
+        if rollup.grain is None or attachment_date is not None:
+            # Rows without a report date are never archived
+            merge_archived_rows(session, rollup, schema, params.get('start'), params.get('end'))
+        refreshed.append(rollup.name)
+    return refreshed
+
+
+def query_rollup(
+    session: Session,
+    entry: IngestRollup,
+    filters: Optional[Dict[str, str]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = 1000,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Read rows of a rollup, with averages computed from their sums and counts.
+
+    Args:
+        session: Database session
+        entry: Registered rollup
+        filters: Group column -> value (compared as text)
+        start: First period to include
+        end: Period to stop before
+        limit: Maximum number of rows
+        offset: Rows to skip
+
+    Returns:
+        Rollup rows ordered by period and group columns
+    """
+    definition = entry.definition
+    rollup = compile_rollups({definition['table']: [definition]})[definition['table']][0]
+
+    selected = list(rollup.key_columns)
+    for measure in rollup.measures:
+        if measure.function == 'avg':
+            selected.append(f"{measure.name}_sum / NULLIF({measure.name}_count, 0) AS {measure.name}")
+        else:
+            selected.append(measure.name)
+
+    conditions, params = [], {'limit': limit, 'offset': offset}
+    for i, (column, value) in enumerate((filters or {}).items()):
+        if column not in rollup.group_by:
+            raise ValueError(f"Rollup {rollup.name} is not grouped by {column}")
+        conditions.append(f"{column}::text = :filter_{i}")
+        params[f"filter_{i}"] = value
+    if rollup.grain and start:
+        conditions.append(f"{PERIOD_COLUMN} >= :start")
+        params['start'] = start
+    if rollup.grain and end:
+        conditions.append(f"{PERIOD_COLUMN} < :end")
+        params['end'] = end
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = session.execute(text(
+        f"SELECT {', '.join(selected)} FROM {rollup.name} {where} "
+        f"ORDER BY {', '.join(rollup.key_columns)} LIMIT :limit OFFSET :offset"
+    ), params)
+    return [dict(row._mapping) for row in rows]
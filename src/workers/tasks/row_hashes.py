@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import binascii
+import hashlib
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import settings
+
+# Computed column holding a 128-bit hash of each row's data values (a uuid)
+ROW_HASH_COLUMN = 'row_hash'
+
+
+def row_hash_enabled(table_name: str) -> bool:
+    """Return whether new rows of a table are deduplicated by content hash (INGEST_ROW_HASH_TABLES)."""
+    return table_name in settings.INGEST_ROW_HASH_TABLES
+
+
+def uses_row_hash(natural_key: Optional[Sequence[str]]) -> bool:
+    """Return whether a table's natural key is its row hash."""
+    return ROW_HASH_COLUMN in (natural_key or ())
+
+
+@lru_cache(maxsize=None)
+def _column_hash_keys(column: str) -> Tuple[str, str]:
+    # Two independent 16 character SipHash keys per column; keying by column
+    # name keeps equal values in different columns from cancelling out
+    digest = hashlib.md5(column.encode('utf-8')).hexdigest()
+    return digest[:16], digest[16:]
+
+
+def _column_hashes(values: pd.Series, hash_key: str) -> np.ndarray:
+    nulls = values.isna().to_numpy(dtype=bool)
+    text = values.astype(str).to_numpy(dtype=object)
+    if values.dtype == object:
+        nulls |= text == ''
+    hashes = pd.util.hash_array(text, hash_key=hash_key, categorize=False)
+    hashes[nulls] = 0
+    return hashes
+
+
+def row_hashes(columns: Sequence[str], column_values: Sequence[pd.Series]) -> np.ndarray:
+    """
+    Hash rows by their data values, column by column.
+
+    Each column is hashed with keys derived from its name and the column
+    hashes are summed, so the hash does not depend on column order, and a
+    null value (None or empty, which load as NULL) adds nothing: a column
+    added to the table later does not change the hash of rows without it.
+    Values are hashed in their text form, as parsed from the attachment.
+
+    Args:
+        columns: Data column names
+        column_values: Values of each column, in the same order
+
+    Returns:
+        Array of 32 hex digit strings (uuid input form), one per row
+    """
+    size = len(column_values[0]) if column_values else 0
+    high = np.zeros(size, dtype=np.uint64)
+    low = np.zeros(size, dtype=np.uint64)
+    for column, values in zip(columns, column_values):
+        high_key, low_key = _column_hash_keys(column)
+        high += _column_hashes(values, high_key)
+        low += _column_hashes(values, low_key)
+
+    digests = np.empty((size, 2), dtype='>u8')
+    digests[:, 0] = high
+    digests[:, 1] = low
+    return np.frombuffer(binascii.hexlify(digests.tobytes()), dtype='S32').astype('U32')
+
+
+def with_row_hashes(batch: Any, columns: Sequence[str]) -> Any:
+    """
+    Append the row hash to every row of a load batch.
+
+    Args:
+        batch: Row tuples or a DataFrame, data columns first
+        columns: Data column names
+
+    Returns:
+        The batch with a trailing row_hash value per row
+    """
+    if len(batch) == 0:
+        return batch
+    if isinstance(batch, pd.DataFrame):
+        batch[ROW_HASH_COLUMN] = row_hashes(columns, [batch[column] for column in columns])
+        return batch
+
+    # Provenance values past the data columns are not part of the hash
+    column_values = [pd.Series(values, dtype=object) for values in islice(zip(*batch), len(columns))]
+    hashes = row_hashes(columns, column_values).tolist()
+    return [row + (row_hash,) for row, row_hash in zip(batch, hashes)]
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.email import IngestTableSchema
+from src.workers.tasks.natural_keys import partitioned_natural_key
+from src.workers.tasks.row_hashes import ROW_HASH_COLUMN, uses_row_hash
+from src.workers.tasks.type_inference import TEXT, sql_type_for
+
+logger = logging.getLogger(__name__)
+
+# Columns every attachment table has besides its data columns
+KEY_COLUMNS = ['id']
+# Provenance written on every row of tables created before ingest batches
+METADATA_COLUMNS = ['insertion_timestamp', 'attachment_date', 'source_attachment_id', 'source_filename']
+# Provenance of tables whose rows reference an ingest batch
+BATCH_METADATA_COLUMNS = ['attachment_date', 'ingest_batch_id']
+
+# Catalog data types of tables created before the registry, as inferred type names
+CATALOG_TYPES = {
+    'bigint': 'integer',
+    'integer': 'integer',
+    'numeric': 'numeric',
+    'boolean': 'boolean',
+    'date': 'date',
+    'timestamp without time zone': 'timestamp',
+    'timestamp with time zone': 'timestamptz',
+}
+
+# Quotes table and column names in raw SQL where PostgreSQL requires it
+_identifier_preparer = postgresql.dialect().identifier_preparer
+
+
+class TableSchema(NamedTuple):
+    """Registered data columns (name -> inferred type), version, natural key and layout of a table."""
+
+    table_name: str
+    columns: Dict[str, str]
+    version: int
+    natural_key: Optional[List[str]] = None
+    partition_interval: Optional[str] = None
+    batch_provenance: bool = False
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name for raw SQL if it is a reserved word or not a plain lowercase name."""
+    return _identifier_preparer.quote(name)
+
+
+def quote_identifiers(names: List[str]) -> str:
+    """Return a comma separated list of quoted column names."""
+    return ', '.join(quote_identifier(name) for name in names)
+
+
+def metadata_columns(schema: TableSchema) -> List[str]:
+    """Return the provenance columns loaded with every row of a table, after its data columns."""
+    return BATCH_METADATA_COLUMNS if schema.batch_provenance else METADATA_COLUMNS
+
+
+def computed_columns(schema: TableSchema) -> List[str]:
+    """Return the columns computed per row while loading a table, after its provenance columns."""
+    return [ROW_HASH_COLUMN] if uses_row_hash(schema.natural_key) else []
+
+
+# Per-worker cache of registered schemas; refreshed under the table lock on change
+_schema_cache: Dict[str, TableSchema] = {}
+
+
+def lock_table_schema(session: Session, table_name: str) -> None:
+    """
+    Serialize schema changes to a table until the current transaction ends.
+
+    Args:
+        session: Database session
+        table_name: Table whose schema is changed
+    """
+    session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:table_name))"), {'table_name': table_name})
+
+
+def invalidate_table_schema(table_name: str) -> None:
+    """Drop a table from this worker's schema cache (e.g. after an undefined column error)."""
+    _schema_cache.pop(table_name, None)
+
+
+def get_table_schema(session: Session, table_name: str, refresh: bool = False) -> Optional[TableSchema]:
+    """
+    Look up the registered schema of a table, from the worker cache when possible.
+
+    Tables created before the registry existed are read from the catalog once
+    and registered (the caller commits).
+
+    Args:
+        session: Database session
+        table_name: Table name
+        refresh: Bypass the worker cache
+
+    Returns:
+        The table schema, or None if the table does not exist
+    """
+    if not refresh and table_name in _schema_cache:
+        return _schema_cache[table_name]
+
+    entry = session.query(IngestTableSchema).populate_existing().filter(
+        IngestTableSchema.table_name == table_name
+    ).first()
+    if entry:
+        schema = TableSchema(
+            table_name, dict(entry.columns), entry.version, entry.natural_key, entry.partition_interval,
+            entry.batch_provenance
+        )
+    else:
+        schema = _register_catalog_schema(session, table_name)
+
+    if schema:
+        _schema_cache[table_name] = schema
+    else:
+        invalidate_table_schema(table_name)
+    return schema
+
+
+def register_table_schema(
+    session: Session,
+    table_name: str,
+    columns: Dict[str, str],
+    natural_key: Optional[List[str]] = None,
+    partition_interval: Optional[str] = None,
+    batch_provenance: bool = False
+) -> TableSchema:
+    """
+    Register the data columns of a newly created table (the caller commits).
+
+    Args:
+        session: Database session
+        table_name: Table name
+        columns: Data column name -> inferred type
+        natural_key: Columns of the table's natural key unique index
+        partition_interval: Interval of the table's attachment_date partitions
+        batch_provenance: Whether rows reference an ingest batch
+
+    Returns:
+        The registered schema
+    """
+    session.add(IngestTableSchema(
+        table_name=table_name, columns=dict(columns), version=1, natural_key=natural_key,
+        partition_interval=partition_interval, batch_provenance=batch_provenance
+    ))
+    schema = TableSchema(table_name, dict(columns), 1, natural_key, partition_interval, batch_provenance)
+    _schema_cache[table_name] = schema
+    return schema
+
+
+def natural_key_index_name(table_name: str) -> str:
+    """Name of the unique index backing a table's natural key (within the 63 byte limit)."""
+    return f"uq_{table_name[:45]}_natural_key"
+
+
+def create_natural_key_index(session: Session, table_name: str, natural_key: List[str]) -> None:
+    """
+    Create the unique index backing a natural key.
+
+    NULLs compare equal (PostgreSQL 15+) so rows with missing key values are
+    deduplicated too.
+
+    Args:
+        session: Database session
+        table_name: Table name
+        natural_key: Key columns
+    """
+    session.execute(text(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {quote_identifier(natural_key_index_name(table_name))} "
+        f"ON {quote_identifier(table_name)} ({quote_identifiers(natural_key)}) NULLS NOT DISTINCT"
+    ))
+
+
+def apply_natural_key(session: Session, table_name: str, natural_key: List[str]) -> TableSchema:
+    """
+    Add a natural key to a registered table that has none (the caller commits).
+
+    If the table already holds duplicate keys the index cannot be built; the
+    table is then left without a key and loads append as before.
+
+    Args:
+        session: Database session
+        table_name: Table name
+        natural_key: Key columns
+
+    Returns:
+        The (possibly updated) schema
+    """
+    lock_table_schema(session, table_name)
+    schema = get_table_schema(session, table_name, refresh=True)
+    if schema.natural_key:
+        return schema
+    if schema.partition_interval:
+        natural_key = partitioned_natural_key(natural_key)
+
+    try:
+        with session.begin_nested():
+            create_natural_key_index(session, table_name, natural_key)
+    except IntegrityError as e:
+        logger.warning(f"Cannot add natural key {natural_key} to {table_name}, existing rows conflict: {e.orig}")
+        return schema
+
+    logger.info(f"Added natural key {natural_key} to {table_name}")
+    return _update_registry(session, schema, schema.columns, natural_key)
+
+
+def evolve_table_schema(
+    session: Session,
+    table_name: str,
+    headers: List[str],
+    column_types: Optional[Dict[str, str]] = None
+) -> TableSchema:
+    """
+    Add columns for headers the table does not have yet.
+
+    The cached schema is checked first, so the common case costs no queries.
+    New columns are added with ALTER TABLE ... ADD COLUMN IF NOT EXISTS under
+    the table's advisory lock, after re-reading the registry so concurrent
+    workers add each column once. The caller commits, which releases the lock.
+
+    Args:
+        session: Database session
+        table_name: Table name
+        headers: CSV headers of the attachment being loaded
+        column_types: Inferred type per header (text if missing)
+
+    Returns:
+        The (possibly evolved) schema
+    """
+    column_types = column_types or {}
+    schema = get_table_schema(session, table_name)
+    if schema is None:
+        raise ValueError(f"Table {table_name} does not exist")
+    if all(header in schema.columns for header in headers):
+        return schema
+
+    lock_table_schema(session, table_name)
+    schema = get_table_schema(session, table_name, refresh=True)
+    missing = [header for header in headers if header not in schema.columns]
+    if not missing:
+        return schema
+
+    dialect = postgresql.dialect()
+    columns = dict(schema.columns)
+    for header in missing:
+        type_name = column_types.get(header, TEXT)
+        sql_type = sql_type_for(type_name).compile(dialect=dialect)
+        session.execute(text(
+            f"ALTER TABLE {quote_identifier(table_name)} ADD COLUMN IF NOT EXISTS {quote_identifier(header)} {sql_type}"
+        ))
+        columns[header] = type_name
+
+    schema = _update_registry(session, schema, columns)
+    logger.info(f"Added columns {missing} to {table_name} (schema version {schema.version})")
+    return schema
+
+
+def record_widened_columns(session: Session, table_name: str, widened_columns: List[str]) -> Optional[TableSchema]:
+    """
+    Record columns the bulk loader widened to text (the caller commits).
+
+    Args:
+        session: Database session
+        table_name: Table name
+        widened_columns: Columns altered to text
+
+    Returns:
+        The updated schema, or None if nothing was widened
+    """
+    if not widened_columns:
+        return None
+
+    lock_table_schema(session, table_name)
+    schema = get_table_schema(session, table_name, refresh=True)
+    columns = dict(schema.columns)
+    columns.update({column: TEXT for column in widened_columns})
+    return _update_registry(session, schema, columns)
+
+
+def widen_table_columns(session: Session, table_name: str, columns: List[str]) -> Optional[TableSchema]:
+    """
+    Alter typed columns to text (existing values are cast) and record them (the caller commits).
+
+    Used when rows loaded elsewhere (e.g. a staging table whose columns the
+    bulk loader widened) are merged into the table. Family views over the
+    table are dropped first and rebuilt after the load commits.
+
+    Args:
+        session: Database session
+        table_name: Table name
+        columns: Columns to widen; columns that are text already are skipped
+
+    Returns:
+        The updated schema, or None if nothing was widened
+    """
+    if not columns:
+        return None
+
+    # Imported here since the catalog builds on the registry
+    from src.workers.tasks.catalog import drop_family_views
+
+    lock_table_schema(session, table_name)
+    schema = get_table_schema(session, table_name, refresh=True)
+    typed = [column for column in columns if schema.columns.get(column, TEXT) != TEXT]
+    if typed:
+        with session.connection().connection.cursor() as cursor:
+            drop_family_views(cursor, table_name)
+    for column in typed:
+        column = quote_identifier(column)
+        session.execute(text(
+            f"ALTER TABLE {quote_identifier(table_name)} ALTER COLUMN {column} TYPE text USING {column}::text"
+        ))
+    if typed:
+        logger.info(f"Widened {table_name} columns {typed} to text")
+    return record_widened_columns(session, table_name, typed)
+
+
+def _update_registry(
+    session: Session,
+    schema: TableSchema,
+    columns: Dict[str, str],
+    natural_key: Optional[List[str]] = None
+) -> TableSchema:
+    version = schema.version + 1
+    natural_key = natural_key or schema.natural_key
+    session.query(IngestTableSchema).filter(IngestTableSchema.table_name == schema.table_name).update(
+        {
+            IngestTableSchema.columns: columns,
+            IngestTableSchema.version: version,
+            IngestTableSchema.natural_key: natural_key
+        },
+        synchronize_session=False
+    )
+    updated = schema._replace(columns=columns, version=version, natural_key=natural_key)
+    _schema_cache[schema.table_name] = updated
+    return updated
+
+
+def _register_catalog_schema(session: Session, table_name: str) -> Optional[TableSchema]:
+    rows = session.execute(text("""
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = :table_name
+        ORDER BY ordinal_position
+    """), {'table_name': table_name}).fetchall()
+    if not rows:
+        return None
+
+    columns = {
+        name: CATALOG_TYPES.get(data_type, TEXT)
+        for name, data_type in rows
+        if name not in KEY_COLUMNS + METADATA_COLUMNS + BATCH_METADATA_COLUMNS + [ROW_HASH_COLUMN]
+    }
+    session.execute(
+        insert(IngestTableSchema).values(table_name=table_name, columns=columns, version=1)
+        .on_conflict_do_nothing(index_elements=['table_name'])
+    )
+    logger.info(f"Registered existing table {table_name} with {len(columns)} data columns")
+    return TableSchema(table_name, columns, 1)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Numeric, Text
+from sqlalchemy.types import TypeEngine
+
+# Rows sampled from the head of a file to infer column types
+TYPE_INFERENCE_SAMPLE_ROWS = 1000
+
+# Inferred column types, narrowest first
+INTEGER = "integer"
+NUMERIC = "numeric"
+BOOLEAN = "boolean"
+DATE = "date"
+TIMESTAMP = "timestamp"
+TIMESTAMPTZ = "timestamptz"
+TEXT = "text"
+
+SQL_TYPES: Dict[str, TypeEngine] = {
+    INTEGER: BigInteger(),
+    NUMERIC: Numeric(),
+    BOOLEAN: Boolean(),
+    DATE: Date(),
+    TIMESTAMP: DateTime(timezone=False),
+    TIMESTAMPTZ: DateTime(timezone=True),
+    TEXT: Text(),
+}
+
+BIGINT_MAX = 2 ** 63 - 1
+
+# Leading zeros (zip codes, account numbers) are identifiers, not integers
+INTEGER_PATTERN = re.compile(r'^[+-]?(0|[1-9]\d*)$')
+NUMERIC_PATTERN = re.compile(r'^[+-]?((0|[1-9]\d*)(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?$')
+TIMESTAMPTZ_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}(:?\d{2})?)$')
+BOOLEAN_VALUES = frozenset({'true', 'false', 't', 'f', 'yes', 'no', 'y', 'n'})
+
+
+def _is_integer(value: str) -> bool:
+    return bool(INTEGER_PATTERN.match(value)) and abs(int(value)) <= BIGINT_MAX
+
+
+def _is_numeric(value: str) -> bool:
+    return bool(NUMERIC_PATTERN.match(value))
+
+
+def _is_boolean(value: str) -> bool:
+    return value.lower() in BOOLEAN_VALUES
+
+
+def _is_date(value: str) -> bool:
+    if not DATE_PATTERN.match(value):
+        return False
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_timestamp(value: str) -> bool:
+    if not TIMESTAMP_PATTERN.match(value):
+        return False
+    try:
+        datetime.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_timestamptz(value: str) -> bool:
+    if not TIMESTAMPTZ_PATTERN.match(value):
+        return False
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return True
+    except ValueError:
+        return False
+
+
+# Candidate types in the order they are tried; the first that fits every value wins
+TYPE_CHECKS = [
+    (BOOLEAN, _is_boolean),
+    (INTEGER, _is_integer),
+    (NUMERIC, _is_numeric),
+    (DATE, _is_date),
+    (TIMESTAMP, _is_timestamp),
+    (TIMESTAMPTZ, _is_timestamptz),
+]
+
+
+def infer_value_type(values: Iterable[Optional[str]]) -> str:
+    """
+    Infer the narrowest type that fits every non-empty value.
+
+    Args:
+        values: Sampled column values (None for empty)
+
+    Returns:
+        Inferred type name; 'text' when nothing narrower fits or all values are empty
+    """
+    values = [value for value in values if value is not None]
+    if not values:
+        return TEXT
+
+    for type_name, check in TYPE_CHECKS:
+        if all(check(value) for value in values):
+            return type_name
+    return TEXT
+
+
+def infer_column_types(headers: List[str], sample_rows: Sequence[Sequence[Optional[str]]]) -> Dict[str, str]:
+    """
+    Infer a type per column from sampled rows.
+
+    Args:
+        headers: Column headers
+        sample_rows: Row tuples in header order
+
+    Returns:
+        Mapping of header to inferred type name
+    """
+    return {
+        header: infer_value_type(row[i] for row in sample_rows)
+        for i, header in enumerate(headers)
+    }
+
+
+def sql_type_for(type_name: Optional[str]) -> TypeEngine:
+    """Return the SQLAlchemy column type for an inferred type name (Text if unknown)."""
+    return SQL_TYPES.get(type_name or TEXT, SQL_TYPES[TEXT])
@@ -13,8 +13,8 @@ from sqlalchemy.orm import sessionmaker
 
 from src.core.config import settings
 from src.models.email import EmailAccount, EmailMessage, EmailAttachment
-from src.workers.tasks.attachment_processing_tasks import (
-    extract_attachment_information,
+from src.workers.tasks.attachment_processing_tasks import extract_attachment_information
+from src.workers.tasks.attachment_routing import (
     sanitize_table_name,
     extract_date_from_filename
 )
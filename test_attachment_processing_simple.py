@@ -13,10 +13,11 @@ from sqlalchemy.orm import sessionmaker
 
 from src.core.config import settings
 from src.models.email import EmailAccount, EmailMessage, EmailAttachment
-from src.workers.tasks.attachment_processing_tasks import (
+from src.workers.tasks.attachment_routing import (
     sanitize_table_name,
     extract_date_from_filename
 )
+from src.workers.tasks.processing_state import query_pending_attachments
 
 # Database setup
 engine = create_engine(settings.database_url)
@@ -58,12 +59,8 @@ def test_csv_attachment_query():
         print("\n🔍 Testing CSV Attachment Query")
         print("=" * 50)
         
-        # Query for all CSV attachments
-        csv_attachments = session.query(EmailAttachment).filter(
-            (EmailAttachment.content_type.like('%csv%') | 
-             EmailAttachment.filename.like('%.csv')),
-            ~EmailAttachment.filename.like('%PROCESSED%')
-        ).all()
+        # Query for all pending CSV attachments
+        csv_attachments = query_pending_attachments(session)
         
         print(f"Found {len(csv_attachments)} CSV attachments:")
         for attachment in csv_attachments:
@@ -0,0 +1,56 @@
+"""Compressed attachment detection and member streaming tests."""
+
+import gzip
+import zipfile
+
+from src.workers.tasks.attachment_archives import (
+    GZIP,
+    ZIP,
+    archive_format,
+    is_member_ingested,
+    open_archive_members,
+)
+
+
+def test_archive_format_by_extension_then_content_type():
+    """Test compressed attachments are recognised by extension before MIME type."""
+    assert archive_format("prices_2025-07-09.csv.gz", "text/csv") == GZIP
+    assert archive_format("reports.ZIP", None) == ZIP
+    assert archive_format("reports", "application/x-zip-compressed; name=reports") == ZIP
+    assert archive_format("prices.csv", "text/csv") is None
+
+
+def test_only_data_file_members_are_ingested():
+    """Test metadata and members without a readable format are skipped."""
+    assert is_member_ingested("reports/prices.csv")
+    assert is_member_ingested("reports/prices.parquet")
+    assert not is_member_ingested("readme.txt")
+    assert not is_member_ingested("__MACOSX/reports/._prices.csv")
+
+
+def test_zip_members_are_streamed(tmp_path):
+    """Test each zip member is opened as its own decompressing stream."""
+    path = tmp_path / "reports.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("prices.csv", b"symbol,price\nA,1\n")
+        archive.writestr("reports/", b"")
+        archive.writestr("reports/volumes.csv", b"symbol,volume\nA,2\n")
+
+    with open_archive_members(str(path), ZIP, "reports.zip") as members:
+        contents = {name: stream.read() for name, stream in members}
+
+    assert contents == {
+        "prices.csv": b"symbol,price\nA,1\n",
+        "reports/volumes.csv": b"symbol,volume\nA,2\n",
+    }
+
+
+def test_single_stream_member_is_named_after_the_archive(tmp_path):
+    """Test a gzip file holds one member named by dropping the compression extension."""
+    path = tmp_path / "upload"
+    path.write_bytes(gzip.compress(b"symbol,price\nA,1\n"))
+
+    with open_archive_members(str(path), GZIP, "prices_2025-07-09.csv.gz") as members:
+        contents = [(name, stream.read()) for name, stream in members]
+
+    assert contents == [("prices_2025-07-09.csv", b"symbol,price\nA,1\n")]
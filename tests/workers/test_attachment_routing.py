@@ -0,0 +1,77 @@
+"""Filename routing rule tests."""
+
+from datetime import datetime
+
+import pytest
+
+from src.workers.tasks.attachment_routing import (
+    compile_routing_rules,
+    extract_date_from_filename,
+    route_filename,
+    sanitize_table_name,
+)
+
+
+def test_default_table_names_drop_dates_and_extension():
+    """Test filenames without a rule keep their heuristic table names."""
+    assert sanitize_table_name("Stock_Data_2025_07_09.csv") == "stock_data"
+    assert sanitize_table_name("My Report 2025-07-09 (final).csv") == "my_report_final"
+    assert sanitize_table_name("data-file-20250709.csv") == "data_file"
+    assert sanitize_table_name("123.csv") == "table_123"
+    assert sanitize_table_name("Order_2025-07-09.csv") == "table_order"
+    assert sanitize_table_name("@#.csv") == "processed_attachment"
+
+
+def test_default_dates_in_all_supported_orders():
+    """Test dates are read year-first or month-first, and invalid dates are skipped."""
+    assert extract_date_from_filename("prices_2025-07-09.csv") == datetime(2025, 7, 9)
+    assert extract_date_from_filename("prices_07-09-2025.csv") == datetime(2025, 7, 9)
+    assert extract_date_from_filename("prices_07_09_2025.csv") == datetime(2025, 7, 9)
+    assert extract_date_from_filename("prices_2025-13-01_20250709.csv") == datetime(2025, 7, 9)
+    assert extract_date_from_filename("prices.csv") is None
+
+
+def test_first_matching_rule_routes_table_date_and_options():
+    """Test rules map a pattern to a table, a date format and reader options, in order."""
+    rules = compile_routing_rules([
+        {
+            "pattern": r"^EOD (?P<desk>\w+) (?P<date>\d{2}\.\d{2}\.\d{4})",
+            "table": "eod_{desk}",
+            "date_format": "%d.%m.%Y",
+            "options": {"format": "csv", "delimiter": ";"},
+        },
+        {"pattern": r"^eod", "table": "eod_other"},
+    ])
+
+    route = route_filename("EOD Rates 09.07.2025.txt", rules)
+    assert route.table_name == "eod_rates"
+    assert route.attachment_date == datetime(2025, 7, 9)
+    assert dict(route.options) == {"format": "csv", "delimiter": ";"}
+
+    fallback = route_filename("eod_2025-07-09.csv", rules)
+    assert (fallback.table_name, fallback.attachment_date) == ("eod_other", datetime(2025, 7, 9))
+
+    unrouted = route_filename("prices_2025-07-09.csv", rules)
+    assert (unrouted.table_name, unrouted.rule) == ("prices", None)
+
+
+def test_invalid_rule_date_gives_no_date():
+    """Test a date group that does not parse with the rule's format leaves the date unset."""
+    rules = compile_routing_rules([{"pattern": r"(?P<date>\d{8})", "table": "prices", "date_format": "%Y%m%d"}])
+    assert route_filename("prices_20251340.csv", rules).attachment_date is None
+
+
+@pytest.mark.parametrize("rule", [
+    {"table": "prices"},
+    {"pattern": "("},
+    {"pattern": "prices", "table": "Prices Table"},
+    {"pattern": "prices", "table": "prices_{desk}"},
+    {"pattern": "prices", "date_format": "%Y%m%d"},
+    {"pattern": "prices", "options": {"quotechar": "'"}},
+    {"pattern": "prices", "options": {"engine": "polars"}},
+    {"pattern": "prices", "options": {"format": "avro"}},
+])
+def test_invalid_rules_are_rejected(rule):
+    """Test configuration mistakes fail when the rules are compiled."""
+    with pytest.raises(ValueError):
+        compile_routing_rules([rule])
@@ -0,0 +1,112 @@
+"""Table catalog and table family view tests."""
+
+from types import SimpleNamespace
+
+import pytest
+from psycopg2 import DataError
+
+from src.workers.tasks.bulk_loader import BulkLoader
+from src.workers.tasks.catalog import compile_table_families, drop_family_views, family_view_sql
+from src.workers.tasks.schema_registry import TableSchema
+
+
+class VolumeDataError(DataError):
+    diag = SimpleNamespace(context='COPY prices, line 3, column volume: "n/a"')
+
+
+class RecordingCursor:
+    """DBAPI cursor stand-in: prices is a member of the prices_all family, and COPY fails once on volume."""
+
+    def __init__(self):
+        self.statements = []
+        self.copies = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        self.rowcount = 0
+
+    def fetchall(self):
+        return [("prices_all",)] if "ingest_table_families" in self.statements[-1] else []
+
+    def copy_expert(self, sql, buffer):
+        self.copies += 1
+        if self.copies == 1:
+            raise VolumeDataError("invalid input syntax for type bigint")
+
+
+def test_families_match_whole_table_names():
+    """Test patterns match entire names and lists match exactly, never the view itself."""
+    families = compile_table_families({
+        "prices_all": "prices(_[a-z]+)?",
+        "fills_all": ["fills", "fills.eu"],
+    })
+
+    assert [name for name in ("prices", "prices_eu", "prices_all", "eu_prices") if families["prices_all"].matches(name)] == [
+        "prices", "prices_eu"
+    ]
+    assert families["fills_all"].matches("fills.eu")
+    assert not families["fills_all"].matches("fills_eu")
+
+
+@pytest.mark.parametrize("families", [
+    {"Prices All": "prices"},
+    {"prices_all; drop view x": "prices"},
+    {"prices_all": "prices(["},
+])
+def test_invalid_families_are_rejected(families):
+    """Test configuration mistakes fail when the families are compiled."""
+    with pytest.raises(ValueError):
+        compile_table_families(families)
+
+
+def test_family_view_unions_the_column_superset():
+    """Test missing columns read as NULL and columns typed differently across members as text."""
+    sql = family_view_sql("prices_all", [
+        TableSchema("prices", {"symbol": "text", "price": "numeric", "volume": "integer"}, 2, batch_provenance=True),
+        TableSchema("prices_eu", {"symbol": "text", "price": "text", "venue": "text"}, 1),
+    ])
+
+    first, second = sql.split("\nUNION ALL\n")
+    assert first == (
+        "CREATE VIEW prices_all AS\n"
+        "SELECT 'prices'::text AS source_table, attachment_date, ingest_batch_id, "
+        "symbol, price::TEXT AS price, volume, NULL::TEXT AS venue FROM prices"
+    )
+    assert second == (
+        "SELECT 'prices_eu'::text AS source_table, attachment_date, NULL::integer AS ingest_batch_id, "
+        "symbol, price, NULL::BIGINT AS volume, venue FROM prices_eu"
+    )
+
+
+def test_widening_a_family_member_drops_its_views_first():
+    """Test the family views over a table are dropped before a column is altered, in the same transaction."""
+    cursor = RecordingCursor()
+    loader = BulkLoader(
+        SimpleNamespace(cursor=lambda: cursor), "prices", ["symbol", "volume"],
+        widen_columns=["volume"], before_alter=drop_family_views
+    )
+
+    assert loader.load_batch([("A", "1"), ("B", "n/a")]) == 2
+    assert loader.columns_widened == ["volume"]
+    statements = [sql for sql in cursor.statements if "SAVEPOINT" not in sql]
+    assert statements[1:] == [
+        "DROP VIEW IF EXISTS prices_all",
+        "ALTER TABLE prices ALTER COLUMN volume TYPE text USING volume::text",
+    ]
+    assert "ingest_table_families" in statements[0]
+
+
+def test_loader_quotes_reserved_identifiers():
+    """Test table and column names that are reserved words are quoted in the generated SQL."""
+    loader = BulkLoader(SimpleNamespace(cursor=None), "order", ["symbol", "user"], conflict_columns=["user"])
+
+    assert loader._copy_sql == 'COPY _stage_order (symbol, "user") FROM STDIN WITH (FORMAT csv)'
+    assert loader._merge_sql == (
+        'INSERT INTO "order" (symbol, "user") SELECT symbol, "user" FROM _stage_order ON CONFLICT ("user") DO NOTHING'
+    )
@@ -0,0 +1,130 @@
+"""Cold archive tests."""
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from src.core.config import settings
+from src.workers.tasks.cold_archive import (
+    ARCHIVE_COMPRESSION,
+    archive_filesystem,
+    archive_path,
+    connect_table_history,
+    ensure_archive_storage,
+    rows_to_arrow,
+)
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def test_archived_rows_keep_registry_types(tmp_path):
+    """Test rows are written with the Arrow types of their registry and metadata columns."""
+    columns = ["symbol", "volume", "price", "traded_on", "attachment_date", "ingest_batch_id", "row_hash"]
+    rows = [
+        ("AAA", 10, Decimal("1.25"), date(2025, 7, 1), datetime(2025, 7, 9, tzinfo=timezone.utc), 4,
+         UUID("00000000-0000-0000-0000-000000000001")),
+        (None, None, None, None, datetime(2025, 7, 9, tzinfo=timezone.utc), 4, None),
+    ]
+    types = {"symbol": "text", "volume": "integer", "price": "numeric", "traded_on": "date"}
+
+    table = rows_to_arrow(columns, rows, types)
+    path = tmp_path / "rows.parquet"
+    pq.write_table(table, path, compression=ARCHIVE_COMPRESSION)
+    restored = pq.read_table(path)
+
+    assert [str(field.type) for field in restored.schema] == [
+        "string", "int64", "decimal128(3, 2)", "date32[day]", "timestamp[us, tz=UTC]", "int64", "string"
+    ]
+    assert restored.column("row_hash").to_pylist() == ["00000000-0000-0000-0000-000000000001", None]
+    assert restored.column("price").to_pylist() == [Decimal("1.25"), None]
+
+
+def test_numeric_values_wider_than_decimals_fall_back_to_float():
+    """Test numeric columns no decimal type can hold are archived as float64."""
+    table = rows_to_arrow(["amount"], [(Decimal("1e400"),), (Decimal("2.5"),)], {"amount": "numeric"})
+
+    assert table.schema.field("amount").type == pa.float64()
+
+
+def test_archive_paths_are_per_table_and_date(monkeypatch, tmp_path):
+    """Test each archived file gets a new name under its table and report date directory."""
+    monkeypatch.setattr(settings, "INGEST_ARCHIVE_DIR", str(tmp_path))
+
+    first, second = archive_path("prices", date(2025, 7, 9)), archive_path("prices", date(2025, 7, 9))
+
+    assert first.parent == tmp_path / "prices" / "archive_date=2025-07-09"
+    assert first != second and first.suffix == ".parquet"
+
+
+def test_archive_filesystem_is_the_innermost_mount(tmp_path):
+    """Test the directory's filesystem comes from the longest mount point containing it."""
+    volume = tmp_path / "data archive"
+    volume.mkdir()
+    mounts = tmp_path / "mounts"
+    escaped = str(volume).replace(" ", "\\040")
+    mounts.write_text(
+        "overlay / overlay rw 0 0\n"
+        f"/dev/sdb {escaped} ext4 rw 0 0\n"
+        f"/dev/sdc {volume}2 xfs rw 0 0\n"
+    )
+
+    assert archive_filesystem(volume / "prices", str(mounts)) == "ext4"
+    assert archive_filesystem(tmp_path, str(mounts)) == "overlay"
+    assert archive_filesystem(tmp_path, str(tmp_path / "missing")) is None
+
+
+def test_archiving_refuses_ephemeral_storage(monkeypatch, tmp_path):
+    """Test archiving fails before deleting rows when the directory would not outlive the container."""
+    monkeypatch.setattr(settings, "INGEST_ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr("src.workers.tasks.cold_archive.archive_filesystem", lambda directory: "overlay")
+    with pytest.raises(RuntimeError, match="ephemeral overlay"):
+        ensure_archive_storage()
+
+    monkeypatch.setattr("src.workers.tasks.cold_archive.archive_filesystem", lambda directory: "ext4")
+    assert ensure_archive_storage().is_dir()
+
+
+def test_archived_rows_read_back_within_bounds(tmp_path):
+    """Test archive files are read as one relation named after the table, bounded by report date."""
+    pytest.importorskip("duckdb")
+    paths = []
+    # The second file was archived after a note column was added
+    for day, extra in ((1, []), (2, ["note"])):
+        columns = ["symbol", "volume", "attachment_date"] + extra
+        reported = datetime(2025, 7, day, tzinfo=timezone.utc)
+        rows = [(f"S{i}", i, reported) + ("x",) * len(extra) for i in range(3)]
+        path = tmp_path / f"{day}.parquet"
+        pq.write_table(rows_to_arrow(columns, rows, {"volume": "integer"}), path)
+        paths.append(str(path))
+
+    connection = connect_table_history("prices", paths, start=datetime(2025, 7, 2, tzinfo=timezone.utc))
+    try:
+        assert connection.execute("SELECT count(*), sum(volume), count(note) FROM prices").fetchall() == [(3, 3, 3)]
+    finally:
+        connection.close()
+    connection = connect_table_history("prices", paths)
+    try:
+        assert connection.execute("SELECT count(*), count(note) FROM prices").fetchall() == [(6, 3)]
+    finally:
+        connection.close()
+
+
+def test_history_view_reads_streamed_hot_rows_and_projects_columns(tmp_path):
+    """Test hot rows can be a record batch reader and the view only exposes the requested columns."""
+    duckdb = pytest.importorskip("duckdb")
+    reported = datetime(2025, 7, 1, tzinfo=timezone.utc)
+    path = tmp_path / "1.parquet"
+    pq.write_table(rows_to_arrow(["symbol", "volume", "attachment_date"], [("A", 1, reported)], {"volume": "integer"}), path)
+    hot = rows_to_arrow(["symbol", "volume", "note"], [("B", 2, "x"), ("C", 3, None)], {"volume": "integer"})
+    reader = pa.RecordBatchReader.from_batches(hot.schema, hot.to_batches(max_chunksize=1))
+
+    connection = connect_table_history("prices", [str(path)], hot_rows=reader, columns=["symbol", "volume"])
+    try:
+        assert connection.execute("SELECT count(*), sum(volume) FROM prices").fetchall() == [(3, 6)]
+        with pytest.raises(duckdb.BinderException):
+            connection.execute("SELECT note FROM prices")
+    finally:
+        connection.close()
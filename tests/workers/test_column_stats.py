@@ -0,0 +1,62 @@
+"""Ingest-time column statistics tests."""
+
+import numpy as np
+import pandas as pd
+
+from src.workers.tasks.column_stats import HLL_REGISTERS, ColumnProfiler, hll_add, hll_estimate
+
+COLUMN_TYPES = {"symbol": "text", "volume": "integer", "price": "numeric"}
+
+
+def test_row_batches_and_frames_give_the_same_stats():
+    """Test python engine rows and pandas engine frames are profiled alike, ignoring provenance."""
+    rows = [("AAA", "100", "1.5", "meta"), ("BBB", None, "2.5", "meta"), ("AAA", "", "x", "meta")]
+    frame = pd.DataFrame(rows, columns=["symbol", "volume", "price", "__metadata_0"])
+
+    by_rows = ColumnProfiler(["symbol", "volume", "price"], COLUMN_TYPES)
+    by_rows.observe(rows)
+    by_frame = ColumnProfiler(["symbol", "volume", "price"], COLUMN_TYPES)
+    by_frame.observe(frame)
+
+    for profiler in (by_rows, by_frame):
+        symbol, volume, price = (profiler.profiles[column] for column in ["symbol", "volume", "price"])
+        assert (symbol.row_count, symbol.null_count, symbol.distinct_estimate) == (3, 0, 2)
+        assert (symbol.min_value, symbol.max_value, symbol.value_sum) == ("AAA", "BBB", None)
+        assert (volume.null_count, volume.min_value, volume.value_sum) == (2, 100, 100)
+        # Values that are not numbers are counted but not summed
+        assert (price.distinct_estimate, price.min_value, price.max_value, price.value_sum) == (3, 1.5, 2.5, 4.0)
+
+
+def test_numeric_min_max_compare_as_numbers():
+    """Test numeric columns are compared by value, not as text."""
+    profiler = ColumnProfiler(["volume"], COLUMN_TYPES)
+    profiler.observe([("9",), ("10",), ("-2",)])
+
+    assert (profiler.profiles["volume"].min_value, profiler.profiles["volume"].max_value) == (-2, 10)
+
+
+def test_range_profiles_merge_through_task_results():
+    """Test profiles serialized by range loads merge into whole-file statistics."""
+    first = ColumnProfiler(["symbol", "volume"], COLUMN_TYPES)
+    first.observe([(f"S{i}", str(i)) for i in range(1000)])
+    second = ColumnProfiler(["symbol", "volume"], COLUMN_TYPES)
+    second.observe([(f"S{i}", str(i)) for i in range(500, 1500)])
+
+    merged = ColumnProfiler.from_dict(first.to_dict())
+    merged.merge(ColumnProfiler.from_dict(second.to_dict()))
+
+    volume = merged.profiles["volume"]
+    assert (volume.row_count, volume.min_value, volume.max_value) == (2000, 0, 1499)
+    assert volume.value_sum == sum(range(1000)) + sum(range(500, 1500))
+    assert abs(merged.profiles["symbol"].distinct_estimate - 1500) <= 1500 * 0.05
+
+
+def test_distinct_estimate_error_is_small():
+    """Test the HyperLogLog estimate stays within a few percent for large counts."""
+    registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+    for start in range(0, 200_000, 50_000):
+        hll_add(registers, pd.Series(np.arange(start, start + 50_000)))
+    hll_add(registers, pd.Series(np.arange(0, 50_000)))
+
+    assert abs(hll_estimate(registers) - 200_000) <= 200_000 * 0.05
+    assert hll_estimate(np.zeros(HLL_REGISTERS, dtype=np.uint8)) == 0
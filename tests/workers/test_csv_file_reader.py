@@ -0,0 +1,90 @@
+"""CSV file reader tests."""
+
+import os
+from uuid import uuid4
+
+import pytest
+
+from src.core.attachment_storage import ensure_spooled, open_attachment_buffer, spool_attachment_content
+from src.core.config import settings
+from src.models.email import EmailAttachment
+from src.workers.tasks.csv_file_reader import CSVFileReader
+
+
+def test_parse_memory_mapped_attachment(tmp_path, monkeypatch):
+    """Test headers and rows are parsed from a spooled, memory-mapped file."""
+    monkeypatch.setattr(settings, "ATTACHMENT_SPOOL_DIR", str(tmp_path))
+    file_path, file_hash = spool_attachment_content(b'Symbol;Last Price\nAAA;"1\n2"\nBBB;3\n')
+    assert file_path.endswith(file_hash)
+
+    with open_attachment_buffer(file_path) as buffer:
+        headers, encoding, delimiter = CSVFileReader.parse_csv_headers(buffer)
+        rows = CSVFileReader.parse_csv_data(buffer, headers, encoding, delimiter)
+
+    assert headers == ["symbol", "last_price"]
+    assert delimiter == ";"
+    assert rows == [
+        {"symbol": "AAA", "last_price": "1\n2"},
+        {"symbol": "BBB", "last_price": "3"},
+    ]
+
+
+def test_spooling_identical_content_reuses_file(tmp_path, monkeypatch):
+    """Test identical attachments share one content-addressed spool file."""
+    monkeypatch.setattr(settings, "ATTACHMENT_SPOOL_DIR", str(tmp_path))
+    first = spool_attachment_content(b"a,b\n1,2\n")
+    second = spool_attachment_content(b"a,b\n1,2\n")
+    assert first == second
+
+
+def test_ensure_spooled_fails_for_missing_streamed_attachment(tmp_path, monkeypatch):
+    """Test a missing spool file without database content is an error, except for archive members."""
+    monkeypatch.setattr(settings, "ATTACHMENT_SPOOL_DIR", str(tmp_path))
+    file_path, file_hash = spool_attachment_content(b"a,b\n1,2\n")
+    os.unlink(file_path)
+
+    member = EmailAttachment(file_path=file_path, file_hash=file_hash, parent_attachment_id=uuid4())
+    assert ensure_spooled(member) is None
+
+    streamed = EmailAttachment(file_path=file_path, file_hash=file_hash)
+    with pytest.raises(FileNotFoundError, match="no stored content"):
+        ensure_spooled(streamed)
+
+
+def test_iter_csv_batches_yields_fixed_size_tuples():
+    """Test rows are streamed as header-ordered tuples in bounded batches."""
+    content = b"a,b,c\n1,2,3\n4,5\n\n6,7,8,9\n10, 11 ,\n"
+    headers, encoding, delimiter = CSVFileReader.parse_csv_headers(content)
+
+    batches = list(CSVFileReader.iter_csv_batches(content, headers, encoding, delimiter, batch_size=2))
+
+    assert batches == [
+        [("1", "2", "3"), ("4", "5", None)],
+        [("6", "7", "8"), ("10", "11", None)],
+    ]
+
+
+def test_detect_csv_format_ignores_quoted_delimiters():
+    """Test delimiter sniffing is not fooled by delimiters inside quotes."""
+    content = b'name;note\n"a";"x, y, z"\n"b";"p, q"\n'
+    assert CSVFileReader.detect_csv_format(content) == ("utf-8", ";")
+
+
+def test_detect_encoding_checks_bom_before_sampling():
+    """Test BOMs and strict UTF-8 are detected without chardet."""
+    assert CSVFileReader.detect_encoding(b"\xef\xbb\xbfa,b\n") == "utf-8-sig"
+    assert CSVFileReader.detect_encoding("a,b\n".encode("utf-16")) == "utf-16"
+    # A multi-byte character split by the sample boundary is still UTF-8
+    assert CSVFileReader.detect_encoding("aé,b\n".encode("utf-8"), sample_size=2) == "utf-8"
+
+
+def test_clean_headers_are_unique_and_not_reserved():
+    """Test repeated names get a suffix and reserved words or loader columns are renamed."""
+    headers = CSVFileReader.clean_headers(["Price", "price", "Order", "User", "id", "ingest_batch_id", "row_hash", ""])
+
+    assert headers == [
+        "price", "price_2", "column_order", "column_user", "column_id",
+        "column_ingest_batch_id", "column_row_hash", "column_8",
+    ]
+    long_headers = CSVFileReader.clean_headers(["x" * 70, "x" * 70])
+    assert long_headers == ["x" * 63, "x" * 61 + "_2"]
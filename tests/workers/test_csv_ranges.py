@@ -0,0 +1,46 @@
+"""Byte range splitting tests for parallel CSV ingest."""
+
+import csv
+import io
+
+from src.workers.tasks.csv_ranges import can_split_encoding, split_csv_ranges
+
+
+def make_csv(rows):
+    lines = ["id,note"]
+    for i in range(rows):
+        note = f'"line one\nline two, ""quoted"" {i}"' if i % 3 == 0 else f"plain {i}"
+        lines.append(f"{i},{note}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def parse(content):
+    return list(csv.reader(io.StringIO(content.decode(), newline="")))
+
+
+def test_ranges_split_at_record_boundaries():
+    """Test ranges cover all data records and never split a quoted newline."""
+    content = make_csv(200)
+    ranges = split_csv_ranges(content, 256)
+
+    assert len(ranges) > 1
+    assert content[:ranges[0][0]] == b"id,note\n"
+    assert ranges[-1][1] == len(content)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+    rows = [row for start, end in ranges for row in parse(content[start:end])]
+    assert rows == parse(content)[1:]
+
+
+def test_unbalanced_quotes_are_not_split():
+    """Test content with a stray quote is left to a single loader."""
+    content = make_csv(50) + b'51,"unterminated\n'
+    assert split_csv_ranges(content, 64) is None
+
+
+def test_splittable_encodings():
+    """Test only encodings with single-byte quotes and newlines are split."""
+    assert can_split_encoding("utf-8")
+    assert can_split_encoding("cp1252")
+    assert not can_split_encoding("utf-16")
+    assert not can_split_encoding("unknown-encoding")
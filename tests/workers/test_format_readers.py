@@ -0,0 +1,144 @@
+"""Non-CSV attachment format detection and reader tests."""
+
+import datetime as dt
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.workers.tasks.format_readers import (
+    ARROW,
+    CSV,
+    JSONL,
+    PARQUET,
+    XLSX,
+    ArrowFormatReader,
+    FormatReader,
+    attachment_format,
+    get_format_reader,
+)
+from src.workers.tasks.type_inference import INTEGER, NUMERIC, TEXT, TIMESTAMP
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def _prices_table():
+    return pa.table({
+        "Symbol": ["A", "B", None],
+        "Volume": pa.array([10, None, 30], type=pa.int64()),
+        "Price": [1.5, 2.25, 3.0],
+        "Traded At": [dt.datetime(2025, 7, 9, 9, 30), dt.datetime(2025, 7, 9, 10, 0), None],
+    })
+
+
+def test_attachment_format_by_extension_then_content_type():
+    """Test formats are recognised by extension before MIME type."""
+    assert attachment_format("prices.parquet", "application/octet-stream") == PARQUET
+    assert attachment_format("prices.feather", None) == ARROW
+    assert attachment_format("prices.NDJSON", None) == JSONL
+    assert attachment_format("prices", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet") == XLSX
+    assert attachment_format("prices", "text/csv; charset=utf-8") == CSV
+    assert attachment_format("readme.txt", "text/plain") is None
+
+
+def test_unknown_format_has_no_reader():
+    """Test asking for a reader of an unsupported format fails loudly."""
+    with pytest.raises(ValueError):
+        get_format_reader("avro")
+
+
+def test_incomplete_readers_fail_when_created():
+    """Test a reader missing part of the interface cannot be instantiated."""
+    class SchemaOnlyReader(FormatReader):
+        def read_schema(self, content):
+            return [], None
+
+    class BatchlessArrowReader(ArrowFormatReader):
+        def open_schema(self, source):
+            return pa.schema([])
+
+    for reader_class in (FormatReader, SchemaOnlyReader, ArrowFormatReader, BatchlessArrowReader):
+        with pytest.raises(TypeError):
+            reader_class()
+
+
+def test_parquet_schema_keeps_native_types():
+    """Test Parquet column types come from the file schema instead of sampling."""
+    buffer = io.BytesIO()
+    pq.write_table(_prices_table(), buffer)
+
+    names, types = get_format_reader(PARQUET).read_schema(buffer.getvalue())
+
+    assert names == ["Symbol", "Volume", "Price", "Traded At"]
+    assert types == {0: TEXT, 1: INTEGER, 2: NUMERIC, 3: TIMESTAMP}
+
+
+def test_arrow_batches_keep_integers_with_nulls():
+    """Test Arrow IPC batches carry the metadata columns and nulls as None."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, _prices_table().schema) as writer:
+        writer.write_table(_prices_table())
+    content = sink.getvalue().to_pybytes()
+    unit = SimpleNamespace(headers=["symbol", "volume", "price", "traded_at"])
+
+    frames = list(get_format_reader(ARROW).iter_batches(unit, content, ["symbol", "volume"], ("meta",)))
+
+    assert len(frames) == 1
+    assert frames[0].values.tolist() == [["A", 10, "meta"], ["B", None, "meta"], [None, 30, "meta"]]
+
+
+def test_arrow_rows_are_text_for_inference():
+    """Test typed values are rendered as text rows in header order."""
+    buffer = io.BytesIO()
+    pq.write_table(_prices_table(), buffer)
+    unit = SimpleNamespace(headers=["symbol", "volume", "price", "traded_at"])
+
+    rows = [row for batch in get_format_reader(PARQUET).iter_rows(unit, buffer.getvalue(), 2) for row in batch]
+
+    assert rows == [
+        ("A", "10", "1.5", "2025-07-09 09:30:00"),
+        ("B", None, "2.25", "2025-07-09 10:00:00"),
+        (None, "30", "3.0", None),
+    ]
+
+
+def test_jsonl_columns_come_from_keys():
+    """Test JSON Lines keys become columns and nested values are stored as JSON."""
+    content = "\n".join([
+        json.dumps({"symbol": "A", "price": 1.5}),
+        "",
+        json.dumps({"symbol": "B", "tags": ["x", "y"]}),
+    ]).encode()
+    reader = get_format_reader(JSONL)
+
+    names, types = reader.read_schema(content)
+    unit = SimpleNamespace(headers=names)
+    rows = [row for batch in reader.iter_rows(unit, content) for row in batch]
+
+    assert names == ["symbol", "price", "tags"]
+    assert types is None
+    assert rows == [("A", "1.5", None), ("B", None, '["x", "y"]')]
+
+
+def test_xlsx_reads_first_sheet():
+    """Test XLSX headers come from the first row and blank rows are skipped."""
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Symbol", "Price"])
+    sheet.append(["A", 1.5])
+    sheet.append([None, None])
+    sheet.append(["B"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    reader = get_format_reader(XLSX)
+
+    names, types = reader.read_schema(buffer.getvalue())
+    unit = SimpleNamespace(headers=["symbol", "price"])
+    rows = [row for batch in reader.iter_rows(unit, buffer.getvalue()) for row in batch]
+
+    assert names == ["Symbol", "Price"]
+    assert types is None
+    assert rows == [("A", "1.5"), ("B", None)]
@@ -0,0 +1,68 @@
+"""Streaming IMAP message part tests."""
+
+import base64
+import quopri
+
+import pytest
+from imapclient.response_parser import parse_fetch_response
+
+from src.core.imap_parts import SectionStream, TransferDecoder, message_parts
+
+BODYSTRUCTURE = (
+    b'1 (UID 7 BODYSTRUCTURE ('
+    b'("TEXT" "PLAIN" ("CHARSET" "iso-8859-1") NIL NIL "QUOTED-PRINTABLE" 120 4 NIL NIL NIL)'
+    b'(("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 300 9 NIL NIL NIL)'
+    b'("IMAGE" "PNG" ("NAME" "logo.png") "<logo>" NIL "BASE64" 800 NIL ("INLINE" ("FILENAME" "logo.png")) NIL)'
+    b' "RELATED" ("BOUNDARY" "y") NIL NIL)'
+    b'("APPLICATION" "OCTET-STREAM" ("NAME" "prices.csv") NIL NIL "BASE64" 4000 NIL'
+    b' ("ATTACHMENT" ("FILENAME*" "utf-8\'\'prices%20eu.csv")) NIL)'
+    b'("TEXT" "CSV" ("NAME" "=?utf-8?q?fx=5Frates.csv?=") NIL NIL "BASE64" 60 2 NIL ("ATTACHMENT" NIL) NIL)'
+    b' "MIXED" ("BOUNDARY" "x") NIL NIL))'
+)
+
+
+def test_parts_are_listed_with_sections_and_filenames():
+    """Test nested multiparts get dotted sections and encoded filenames are decoded."""
+    structure = parse_fetch_response([BODYSTRUCTURE])[7][b"BODYSTRUCTURE"]
+
+    parts = message_parts(structure)
+
+    assert [(part.section, part.content_type, part.encoding, part.size) for part in parts] == [
+        ("1", "text/plain", "quoted-printable", 120),
+        ("2.1", "text/html", "7bit", 300),
+        ("2.2", "image/png", "base64", 800),
+        ("3", "application/octet-stream", "base64", 4000),
+        ("4", "text/csv", "base64", 60),
+    ]
+    assert [part.filename for part in parts if part.is_attachment] == ["prices eu.csv", "fx_rates.csv"]
+    assert parts[0].charset == "iso-8859-1"
+    assert parts[2].disposition == "inline" and parts[2].content_id == "<logo>"
+
+
+@pytest.mark.parametrize("encoding, encode", [
+    ("base64", base64.encodebytes),
+    ("quoted-printable", quopri.encodestring),
+    ("8bit", lambda content: content),
+])
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10000])
+def test_section_stream_decodes_across_chunk_boundaries(encoding, encode, chunk_size):
+    """Test content split at any byte (inside base64 quads or QP escapes) decodes as a whole."""
+    content = "symbol,name\nAAA,Café = ünïcode\n".encode("utf-8") * 20
+    encoded = encode(content)
+    fetches = []
+
+    def fetch_chunk(offset, length):
+        fetches.append(offset)
+        return encoded[offset:offset + length]
+
+    stream = SectionStream(fetch_chunk, len(encoded), encoding, chunk_size)
+
+    assert b"".join(iter(lambda: stream.read(5), b"")) == content
+    assert len(fetches) == -(-len(encoded) // chunk_size)
+
+
+def test_unpadded_base64_is_flushed():
+    """Test a final base64 group without padding is still decoded."""
+    decoder = TransferDecoder("base64")
+
+    assert decoder.decode(b"QUJD\r\nRA") + decoder.flush() == b"ABCD"
@@ -0,0 +1,38 @@
+"""Row provenance layout tests."""
+
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import UUID
+
+from src.workers.tasks.ingest_batches import ingest_batch_index_name, row_metadata
+from src.workers.tasks.schema_registry import TableSchema, metadata_columns
+
+ATTACHMENT = SimpleNamespace(id=UUID("6f1c2a4e-8b3d-4f5a-9c7e-1d2b3a4c5e6f"), filename="prices_2025-07-09.csv")
+REPORT_DATE = datetime(2025, 7, 9)
+INSERTED_AT = datetime(2025, 7, 9, 18, 30)
+
+
+def test_batch_tables_carry_only_the_batch_id():
+    """Test rows of batch provenance tables hold the report date and batch id."""
+    schema = TableSchema("prices", {"symbol": "text"}, 1, batch_provenance=True)
+
+    assert metadata_columns(schema) == ["attachment_date", "ingest_batch_id"]
+    assert row_metadata(schema, ATTACHMENT, REPORT_DATE, 42, INSERTED_AT) == (REPORT_DATE, 42)
+
+
+def test_older_tables_keep_row_provenance():
+    """Test tables created before ingest batches are still loaded with per-row provenance."""
+    schema = TableSchema("prices", {"symbol": "text"}, 1)
+
+    assert metadata_columns(schema) == [
+        "insertion_timestamp", "attachment_date", "source_attachment_id", "source_filename"
+    ]
+    assert row_metadata(schema, ATTACHMENT, REPORT_DATE, None, INSERTED_AT) == (
+        INSERTED_AT, REPORT_DATE, "6f1c2a4e-8b3d-4f5a-9c7e-1d2b3a4c5e6f", "prices_2025-07-09.csv"
+    )
+
+
+def test_batch_index_name_fits_identifier_limit():
+    """Test the batch index name stays within 63 bytes."""
+    assert ingest_batch_index_name("prices") == "ix_prices_ingest_batch_id"
+    assert len(ingest_batch_index_name("x" * 63)) <= 63
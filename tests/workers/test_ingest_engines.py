@@ -0,0 +1,45 @@
+"""Ingest engine tests."""
+
+import pytest
+
+from src.workers.tasks.csv_ingest import IngestUnit
+from src.workers.tasks.ingest_engines import get_ingest_engine
+
+
+CONTENT = b'Symbol;Price;Note\nAAA;1.5;  hi \nBBB;;"multi\nline"\nCCC;3\n'
+
+
+def make_unit():
+    return IngestUnit("attachment", "unused", None, "utf-8", ";", ["symbol", "price", "note"])
+
+
+def load_rows(engine_name, columns):
+    engine = get_ingest_engine(engine_name)
+    rows = []
+    for batch in engine.iter_batches(make_unit(), CONTENT, columns, ("meta",)):
+        if hasattr(batch, "itertuples"):
+            batch = list(batch.itertuples(index=False, name=None))
+        rows.extend(batch)
+    return sorted(rows, key=repr)
+
+
+@pytest.mark.parametrize("engine_name", ["python", "pandas"])
+def test_engines_produce_the_same_load_rows(engine_name):
+    """Test both engines clean values and append metadata identically."""
+    assert load_rows(engine_name, ["symbol", "price", "note"]) == [
+        ("AAA", "1.5", "hi", "meta"),
+        ("BBB", None, "multi\nline", "meta"),
+        ("CCC", "3", None, "meta"),
+    ]
+
+
+@pytest.mark.parametrize("engine_name", ["python", "pandas"])
+def test_engines_project_load_columns(engine_name):
+    """Test only the requested columns are loaded, in the requested order."""
+    assert ("hi", "AAA", "meta") in load_rows(engine_name, ["note", "symbol"])
+
+
+def test_unknown_engine_is_rejected():
+    """Test an unknown engine name raises a clear error."""
+    with pytest.raises(ValueError):
+        get_ingest_engine("spark")
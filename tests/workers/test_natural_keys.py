@@ -0,0 +1,48 @@
+"""Natural key inference tests."""
+
+from src.core.config import settings
+from src.workers.tasks.natural_keys import infer_natural_key, natural_key_for
+
+
+HEADERS = ["symbol", "exchange_code", "price", "trade_date"]
+TYPES = {"symbol": "text", "exchange_code": "text", "price": "numeric", "trade_date": "date"}
+
+
+def make_rows(symbols, codes, dates):
+    return [(symbol, code, f"{i}.5", date) for i, (symbol, code, date) in enumerate(zip(symbols, codes, dates))]
+
+
+def test_single_identifier_column_gets_report_date():
+    """Test a unique identifier column is keyed together with the report date."""
+    rows = make_rows([f"S{i}" for i in range(10)], ["X"] * 10, ["2025-07-09"] * 10)
+    assert infer_natural_key(HEADERS, TYPES, rows) == ["symbol", "attachment_date"]
+
+
+def test_identifier_and_temporal_column_pair():
+    """Test a temporal column in the key replaces the report date."""
+    rows = make_rows(["A", "B"] * 5, ["X"] * 10, [f"2025-07-{i // 2 + 1:02d}" for i in range(10)])
+    assert infer_natural_key(HEADERS, TYPES, rows) == ["symbol", "trade_date"]
+
+
+def test_value_columns_are_never_keys():
+    """Test a unique value column is not chosen and nulls disqualify a candidate."""
+    rows = make_rows(["A"] * 10, [None] + ["X"] * 9, ["2025-07-09"] * 10)
+    assert infer_natural_key(HEADERS, TYPES, rows) is None
+
+
+def test_small_samples_are_not_trusted():
+    """Test no key is inferred from too few rows."""
+    rows = make_rows(["A", "B"], ["X", "Y"], ["2025-07-09", "2025-07-10"])
+    assert infer_natural_key(HEADERS, TYPES, rows) is None
+
+
+def test_inference_is_opt_in(monkeypatch):
+    """Test tables without a configured key load without one unless inference is enabled."""
+    rows = make_rows([f"S{i}" for i in range(10)], ["X"] * 10, ["2025-07-09"] * 10)
+    monkeypatch.setattr(settings, "INGEST_NATURAL_KEYS", {"trades": ["symbol", "trade_date"]})
+    monkeypatch.setattr(settings, "INGEST_INFER_NATURAL_KEYS", False)
+    assert natural_key_for("prices", HEADERS, TYPES, rows) is None
+    assert natural_key_for("trades", HEADERS, TYPES, rows) == ["symbol", "trade_date"]
+
+    monkeypatch.setattr(settings, "INGEST_INFER_NATURAL_KEYS", True)
+    assert natural_key_for("prices", HEADERS, TYPES, rows) == ["symbol", "attachment_date"]
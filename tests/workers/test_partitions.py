@@ -0,0 +1,64 @@
+"""Attachment table partition naming and bounds tests."""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from src.core.config import settings
+from src.workers.tasks.natural_keys import partitioned_natural_key
+from src.workers.tasks.partitions import (
+    DAY,
+    MONTH,
+    default_partition_name,
+    partition_bounds,
+    partition_interval,
+    partition_name,
+    utc_datetime,
+)
+
+
+def test_month_bounds_roll_over_the_year():
+    """Test a monthly partition runs from the first of the month to the next."""
+    assert partition_bounds(datetime(2025, 7, 9, 15, 30), MONTH) == (datetime(2025, 7, 1), datetime(2025, 8, 1))
+    assert partition_bounds(datetime(2025, 12, 31), MONTH) == (datetime(2025, 12, 1), datetime(2026, 1, 1))
+
+
+def test_day_bounds():
+    """Test a daily partition covers one calendar day."""
+    assert partition_bounds(datetime(2025, 2, 28, 23, 59), DAY) == (datetime(2025, 2, 28), datetime(2025, 3, 1))
+
+
+def test_partition_names_fit_identifier_limit():
+    """Test partition names carry the period and stay within 63 bytes."""
+    assert partition_name("prices", datetime(2025, 7, 1), MONTH) == "prices_p202507"
+    assert partition_name("prices", datetime(2025, 7, 9), DAY) == "prices_p20250709"
+    assert default_partition_name("prices") == "prices_default"
+    assert len(partition_name("x" * 63, datetime(2025, 7, 9), DAY)) <= 63
+    assert len(default_partition_name("x" * 63)) <= 63
+
+
+def test_partition_interval_setting(monkeypatch):
+    """Test partitioning can be disabled and unknown intervals are rejected."""
+    monkeypatch.setattr(settings, "INGEST_PARTITION_INTERVAL", "Month")
+    assert partition_interval() == MONTH
+    monkeypatch.setattr(settings, "INGEST_PARTITION_INTERVAL", "none")
+    assert partition_interval() is None
+    monkeypatch.setattr(settings, "INGEST_PARTITION_INTERVAL", "week")
+    with pytest.raises(ValueError):
+        partition_interval()
+
+
+def test_partitioned_natural_key_includes_partition_column():
+    """Test keys of partitioned tables always include attachment_date."""
+    assert partitioned_natural_key(["symbol"]) == ["symbol", "attachment_date"]
+    assert partitioned_natural_key(["symbol", "attachment_date"]) == ["symbol", "attachment_date"]
+
+
+def test_attachment_dates_are_utc():
+    """Test naive attachment dates are taken as UTC and aware ones converted, whatever the session time zone."""
+    assert utc_datetime(datetime(2025, 7, 1)) == datetime(2025, 7, 1, tzinfo=timezone.utc)
+    assert utc_datetime("2025-07-01T02:00:00+02:00") == datetime(2025, 7, 1, tzinfo=timezone.utc)
+    assert utc_datetime(None) is None
+    assert partition_bounds(utc_datetime(datetime(2025, 7, 9)), MONTH) == (
+        datetime(2025, 7, 1, tzinfo=timezone.utc), datetime(2025, 8, 1, tzinfo=timezone.utc)
+    )
@@ -0,0 +1,72 @@
+"""Rollup definition tests."""
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+from src.workers.tasks.rollups import WEEK, compile_rollups, period_bounds, rollup_problem
+from src.workers.tasks.schema_registry import TableSchema
+
+DAILY = {
+    "name": "prices_daily",
+    "grain": "day",
+    "group_by": ["symbol"],
+    "measures": {"volume": "sum(volume)", "avg_price": "AVG(price)", "high": "max(price)", "reports": "count(*)"},
+}
+
+
+def test_definitions_compile_per_table():
+    """Test measures are parsed into functions over columns, keyed by period and groups."""
+    rollup = compile_rollups({"prices": [DAILY]})["prices"][0]
+
+    assert rollup.key_columns == ["period_start", "symbol"]
+    assert [(m.name, m.function, m.column) for m in rollup.measures] == [
+        ("volume", "sum", "volume"), ("avg_price", "avg", "price"), ("high", "max", "price"), ("reports", "count", None)
+    ]
+    assert rollup.source_columns == ["symbol", "volume", "price"]
+
+
+@pytest.mark.parametrize("change", [
+    {"name": "Prices Daily"},
+    {"grain": "hour"},
+    {"grain": None, "group_by": []},
+    {"group_by": ["symbol; drop table prices"]},
+    {"measures": {}},
+    {"measures": {"volume": "median(volume)"}},
+    {"measures": {"volume": "sum(*)"}},
+    {"measures": {"avg_price_sum": "sum(price)", "avg_price": "avg(price)"}},
+])
+def test_invalid_definitions_are_rejected(change):
+    """Test configuration mistakes fail when the rollups are compiled."""
+    with pytest.raises(ValueError):
+        compile_rollups({"prices": [{**DAILY, **change}]})
+
+
+def test_duplicate_rollup_names_are_rejected():
+    """Test rollup names (their table names) are unique across tables."""
+    with pytest.raises(ValueError):
+        compile_rollups({"prices": [DAILY], "quotes": [DAILY]})
+
+
+def test_period_bounds_match_date_trunc():
+    """Test periods start on the day, the Monday or the first of the month, in UTC."""
+    report_date = datetime(2025, 7, 9, 23, 30, tzinfo=timezone.utc)
+
+    assert period_bounds(report_date, "day")[0] == date(2025, 7, 9)
+    assert period_bounds(report_date, WEEK) == (
+        date(2025, 7, 7), datetime(2025, 7, 7, tzinfo=timezone.utc), datetime(2025, 7, 14, tzinfo=timezone.utc)
+    )
+    assert period_bounds(datetime(2025, 12, 31), "month")[1:] == (
+        datetime(2025, 12, 1, tzinfo=timezone.utc), datetime(2026, 1, 1, tzinfo=timezone.utc)
+    )
+
+
+def test_rollups_need_numeric_sums_and_batches():
+    """Test a rollup is skipped while its columns are missing, not numeric, or rows have no batch id."""
+    rollup = compile_rollups({"prices": [DAILY]})["prices"][0]
+    columns = {"symbol": "text", "volume": "integer", "price": "numeric"}
+
+    assert rollup_problem(rollup, TableSchema("prices", columns, 1, batch_provenance=True)) is None
+    assert rollup_problem(rollup, TableSchema("prices", {**columns, "volume": "text"}, 1, batch_provenance=True))
+    assert rollup_problem(rollup, TableSchema("prices", {"symbol": "text"}, 1, batch_provenance=True))
+    assert rollup_problem(rollup, TableSchema("prices", columns, 1))
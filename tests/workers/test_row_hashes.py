@@ -0,0 +1,43 @@
+"""Row content hash tests."""
+
+import pandas as pd
+
+from src.workers.tasks.row_hashes import ROW_HASH_COLUMN, row_hashes, uses_row_hash, with_row_hashes
+
+COLUMNS = ["symbol", "qty", "note"]
+
+
+def test_rows_and_frames_hash_alike_without_provenance():
+    """Test python engine rows and pandas engine frames get the same hash, whatever their provenance."""
+    rows = with_row_hashes([("AAA", "10", None, "2025-07-09", 1), ("AAA", "10", None, "2025-07-10", 2)], COLUMNS)
+    frame = with_row_hashes(pd.DataFrame(
+        [("AAA", "10", None, "2025-07-11", 3)], columns=COLUMNS + ["__metadata_0", "__metadata_1"]
+    ), COLUMNS)
+
+    assert rows[0][-1] == rows[1][-1] == frame[ROW_HASH_COLUMN].iloc[0]
+    assert len(rows[0][-1]) == 32
+    assert rows[0][:-1] == ("AAA", "10", None, "2025-07-09", 1)
+
+
+def test_hash_ignores_column_order_and_null_columns():
+    """Test column order, empty values and columns added later (null in old rows) keep the hash."""
+    base = row_hashes(COLUMNS, [pd.Series(["AAA"]), pd.Series(["10"]), pd.Series([None])])
+    reordered = row_hashes(["qty", "symbol"], [pd.Series(["10"]), pd.Series(["AAA"])])
+    with_empty = row_hashes(COLUMNS + ["venue"], [pd.Series(["AAA"]), pd.Series(["10"]), pd.Series([""]), pd.Series([None])])
+
+    assert base[0] == reordered[0] == with_empty[0]
+
+
+def test_hash_depends_on_values_and_their_columns():
+    """Test changed or swapped values give different hashes."""
+    hashes = row_hashes(["a", "b"], [pd.Series(["1", "1", "2", "1"]), pd.Series(["2", "3", "1", "2"])])
+
+    assert hashes[0] == hashes[3]
+    assert len({hashes[0], hashes[1], hashes[2]}) == 3
+
+
+def test_row_hash_key_detection():
+    """Test a table uses row hashing when its natural key is the row hash."""
+    assert uses_row_hash(["row_hash"])
+    assert not uses_row_hash(["symbol", "attachment_date"])
+    assert not uses_row_hash(None)
@@ -0,0 +1,32 @@
+"""Column type inference tests."""
+
+import pytest
+
+from src.workers.tasks.type_inference import infer_column_types, infer_value_type
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["1", "-20", None, "300"], "integer"),
+    (["1", "2.5", "1e3"], "numeric"),
+    (["yes", "No", "t"], "boolean"),
+    (["2025-07-09", "2025-12-31"], "date"),
+    (["2025-07-09 10:00", "2025-07-09T10:00:01.5"], "timestamp"),
+    (["2025-07-09T10:00:00Z", "2025-07-09 10:00+02:00"], "timestamptz"),
+    (["007", "12"], "text"),
+    (["2025-02-30"], "text"),
+    (["12345678901234567890"], "numeric"),
+    ([None, None], "text"),
+])
+def test_infer_value_type(values, expected):
+    """Test the narrowest type fitting every non-empty value is chosen."""
+    assert infer_value_type(values) == expected
+
+
+def test_infer_column_types_by_header():
+    """Test types are inferred per column from row tuples."""
+    rows = [("AAA", "1.5", "100"), ("BBB", None, "n/a")]
+    assert infer_column_types(["symbol", "price", "volume"], rows) == {
+        "symbol": "text",
+        "price": "numeric",
+        "volume": "text",
+    }